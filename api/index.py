@@ -1,5 +1,3 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
 import sys
 import os
 
@@ -9,14 +7,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Импортируем ваше приложение из main.py
 from main import app as main_app
 
-# Создаем обработчик для Vercel
-app = FastAPI()
+# Приложение для Vercel - основное приложение целиком (включая вебхук бота /api/telegram/webhook).
+# Фоновый polling в lifespan на Vercel не работает: используйте BOT_MODE=webhook и WEBHOOK_WORKERS=0.
+# WEBHOOK_SECRET обязателен: без него вебхук отвечает 403 (если не задан WEBHOOK_ALLOW_NO_SECRET=1)
+app = main_app
 
 @app.get("/api/health")
 def health():
     return {"status": "ok"}
-
-# Перенаправляем все запросы на основное приложение
-@app.api_route("/{path_name:path}", methods=["GET", "POST", "PUT", "DELETE"])
-async def catch_all(request: Request, path_name: str):
-    return await main_app(request._request) 
\ No newline at end of file
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse, FileResponse
-import json
-import os
+from fastapi.responses import JSONResponse, Response
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
-from collections import Counter
+from datetime import datetime
 
-from bot.utils.pdf_generator import generate_analytics_pdf
+from bot.utils.order_time import date_range
+from api.services.analytics import get_analytics_engine
+from api.services.aggregates import get_aggregates, INTERVALS
+from bot.utils.workers import PoolOverloaded, JobTimeout
+from api.services.analytics_report import get_analytics_report
 
 # Создание роутера
 router = APIRouter()
@@ -20,98 +21,40 @@ async def get_analytics_stats(
     Получение статистики по заказам за указанный период
     """
     try:
-        # Путь к файлу с заказами
-        orders_file = os.path.join("data", "orders.json")
+        # Статистика за период из движка аналитики
+        start_ts, end_ts = date_range(start_date, end_date)
+        stats = get_analytics_engine().query(start_ts, end_ts)
         
-        # Проверка существования файла
-        if not os.path.exists(orders_file):
-            return {
-                "message": "Заказы не найдены",
-                "stats": {
-                    "total_orders": 0,
-                    "popular_districts": [],
-                    "popular_depths": [],
-                    "popular_equipment": [],
-                    "total_stats": {
-                        "total_orders": 0,
-                        "avg_order_cost": 0,
-                        "total_revenue": 0,
-                        "avg_depth": 0
-                    }
-                }
-            }
-        
-        # Загрузка данных
-        with open(orders_file, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        
-        orders = data.get("orders", [])
-        
-        # Фильтрация заказов по дате, если указаны даты
-        if start_date or end_date:
-            filtered_orders = []
-            
-            # Преобразование строк дат в объекты datetime
-            start_datetime = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
-            end_datetime = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1) if end_date else None
-            
-            for order in orders:
-                order_date = datetime.strptime(order.get("order_date", "01.01.2000 00:00"), "%d.%m.%Y %H:%M")
-                
-                # Проверка условий фильтрации
-                if start_datetime and order_date < start_datetime:
-                    continue
-                if end_datetime and order_date > end_datetime:
-                    continue
-                
-                filtered_orders.append(order)
-            
-            orders = filtered_orders
-        
-        # Анализ данных
-        
-        # Популярные районы
-        districts = [order.get("district_name", "Неизвестный район") for order in orders]
-        district_counter = Counter(districts)
-        popular_districts = [{"name": district, "count": count} for district, count in district_counter.most_common()]
-        
-        # Популярные глубины
-        depths = [order.get("depth", 0) for order in orders]
-        depth_counter = Counter(depths)
-        popular_depths = [{"depth": depth, "count": count} for depth, count in depth_counter.most_common()]
-        
-        # Популярное оборудование
-        equipment_list = []
-        for order in orders:
-            selected_equipment = order.get("selected_equipment", {})
-            for category, components in selected_equipment.items():
-                for component in components:
-                    equipment_list.append(component)
-        
-        equipment_counter = Counter(equipment_list)
-        popular_equipment = [{"name": equipment, "count": count} for equipment, count in equipment_counter.most_common(10)]
-        
-        # Общая статистика
-        total_orders = len(orders)
-        total_revenue = sum(order.get("total_cost", 0) for order in orders)
-        avg_order_cost = total_revenue / total_orders if total_orders > 0 else 0
-        avg_depth = sum(depths) / len(depths) if depths else 0
+        return {"stats": stats}
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/timeseries")
+async def get_analytics_timeseries(
+    interval: str = "day",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    district: Optional[str] = None
+):
+    """
+    Временной ряд по дням, неделям или месяцам: количество заказов, выручка,
+    средняя стоимость, p50/p90/p99 стоимости и средняя глубина.
+
+    district - название района; без него ряд строится по всем районам.
+    """
+    try:
+        if interval not in INTERVALS:
+            return JSONResponse(
+                status_code=400,
+                content={"message": f"Параметр interval должен быть одним из: {', '.join(INTERVALS)}"}
+            )
         
-        # Формирование результата
-        stats = {
-            "total_orders": total_orders,
-            "popular_districts": popular_districts,
-            "popular_depths": popular_depths,
-            "popular_equipment": popular_equipment,
-            "total_stats": {
-                "total_orders": total_orders,
-                "avg_order_cost": round(avg_order_cost, 2),
-                "total_revenue": total_revenue,
-                "avg_depth": round(avg_depth, 2)
-            }
-        }
+        # Ряд собирается из дневных агрегатов, заказы не читаются
+        start_ts, end_ts = date_range(start_date, end_date)
+        series = get_aggregates().timeseries(start_ts, end_ts, interval, district)
         
-        return {"stats": stats}
+        return {"interval": interval, "district": district, "series": series}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -122,23 +65,32 @@ async def get_analytics_pdf(
     end_date: Optional[str] = None
 ):
     """
-    Получение PDF-отчета с аналитикой
+    Получение PDF-отчета с аналитикой (графики рендерятся в пуле воркеров)
     """
     try:
-        # Получение статистики
-        stats_response = await get_analytics_stats(start_date, end_date)
-        stats = stats_response.get("stats", {})
-        
-        # Генерация PDF с аналитикой
-        pdf_path = generate_analytics_pdf(stats)
+        try:
+            start_ts, end_ts = date_range(start_date, end_date)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"message": str(e)})
+        
+        # Генерация PDF с аналитикой (или готовый отчет из кэша)
+        try:
+            pdf_bytes = await get_analytics_report().build(start_ts, end_ts)
+        except PoolOverloaded as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except JobTimeout as e:
+            raise HTTPException(status_code=504, detail=str(e))
         
         # Отправка файла
-        return FileResponse(
-            path=pdf_path,
-            filename=f"analytics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            media_type="application/pdf"
+        filename = f"analytics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        return Response(
+            content=pdf_bytes,
+            media_type="application/pdf",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -148,12 +100,8 @@ async def get_popular_districts():
     Получение списка популярных районов
     """
     try:
-        # Получение общей статистики
-        stats_response = await get_analytics_stats()
-        stats = stats_response.get("stats", {})
-        
-        # Извлечение данных о популярных районах
-        popular_districts = stats.get("popular_districts", [])
+        # Срез статистики за все время
+        popular_districts = get_analytics_engine().query()["popular_districts"]
         
         return {"popular_districts": popular_districts}
     
@@ -166,12 +114,8 @@ async def get_popular_depths():
     Получение списка популярных глубин
     """
     try:
-        # Получение общей статистики
-        stats_response = await get_analytics_stats()
-        stats = stats_response.get("stats", {})
-        
-        # Извлечение данных о популярных глубинах
-        popular_depths = stats.get("popular_depths", [])
+        # Срез статистики за все время
+        popular_depths = get_analytics_engine().query()["popular_depths"]
         
         return {"popular_depths": popular_depths}
     
@@ -184,12 +128,8 @@ async def get_popular_equipment():
     Получение списка популярного оборудования
     """
     try:
-        # Получение общей статистики
-        stats_response = await get_analytics_stats()
-        stats = stats_response.get("stats", {})
-        
-        # Извлечение данных о популярном оборудовании
-        popular_equipment = stats.get("popular_equipment", [])
+        # Срез статистики за все время
+        popular_equipment = get_analytics_engine().query()["popular_equipment"]
         
         return {"popular_equipment": popular_equipment}
     
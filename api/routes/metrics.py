@@ -0,0 +1,36 @@
+from fastapi import APIRouter, HTTPException
+
+from api.services.response_cache import get_response_cache
+from bot.utils.pdf_cache import get_pdf_cache
+from bot.utils.blob_storage import get_blob_storage
+from api.services.analytics_report import get_analytics_report
+from bot.dispatcher import BOT_MODE, get_update_queue
+from bot.cluster import get_bot_cluster
+from bot.utils.fsm_storage import get_fsm_op_stats
+
+# Создание роутера
+router = APIRouter()
+
+@router.get("/")
+async def get_metrics():
+    """
+    Метрики сервиса: попадания в кэш ответов и задержка по маршрутам,
+    кэш PDF, время рендеринга графиков отчета по аналитике, загрузки в хранилище файлов
+    очередь обновлений вебхука или процессы бота (обновлений в секунду по процессам)
+    и обращения к хранилищу состояний бота на одно обновление
+    """
+    try:
+        cluster = get_bot_cluster()
+        return {
+            "response_cache": get_response_cache().metrics(),
+            "pdf_cache": get_pdf_cache().stats(),
+            "analytics_charts": get_analytics_report().metrics(),
+            "blob_storage": get_blob_storage().metrics(),
+            "webhook": get_update_queue().metrics() if BOT_MODE == "webhook" and cluster is None else None,
+            "bot_workers": cluster.metrics() if cluster is not None else None,
+            # В процессах бота (BOT_WORKERS > 1) - в статистике каждого процесса
+            "fsm_ops": get_fsm_op_stats().metrics() if cluster is None else None
+        }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
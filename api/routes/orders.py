@@ -1,12 +1,16 @@
 from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse, FileResponse
-import json
-import os
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
-from datetime import datetime
+from operator import itemgetter
 
-from bot.utils.pdf_generator import generate_order_pdf
+from bot.utils.pdf_generator import load_order_pdf
+from bot.utils.workers import PoolOverloaded, JobTimeout
+from bot.utils.storage import get_storage
+from bot.utils.order_index import encode_cursor, decode_cursor
+from bot.utils.order_time import date_range
+from api.services.response_cache import get_response_cache
+from api.services.pdf_export import stream_orders_zip
 
 # Модели данных
 class OrderStatus(BaseModel):
@@ -20,42 +24,31 @@ router = APIRouter()
 async def get_all_orders(
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    cursor: Optional[str] = None
 ):
     """
-    Получение списка всех заказов с пагинацией и фильтрацией по статусу
+    Получение списка всех заказов с пагинацией и фильтрацией по статусу.
+
+    Для глубоких страниц передавайте next_cursor из предыдущего ответа
+    в параметре cursor: offset тогда отсчитывается от курсора.
     """
     try:
-        # Путь к файлу с заказами
-        orders_file = os.path.join("data", "orders.json")
-        
-        # Проверка существования файла
-        if not os.path.exists(orders_file):
-            return {"orders": [], "total": 0}
-        
-        # Загрузка данных
-        with open(orders_file, "r", encoding="utf-8") as file:
-            data = json.load(file)
+        # Разбор курсора
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"message": str(e)})
         
-        orders = data.get("orders", [])
+        # Страница заказов по индексу дат (от новых к старым) с фильтрацией по статусу
+        paginated_orders, total = get_storage().get_orders_page(status, offset, limit + 1, after)
         
-        # Фильтрация по статусу, если указан
-        if status:
-            orders = [order for order in orders if order.get("status") == status]
+        # Курсор следующей страницы, если она есть
+        has_more = len(paginated_orders) > limit
+        paginated_orders = paginated_orders[:limit]
+        next_cursor = encode_cursor(paginated_orders[-1]) if has_more else None
         
-        # Общее количество заказов после фильтрации
-        total = len(orders)
-        
-        # Сортировка заказов по дате (от новых к старым)
-        orders.sort(
-            key=lambda x: datetime.strptime(x.get("order_date", "01.01.2000 00:00"), "%d.%m.%Y %H:%M"),
-            reverse=True
-        )
-        
-        # Применение пагинации
-        paginated_orders = orders[offset:offset + limit]
-        
-        return {"orders": paginated_orders, "total": total}
+        return {"orders": paginated_orders, "total": total, "next_cursor": next_cursor}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -66,25 +59,11 @@ async def get_user_orders(user_id: int):
     Получение заказов конкретного пользователя
     """
     try:
-        # Путь к файлу с заказами
-        orders_file = os.path.join("data", "orders.json")
-        
-        # Проверка существования файла
-        if not os.path.exists(orders_file):
-            return {"orders": []}
-        
-        # Загрузка данных
-        with open(orders_file, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        
         # Фильтрация заказов пользователя
-        user_orders = [order for order in data.get("orders", []) if order.get("user_id") == user_id]
+        user_orders = get_storage().get_user_orders(user_id)
         
         # Сортировка заказов по дате (от новых к старым)
-        user_orders.sort(
-            key=lambda x: datetime.strptime(x.get("order_date", "01.01.2000 00:00"), "%d.%m.%Y %H:%M"),
-            reverse=True
-        )
+        user_orders.sort(key=itemgetter("order_ts"), reverse=True)
         
         return {"orders": user_orders}
     
@@ -97,22 +76,8 @@ async def get_order_details(order_id: str):
     Получение деталей конкретного заказа
     """
     try:
-        # Путь к файлу с заказами
-        orders_file = os.path.join("data", "orders.json")
-        
-        # Проверка существования файла
-        if not os.path.exists(orders_file):
-            return JSONResponse(
-                status_code=404,
-                content={"message": "Заказы не найдены"}
-            )
-        
-        # Загрузка данных
-        with open(orders_file, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        
         # Поиск заказа по ID
-        order = next((order for order in data.get("orders", []) if order.get("order_id") == order_id), None)
+        order = get_storage().get_order(order_id)
         
         if not order:
             return JSONResponse(
@@ -131,27 +96,9 @@ async def update_order_status(order_status: OrderStatus):
     Обновление статуса заказа
     """
     try:
-        # Путь к файлу с заказами
-        orders_file = os.path.join("data", "orders.json")
-        
-        # Проверка существования файла
-        if not os.path.exists(orders_file):
-            return JSONResponse(
-                status_code=404,
-                content={"message": "Заказы не найдены"}
-            )
-        
-        # Загрузка данных
-        with open(orders_file, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        
-        # Поиск заказа по ID
-        order_found = False
-        for order in data.get("orders", []):
-            if order.get("order_id") == order_status.order_id:
-                order["status"] = order_status.status
-                order_found = True
-                break
+        # Сохранение нового статуса
+        order_found = get_storage().update_order_status(order_status.order_id, order_status.status)
+        get_response_cache().invalidate("orders")
         
         if not order_found:
             return JSONResponse(
@@ -159,53 +106,87 @@ async def update_order_status(order_status: OrderStatus):
                 content={"message": f"Заказ с ID {order_status.order_id} не найден"}
             )
         
-        # Сохранение обновленных данных
-        with open(orders_file, "w", encoding="utf-8") as file:
-            json.dump(data, file, ensure_ascii=False, indent=4)
-        
         return {"message": "Статус заказа успешно обновлен"}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Объявлен до /pdf/{order_id}, иначе "batch" попадет в order_id
+@router.get("/pdf/batch")
+async def get_orders_pdf_batch(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    status: Optional[str] = None,
+    district: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000)
+):
+    """
+    ZIP-архив с PDF заказов за период с фильтрами по статусу и району.
+
+    Архив отдается частями по мере рендеринга, готовые PDF берутся из кэша.
+    """
+    try:
+        try:
+            start_ts, end_ts = date_range(start_date, end_date)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"message": str(e)})
+        
+        # Заказы за период; конец периода исключается (следующая полночь)
+        orders = [
+            order for order in get_storage().get_orders_in_range(start_ts, end_ts)
+            if (end_ts is None or order["order_ts"] < end_ts)
+            and (status is None or order.get("status") == status)
+            and (district is None or order.get("district_name") == district)
+        ]
+        if not orders:
+            return JSONResponse(status_code=404, content={"message": "Заказы по заданным условиям не найдены"})
+        if len(orders) > limit:
+            return JSONResponse(
+                status_code=400,
+                content={"message": f"Найдено {len(orders)} заказов, больше лимита {limit}: сузьте период или увеличьте limit"}
+            )
+        
+        return StreamingResponse(
+            stream_orders_zip(orders),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="orders.zip"'}
+        )
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/pdf/{order_id}")
 async def get_order_pdf(order_id: str):
     """
     Получение PDF-файла с деталями заказа
     """
     try:
-        # Путь к файлу с заказами
-        orders_file = os.path.join("data", "orders.json")
-        
-        # Проверка существования файла
-        if not os.path.exists(orders_file):
-            raise HTTPException(status_code=404, detail="Заказы не найдены")
-        
-        # Загрузка данных
-        with open(orders_file, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        
         # Поиск заказа по ID
-        order = next((order for order in data.get("orders", []) if order.get("order_id") == order_id), None)
+        order = get_storage().get_order(order_id)
         
         if not order:
             raise HTTPException(status_code=404, detail=f"Заказ с ID {order_id} не найден")
         
-        # Путь к PDF-файлу
-        pdf_path = os.path.join("data", "pdf", f"order_{order_id}.pdf")
+        # PDF из кэша или рендеринг в пуле воркеров
+        try:
+            pdf_bytes = await load_order_pdf(order)
+        except PoolOverloaded as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except JobTimeout as e:
+            raise HTTPException(status_code=504, detail=str(e))
         
-        # Проверка существования PDF-файла
-        if not os.path.exists(pdf_path):
-            # Генерация PDF, если файл не существует
-            pdf_path = generate_order_pdf(order)
+        if not pdf_bytes:
+            raise HTTPException(status_code=500, detail=f"Не удалось создать PDF для заказа {order_id}")
         
         # Отправка файла
-        return FileResponse(
-            path=pdf_path,
-            filename=f"order_{order_id}.pdf",
-            media_type="application/pdf"
+        return Response(
+            content=pdf_bytes,
+            media_type="application/pdf",
+            headers={"Content-Disposition": f'attachment; filename="order_{order_id}.pdf"'}
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,11 +1,15 @@
+import asyncio
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from fastapi.responses import JSONResponse
-import json
-import os
-import PyPDF2
-import re
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
+from PyPDF2.errors import PdfReadError
+
+from bot.utils.storage import get_storage
+from api.services.response_cache import get_response_cache
+from bot.utils.workers import Job, PoolOverloaded, JobTimeout
+from api.services.price_upload import get_price_uploads, UploadTooLarge
+from api.services.price_import import get_price_imports, PriceImportConflict
 
 # Модели данных
 class PriceUpdate(BaseModel):
@@ -26,20 +30,15 @@ async def get_equipment_prices():
     Получение цен на оборудование
     """
     try:
-        # Путь к файлу с ценами на оборудование
-        equipment_file = os.path.join("data", "equipment.json")
+        data = get_storage().get_equipment_data()
         
-        # Проверка существования файла
-        if not os.path.exists(equipment_file):
+        # Проверка наличия данных
+        if not data:
             return JSONResponse(
                 status_code=404,
                 content={"message": "Файл с ценами на оборудование не найден"}
             )
         
-        # Загрузка данных
-        with open(equipment_file, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        
         return data
     
     except Exception as e:
@@ -51,20 +50,15 @@ async def get_districts_prices():
     Получение цен по районам
     """
     try:
-        # Путь к файлу с данными о районах
-        districts_file = os.path.join("data", "districts.json")
+        data = get_storage().get_districts_data()
         
-        # Проверка существования файла
-        if not os.path.exists(districts_file):
+        # Проверка наличия данных
+        if not data:
             return JSONResponse(
                 status_code=404,
                 content={"message": "Файл с данными о районах не найден"}
             )
         
-        # Загрузка данных
-        with open(districts_file, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        
         return data
     
     except Exception as e:
@@ -76,20 +70,16 @@ async def update_equipment_price(price_update: PriceUpdate):
     Обновление цены на компонент оборудования
     """
     try:
-        # Путь к файлу с ценами на оборудование
-        equipment_file = os.path.join("data", "equipment.json")
+        storage = get_storage()
+        data = storage.get_equipment_data()
         
-        # Проверка существования файла
-        if not os.path.exists(equipment_file):
+        # Проверка наличия данных
+        if not data:
             return JSONResponse(
                 status_code=404,
                 content={"message": "Файл с ценами на оборудование не найден"}
             )
         
-        # Загрузка данных
-        with open(equipment_file, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        
         # Проверка существования категории оборудования
         if price_update.equipment_name not in data.get("equipment_data", {}):
             return JSONResponse(
@@ -104,12 +94,11 @@ async def update_equipment_price(price_update: PriceUpdate):
                 content={"message": f"Компонент '{price_update.component_name}' не найден в категории '{price_update.equipment_name}'"}
             )
         
-        # Обновление цены
-        data["equipment_data"][price_update.equipment_name][price_update.component_name] = price_update.price
-        
-        # Сохранение обновленных данных
-        with open(equipment_file, "w", encoding="utf-8") as file:
-            json.dump(data, file, ensure_ascii=False, indent=4)
+        # Обновление цены: запись справочников с fsync - вне цикла событий
+        await asyncio.to_thread(
+            storage.update_equipment_price, price_update.equipment_name, price_update.component_name, price_update.price
+        )
+        get_response_cache().invalidate("reference")
         
         return {"message": "Цена успешно обновлена"}
     
@@ -122,27 +111,20 @@ async def update_district_price(district_update: DistrictUpdate):
     Обновление базовой цены для района
     """
     try:
-        # Путь к файлу с данными о районах
-        districts_file = os.path.join("data", "districts.json")
+        storage = get_storage()
         
-        # Проверка существования файла
-        if not os.path.exists(districts_file):
+        # Проверка наличия данных
+        if not storage.get_districts_data():
             return JSONResponse(
                 status_code=404,
                 content={"message": "Файл с данными о районах не найден"}
             )
         
-        # Загрузка данных
-        with open(districts_file, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        
-        # Поиск района по ID
-        district_found = False
-        for district in data.get("districts", []):
-            if district.get("id") == district_update.district_id:
-                district["base_price"] = district_update.base_price
-                district_found = True
-                break
+        # Обновление цены района по ID (запись с fsync - вне цикла событий)
+        district_found = await asyncio.to_thread(
+            storage.update_district_price, district_update.district_id, district_update.base_price
+        )
+        get_response_cache().invalidate("reference")
         
         if not district_found:
             return JSONResponse(
@@ -150,109 +132,143 @@ async def update_district_price(district_update: DistrictUpdate):
                 content={"message": f"Район с ID {district_update.district_id} не найден"}
             )
         
-        # Сохранение обновленных данных
-        with open(districts_file, "w", encoding="utf-8") as file:
-            json.dump(data, file, ensure_ascii=False, indent=4)
-        
         return {"message": "Базовая цена района успешно обновлена"}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _submit_price_list(file: UploadFile) -> Tuple[Optional[Job], int, Optional[JSONResponse]]:
+    """
+    Копия загрузки и задача ее разбора в пуле (вне цикла событий).
+    Если файл не принят - ответ с ошибкой вместо задачи
+    """
+    # Проверка расширения файла
+    if not file.filename.endswith('.pdf'):
+        return None, 0, JSONResponse(
+            status_code=400,
+            content={"message": "Файл должен быть в формате PDF"}
+        )
+    
+    uploads = get_price_uploads()
+    try:
+        buffer, size = await uploads.spool(file)
+    except UploadTooLarge as e:
+        return None, 0, JSONResponse(status_code=413, content={"message": str(e)})
+    
+    try:
+        return uploads.submit(buffer, file.filename, size), size, None
+    except PoolOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+async def _wait_price_list(job: Job) -> Tuple[Optional[Dict[str, Any]], Optional[JSONResponse]]:
+    """
+    Результат разбора прайс-листа или ответ с ошибкой
+    """
+    try:
+        return await job.wait(), None
+    except JobTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except PdfReadError as e:
+        return None, JSONResponse(
+            status_code=400,
+            content={"message": f"Не удалось прочитать PDF: {e}"}
+        )
+
 @router.post("/parse-pdf")
 async def parse_pdf_prices(file: UploadFile = File(...)):
     """
-    Парсинг цен из PDF-файла
+    Парсинг цен из PDF-файла.
+
+    Небольшой файл разбирается сразу, ответ - найденные цены. Для большого
+    файла возвращается 202 с job_id: статус, прогресс и результат разбора -
+    GET /api/prices/parse-pdf/{job_id}
     """
     try:
-        # Проверка расширения файла
-        if not file.filename.endswith('.pdf'):
+        job, size, error = await _submit_price_list(file)
+        if error is not None:
+            return error
+        
+        if get_price_uploads().is_large(size):
             return JSONResponse(
-                status_code=400,
-                content={"message": "Файл должен быть в формате PDF"}
+                status_code=202,
+                content={"job_id": job.id, "status_url": f"/api/prices/parse-pdf/{job.id}"}
             )
         
-        # Сохранение загруженного файла
-        temp_file_path = os.path.join("data", "temp", file.filename)
-        os.makedirs(os.path.dirname(temp_file_path), exist_ok=True)
-        
-        with open(temp_file_path, "wb") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-        
-        # Парсинг PDF
-        extracted_data = parse_pdf_content(temp_file_path)
-        
-        # Удаление временного файла
-        os.remove(temp_file_path)
-        
-        return extracted_data
+        extracted_data, error = await _wait_price_list(job)
+        return error or extracted_data
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-def parse_pdf_content(pdf_path: str) -> Dict[str, Any]:
+@router.get("/parse-pdf/{job_id}")
+async def get_parse_pdf_job(job_id: str):
     """
-    Парсинг содержимого PDF-файла
+    Статус разбора прайс-листа: прогресс по страницам и результат, когда он готов
     """
-    # Открытие PDF-файла
-    with open(pdf_path, "rb") as file:
-        reader = PyPDF2.PdfReader(file)
+    try:
+        status = get_price_uploads().status(job_id)
+        if status is None:
+            return JSONResponse(
+                status_code=404,
+                content={"message": f"Задача разбора {job_id} не найдена"}
+            )
         
-        # Извлечение текста из всех страниц
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
-    
-    # Поиск цен и оборудования в тексте
-    # Это упрощенный пример, в реальном приложении нужно адаптировать регулярные выражения
-    # под конкретный формат PDF-файла с ценами
-    
-    # Поиск оборудования и цен
-    equipment_pattern = r"([А-Яа-я\s№]+):\s*(\d+(?:\s*\d+)*)\s*₽"
-    equipment_matches = re.findall(equipment_pattern, text)
+        return status
     
-    # Поиск районов и базовых цен
-    district_pattern = r"([А-Яа-я\s]+округ)[\s\-]*(\d+(?:\s*\d+)*)\s*₽/м"
-    district_matches = re.findall(district_pattern, text)
-    
-    # Формирование результата
-    result = {
-        "equipment_data": {},
-        "districts_data": []
-    }
-    
-    # Обработка найденного оборудования
-    for name, price in equipment_matches:
-        name = name.strip()
-        price = int(price.replace(" ", ""))
-        
-        # Определение категории и компонента (упрощенно)
-        if "адаптер" in name.lower():
-            category = "адаптер №1" if "1" in name else "адаптер №2" if "2" in name else "адаптер №3"
-            component = "насос" if "насос" in name.lower() else "колонка" if "колонка" in name.lower() else name
-        elif "кессон" in name.lower():
-            category = "кессон №1" if "1" in name else "кессон №2" if "2" in name else "кессон №3"
-            component = name
-        else:
-            category = "другое"
-            component = name
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/import/preview")
+async def preview_price_import(file: UploadFile = File(...)):
+    """
+    Предпросмотр импорта цен из PDF-файла: какие позиции и районы будут
+    добавлены или изменены. Справочники не меняются; применить разницу -
+    POST /api/prices/import/{import_id}/apply
+    """
+    try:
+        job, _, error = await _submit_price_list(file)
+        if error is not None:
+            return error
         
-        # Добавление в результат
-        if category not in result["equipment_data"]:
-            result["equipment_data"][category] = {}
+        parsed_data, error = await _wait_price_list(job)
+        if error is not None:
+            return error
         
-        result["equipment_data"][category][component] = price
+        return get_price_imports().preview(parsed_data).to_dict()
     
-    # Обработка найденных районов
-    for name, price in district_matches:
-        name = name.strip()
-        price = int(price.replace(" ", ""))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/import/{import_id}/apply")
+async def apply_price_import(import_id: str):
+    """
+    Применение импорта цен: все изменения предпросмотра сохраняются разом
+    """
+    try:
+        imports = get_price_imports()
+        diff = imports.get(import_id)
+        if diff is None:
+            return JSONResponse(
+                status_code=404,
+                content={"message": f"Предпросмотр импорта {import_id} не найден"}
+            )
+        
+        # Запись справочников с fsync - вне цикла событий
+        try:
+            version = await asyncio.to_thread(imports.apply, diff)
+        except PriceImportConflict as e:
+            return JSONResponse(status_code=409, content={"message": str(e)})
+        get_response_cache().invalidate("reference")
         
-        result["districts_data"].append({
-            "name": name,
-            "base_price": price
-        })
+        return {
+            "message": "Цены успешно обновлены",
+            "reference_version": version,
+            "summary": diff.to_dict()["summary"]
+        }
     
-    return result
-
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
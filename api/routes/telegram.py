@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+from aiogram.types import Update
+
+from bot.dispatcher import BOT_MODE, SECRET_HEADER, UpdateQueueFull, check_secret, get_update_queue
+from bot.cluster import get_bot_cluster
+
+# Создание роутера
+router = APIRouter()
+
+@router.post("/webhook")
+async def telegram_webhook(request: Request):
+    """
+    Прием обновлений Telegram в режиме вебхука.
+
+    Обновление проверяется и ставится в очередь (или в очередь процесса
+    своего чата при BOT_WORKERS > 1), ответ Telegram - сразу, не дожидаясь
+    обработки. При переполненной очереди - 503, и Telegram
+    повторяет доставку позже.
+    """
+    if BOT_MODE != "webhook":
+        return JSONResponse(status_code=404, content={"message": "Бот работает не в режиме вебхука"})
+    
+    if not check_secret(request.headers.get(SECRET_HEADER)):
+        return JSONResponse(status_code=403, content={"message": "Неверный секрет вебхука"})
+    
+    try:
+        data = await request.json()
+        if not isinstance(data, dict) or "update_id" not in data:
+            raise ValueError("нет update_id")
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": f"Некорректное обновление: {e}"})
+    
+    try:
+        cluster = get_bot_cluster()
+        if cluster is not None:
+            # Несколько процессов бота: обновление уходит процессу своего чата как есть
+            cluster.feed(data)
+        else:
+            queue = get_update_queue()
+            try:
+                update = Update.model_validate(data, context={"bot": queue.bot})
+            except ValueError as e:
+                return JSONResponse(status_code=400, content={"message": f"Некорректное обновление: {e}"})
+            await queue.put(update)
+    except UpdateQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return {"ok": True}
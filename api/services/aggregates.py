@@ -0,0 +1,297 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Any, List, Optional, Tuple
+
+from bot.utils.order_events import OrderListener
+from bot.utils.order_time import SECONDS_PER_DAY, ensure_order_ts, from_timestamp
+from bot.utils.storage import get_storage
+from api.services.quantiles import QuantileSketch
+
+UNKNOWN_DISTRICT = "Неизвестный район"
+
+# Интервалы временных рядов
+INTERVALS = ("day", "week", "month")
+PERCENTILES = (0.5, 0.9, 0.99)
+
+def numeric(value: Any) -> Any:
+    """
+    Число для сумм: у старых заказов total_cost и depth бывают пустыми
+    """
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+# Ключ первого появления значения: (order_ts, порядковый номер заказа, номер внутри заказа).
+# По нему восстанавливается порядок Counter.most_common() для равных счетчиков.
+FirstSeen = Tuple[int, int, int]
+
+class _Item:
+    """
+    Счетчик одного значения (район, глубина, позиция оборудования) в дне
+    """
+    __slots__ = ("count", "revenue", "first")
+
+    def __init__(self, first: FirstSeen):
+        self.count = 0
+        self.revenue = 0
+        self.first = first
+
+class Series:
+    """
+    Количество, выручка, сумма глубин и скетч стоимости заказов
+    """
+    __slots__ = ("count", "revenue", "depth_sum", "costs")
+
+    def __init__(self):
+        self.count = 0
+        self.revenue = 0
+        self.depth_sum = 0
+        self.costs = QuantileSketch()
+
+    def add(self, revenue: Any, depth: Any) -> None:
+        self.count += 1
+        self.revenue += revenue
+        self.depth_sum += depth
+        self.costs.add(revenue)
+
+    def merge(self, other: "Series") -> None:
+        self.count += other.count
+        self.revenue += other.revenue
+        self.depth_sum += other.depth_sum
+        self.costs.merge(other.costs)
+
+class DayBucket(Series):
+    """
+    Агрегаты заказов за один календарный день (итого и по районам)
+    """
+    __slots__ = ("by_district", "districts", "depths", "equipment")
+
+    def __init__(self):
+        super().__init__()
+        self.by_district: Dict[Any, Series] = {}
+        self.districts: Dict[Any, _Item] = {}
+        self.depths: Dict[Any, _Item] = {}
+        self.equipment: Dict[Any, _Item] = {}
+
+def _bump(items: Dict[Any, _Item], key: Any, revenue: Any, first: FirstSeen) -> None:
+    item = items.get(key)
+    if item is None:
+        item = items[key] = _Item(first)
+    elif first < item.first:
+        # Заказы приходят в порядке добавления, а не в хронологическом
+        item.first = first
+    item.count += 1
+    item.revenue += revenue
+
+def _merge(target: Dict[Any, List], items: Dict[Any, _Item]) -> None:
+    for key, item in items.items():
+        merged = target.get(key)
+        if merged is None:
+            target[key] = [item.count, item.revenue, item.first]
+        else:
+            merged[0] += item.count
+            merged[1] += item.revenue
+            if item.first < merged[2]:
+                merged[2] = item.first
+
+def _ranked(merged: Dict[Any, List], limit: Optional[int] = None) -> List[Tuple[Any, int, Any]]:
+    """
+    (значение, количество, выручка) по убыванию количества, как Counter.most_common()
+    """
+    ranked = sorted(merged.items(), key=lambda item: (-item[1][0], item[1][2]))
+    if limit is not None:
+        ranked = ranked[:limit]
+    return [(key, count, revenue) for key, (count, revenue, _) in ranked]
+
+class OrderAggregates(OrderListener):
+    """
+    Материализованные агрегаты заказов по дням.
+
+    Каждый заказ учитывается в корзине своего дня (order_ts // 86400) при
+    сохранении; статус в агрегатах не участвует, и смена статуса их не меняет.
+    Запрос за период объединяет корзины дней из диапазона, не читая заказы.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset([])
+
+    def reset(self, orders: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._buckets: Dict[int, DayBucket] = {}
+            self._days: List[int] = []
+            self._seq = 0
+            for order in orders:
+                self._add(order)
+
+    def order_added(self, order: Dict[str, Any]) -> None:
+        with self._lock:
+            self._add(order)
+
+    def _add(self, order: Dict[str, Any]) -> None:
+        ts = ensure_order_ts(order)
+        day = ts // SECONDS_PER_DAY
+        bucket = self._buckets.get(day)
+        if bucket is None:
+            bucket = self._buckets[day] = DayBucket()
+            insort(self._days, day)
+        seq = self._seq
+        self._seq += 1
+
+        revenue = numeric(order.get("total_cost", 0))
+        depth = order.get("depth", 0)
+        district = order.get("district_name", UNKNOWN_DISTRICT)
+        bucket.add(revenue, numeric(depth))
+        series = bucket.by_district.get(district)
+        if series is None:
+            series = bucket.by_district[district] = Series()
+        series.add(revenue, numeric(depth))
+        _bump(bucket.districts, district, revenue, (ts, seq, 0))
+        _bump(bucket.depths, depth, revenue, (ts, seq, 0))
+        i = 0
+        for category, components in order.get("selected_equipment", {}).items():
+            for component in components:
+                _bump(bucket.equipment, component, revenue, (ts, seq, i))
+                i += 1
+
+    def day_range(self) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Первый и последний день с заказами (номера дней order_ts // 86400)
+        """
+        with self._lock:
+            return (self._days[0], self._days[-1]) if self._days else (None, None)
+
+    def _collect(self, start_ts: Optional[int], end_ts: Optional[int]) -> List[DayBucket]:
+        """
+        Корзины дней, целиком попадающих в [start_ts, end_ts].
+
+        Границы date_range() приходятся на полночь: start_ts - начало дня,
+        а end_ts - полночь следующего дня, которая входит в период.
+        Заказы ровно в end_ts добавляются отдельной корзиной.
+        """
+        lo = bisect_left(self._days, start_ts // SECONDS_PER_DAY) if start_ts is not None else 0
+        hi = bisect_right(self._days, (end_ts - 1) // SECONDS_PER_DAY) if end_ts is not None else len(self._days)
+        return [self._buckets[day] for day in self._days[lo:hi]]
+
+    def query(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None, equipment_limit: int = 10) -> Dict[str, Any]:
+        """
+        Статистика за период в формате get_analytics_data()
+        """
+        storage = get_storage()
+        # Граница end_ts включительная: заказы ровно в полночь следующего дня берем из индекса
+        boundary = OrderAggregates()
+        if end_ts is not None and (start_ts is None or start_ts <= end_ts):
+            boundary.reset(storage.get_orders_in_range(end_ts, end_ts))
+
+        total_orders = total_revenue = depth_sum = 0
+        districts: Dict[Any, List] = {}
+        depths: Dict[Any, List] = {}
+        equipment: Dict[Any, List] = {}
+        with self._lock:
+            buckets = self._collect(start_ts, end_ts)
+            # Заказы на границе самые поздние в периоде, их корзина идет последней
+            for bucket in buckets + list(boundary._buckets.values()):
+                total_orders += bucket.count
+                total_revenue += bucket.revenue
+                depth_sum += bucket.depth_sum
+                _merge(districts, bucket.districts)
+                _merge(depths, bucket.depths)
+                _merge(equipment, bucket.equipment)
+
+        avg_order_cost = total_revenue / total_orders if total_orders > 0 else 0
+        avg_depth = depth_sum / total_orders if total_orders > 0 else 0
+        return {
+            "total_orders": total_orders,
+            "popular_districts": [{"name": name, "count": count} for name, count, _ in _ranked(districts)],
+            "popular_depths": [{"depth": depth, "count": count} for depth, count, _ in _ranked(depths)],
+            "popular_equipment": [
+                {"name": name, "count": count} for name, count, _ in _ranked(equipment, equipment_limit)
+            ],
+            "total_stats": {
+                "total_orders": total_orders,
+                "avg_order_cost": round(avg_order_cost, 2),
+                "total_revenue": total_revenue,
+                "avg_depth": round(avg_depth, 2)
+            }
+        }
+
+    def timeseries(
+        self,
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None,
+        interval: str = "day",
+        district: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Временной ряд по периодам (день, неделя с понедельника, месяц).
+
+        Периоды без заказов включаются с нулевыми значениями. Ряд строится
+        по целым дням из [start_ts, end_ts), без чтения заказов.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Неизвестный интервал: {interval}")
+
+        periods: Dict[int, List[Series]] = {}
+        with self._lock:
+            if start_ts is None and not self._days:
+                return []
+            first_day = start_ts // SECONDS_PER_DAY if start_ts is not None else self._days[0]
+            last_day = (end_ts - 1) // SECONDS_PER_DAY if end_ts is not None else (self._days[-1] if self._days else first_day)
+            for day in range(first_day, last_day + 1):
+                sources = periods.setdefault(_period_start(day, interval), [])
+                source = self._buckets.get(day)
+                if source is not None and district is not None:
+                    source = source.by_district.get(district)
+                if source is not None:
+                    sources.append(source)
+
+            result = []
+            for period, sources in periods.items():
+                # Один день - скетч корзины используется как есть, без копирования
+                if len(sources) == 1:
+                    series = sources[0]
+                else:
+                    series = Series()
+                    for source in sources:
+                        series.merge(source)
+                result.append(_series_point(period, series))
+        return result
+
+def _series_point(period: int, series: Series) -> Dict[str, Any]:
+    p50, p90, p99 = (round(value, 2) if value is not None else None for value in series.costs.quantiles(PERCENTILES))
+    return {
+        "period": from_timestamp(period * SECONDS_PER_DAY).strftime("%Y-%m-%d"),
+        "orders": series.count,
+        "revenue": series.revenue,
+        "avg_order_cost": round(series.revenue / series.count, 2) if series.count else 0,
+        "p50": p50,
+        "p90": p90,
+        "p99": p99,
+        "avg_depth": round(series.depth_sum / series.count, 2) if series.count else 0
+    }
+
+def _period_start(day: int, interval: str) -> int:
+    """
+    Номер первого дня периода, в который попадает день
+    """
+    if interval == "week":
+        # 01.01.1970 - четверг
+        return day - (day + 3) % 7
+    if interval == "month":
+        date = from_timestamp(day * SECONDS_PER_DAY)
+        return day - (date.day - 1)
+    return day
+
+_aggregates: Optional[OrderAggregates] = None
+_aggregates_lock = threading.Lock()
+
+def get_aggregates() -> OrderAggregates:
+    """
+    Агрегаты, подписанные на хранилище заказов (создаются при первом обращении)
+    """
+    global _aggregates
+    with _aggregates_lock:
+        if _aggregates is None:
+            aggregates = OrderAggregates()
+            get_storage().subscribe(aggregates)
+            _aggregates = aggregates
+    # Изменения других процессов доставляются подписчикам при обращении
+    get_storage().refresh()
+    return _aggregates
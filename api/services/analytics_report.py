@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from bot.utils.order_time import from_timestamp, SECONDS_PER_DAY
+from bot.utils.pdf_generator import (
+    ANALYTICS_CHARTS, analytics_chart_data, get_pdf_pool, render_analytics_chart, render_analytics_pdf
+)
+from api.services.aggregates import get_aggregates
+from api.services.analytics import get_analytics_engine
+from api.services.quantiles import QuantileSketch
+
+def _digest(data: Any) -> str:
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+def _interval_for(start_ts: Optional[int], end_ts: Optional[int], day_range: Tuple[Optional[int], Optional[int]]) -> str:
+    """
+    Интервал графика выручки: не больше нескольких сотен точек на графике
+    """
+    start_day = start_ts // SECONDS_PER_DAY if start_ts is not None else day_range[0]
+    end_day = end_ts // SECONDS_PER_DAY if end_ts is not None else day_range[1]
+    days = end_day - start_day if start_day is not None and end_day is not None else 0
+    if days <= 92:
+        return "day"
+    if days <= 731:
+        return "week"
+    return "month"
+
+class _ChartStats:
+    __slots__ = ("renders", "hits", "render_ms", "wait_ms", "last_ms")
+
+    def __init__(self):
+        self.renders = 0
+        self.hits = 0
+        self.render_ms = QuantileSketch()
+        self.wait_ms = QuantileSketch()
+        self.last_ms: Optional[float] = None
+
+class AnalyticsReport:
+    """
+    PDF-отчет по аналитике с графиками, которые рендерятся в пуле воркеров.
+
+    Графики и готовые отчеты кэшируются по хэшу данных: если статистика
+    за период не изменилась, отчет возвращается без рендеринга, а при
+    изменении части данных перерисовываются только затронутые графики.
+    Для каждого вида графика считается время рендеринга в воркере
+    и время ожидания с учетом очереди пула.
+    """
+    def __init__(self, max_charts: int = 64, max_reports: int = 8):
+        self.max_charts = max_charts
+        self.max_reports = max_reports
+        self._charts: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._reports: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _ChartStats] = {kind: _ChartStats() for kind in ANALYTICS_CHARTS}
+
+    def _remember(self, entries: OrderedDict, key: Any, value: bytes, limit: int) -> None:
+        with self._lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > limit:
+                entries.popitem(last=False)
+
+    def _lookup(self, entries: OrderedDict, key: Any) -> Optional[bytes]:
+        with self._lock:
+            value = entries.get(key)
+            if value is not None:
+                entries.move_to_end(key)
+            return value
+
+    async def _chart(self, kind: str, data: List[Dict[str, Any]]) -> Tuple[str, bytes]:
+        key = (kind, _digest(data))
+        stats = self._stats[kind]
+        png = self._lookup(self._charts, key)
+        if png is not None:
+            with self._lock:
+                stats.hits += 1
+            return ANALYTICS_CHARTS[kind][0], png
+
+        started = time.perf_counter()
+        png, render_time = await get_pdf_pool().run(render_analytics_chart, kind, data, name=f"chart_{kind}")
+        wait_ms = (time.perf_counter() - started) * 1e3
+        with self._lock:
+            stats.renders += 1
+            stats.render_ms.add(render_time * 1e3)
+            stats.wait_ms.add(wait_ms)
+            stats.last_ms = round(render_time * 1e3, 2)
+        logging.info(f"График {kind}: рендеринг {render_time * 1e3:.1f} мс, с очередью {wait_ms:.1f} мс")
+        self._remember(self._charts, key, png, self.max_charts)
+        return ANALYTICS_CHARTS[kind][0], png
+
+    async def build(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> bytes:
+        """
+        PDF-отчет за период [start_ts, end_ts)
+        """
+        stats = get_analytics_engine().query(start_ts, end_ts)
+        aggregates = get_aggregates()
+        interval = _interval_for(start_ts, end_ts, aggregates.day_range())
+        series = aggregates.timeseries(start_ts, end_ts, interval)
+
+        report = dict(stats)
+        if start_ts is None and end_ts is None:
+            report["period"] = "все время"
+        else:
+            start = from_timestamp(start_ts).strftime("%d.%m.%Y") if start_ts is not None else "…"
+            end = from_timestamp(end_ts - 1).strftime("%d.%m.%Y") if end_ts is not None else "…"
+            report["period"] = f"{start} - {end}"
+        chart_data = analytics_chart_data(report, series)
+
+        report_key = _digest([report, chart_data])
+        pdf = self._lookup(self._reports, report_key)
+        if pdf is not None:
+            return pdf
+
+        # Графики рендерятся параллельно в воркерах пула
+        charts = await asyncio.gather(*(self._chart(kind, data) for kind, data in chart_data.items()))
+        pdf = await get_pdf_pool().run(render_analytics_pdf, report, list(charts), name="analytics_pdf")
+        self._remember(self._reports, report_key, pdf, self.max_reports)
+        return pdf
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Рендеринг графиков по видам: количество, попадания в кэш, время (мс)
+        """
+        with self._lock:
+            result = {}
+            for kind, stats in self._stats.items():
+                render_p50, render_p99 = stats.render_ms.quantiles([0.5, 0.99])
+                wait_p50, wait_p99 = stats.wait_ms.quantiles([0.5, 0.99])
+                result[kind] = {
+                    "renders": stats.renders,
+                    "cache_hits": stats.hits,
+                    "last_render_ms": stats.last_ms,
+                    "render_ms_p50": round(render_p50, 2) if render_p50 is not None else None,
+                    "render_ms_p99": round(render_p99, 2) if render_p99 is not None else None,
+                    "wait_ms_p50": round(wait_p50, 2) if wait_p50 is not None else None,
+                    "wait_ms_p99": round(wait_p99, 2) if wait_p99 is not None else None
+                }
+            return result
+
+_analytics_report: Optional[AnalyticsReport] = None
+
+def get_analytics_report() -> AnalyticsReport:
+    global _analytics_report
+    if _analytics_report is None:
+        _analytics_report = AnalyticsReport()
+    return _analytics_report
@@ -0,0 +1,241 @@
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from bot.utils.order_events import OrderListener
+from bot.utils.order_time import ensure_order_ts
+from bot.utils.storage import get_storage
+from api.services.aggregates import numeric
+
+UNKNOWN_DISTRICT = "Неизвестный район"
+
+class _Column:
+    """
+    Растущий numpy-массив с удвоением емкости
+    """
+    def __init__(self, dtype, capacity: int = 1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._size = 0
+
+    def append(self, value) -> None:
+        if self._size == len(self._data):
+            self._data = np.resize(self._data, len(self._data) * 2)
+        self._data[self._size] = value
+        self._size += 1
+
+    def extend(self, values) -> None:
+        values = np.asarray(values, dtype=self._data.dtype)
+        needed = self._size + len(values)
+        if needed > len(self._data):
+            self._data = np.resize(self._data, max(needed, len(self._data) * 2))
+        self._data[self._size:needed] = values
+        self._size = needed
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+class _Categories:
+    """
+    Словарь категориального кодирования: значение -> код
+    """
+    def __init__(self):
+        self.codes: Dict[Any, int] = {}
+        self.values: List[Any] = []
+
+    def code(self, value: Any) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+def _rank(counts: np.ndarray, first: np.ndarray, limit: Optional[int] = None) -> np.ndarray:
+    """
+    Коды по убыванию количества, при равенстве - по первому появлению (как Counter.most_common())
+    """
+    present = np.flatnonzero(counts)
+    if limit is not None and limit < len(present):
+        # Составной ключ уникален: количество, затем обратный номер первого появления
+        key = counts[present] * (int(first[present].max()) + 1) - first[present]
+        top = np.argpartition(-key, limit - 1)[:limit]
+        present = present[top]
+    return present[np.lexsort((first[present], -counts[present]))]
+
+class ColumnarOrders(OrderListener):
+    """
+    Колоночное представление заказов для аналитики по большой истории.
+
+    Заказы хранятся в виде массивов: order_ts (int64), код района, код и
+    значение глубины, total_cost, а позиции оборудования - разреженной
+    матрицей принадлежности (пары "строка заказа, код позиции").
+    Фильтр по периоду, суммы и топ-N считаются векторно.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset([])
+
+    def reset(self, orders: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._ts = _Column(np.int64)
+            self._district = _Column(np.int32)
+            self._depth_code = _Column(np.int32)
+            self._depth = _Column(np.float64)
+            self._cost = _Column(np.float64)
+            self._integral_cost = True
+            self._equipment_row = _Column(np.int64)
+            self._equipment_code = _Column(np.int32)
+            self._equipment_pos = _Column(np.int32)
+            self._max_components = 1
+            self._districts = _Categories()
+            self._depths = _Categories()
+            self._equipment = _Categories()
+            # Хронологический порядок строк (устойчивый по order_ts) и ранг каждой строки в нем
+            self._order: Optional[np.ndarray] = None
+            self._rank: Optional[np.ndarray] = None
+            self._bulk_load(orders)
+
+    def order_added(self, order: Dict[str, Any]) -> None:
+        with self._lock:
+            self._append(order)
+            self._order = self._rank = None
+
+    def _bulk_load(self, orders: List[Dict[str, Any]]) -> None:
+        ts, district, depth_code, depth, cost = [], [], [], [], []
+        for order in orders:
+            row = len(ts)
+            ts.append(ensure_order_ts(order))
+            district.append(self._districts.code(order.get("district_name", UNKNOWN_DISTRICT)))
+            value = order.get("depth", 0)
+            depth_code.append(self._depths.code(value))
+            depth.append(numeric(value))
+            total_cost = numeric(order.get("total_cost", 0))
+            self._integral_cost = self._integral_cost and isinstance(total_cost, int)
+            cost.append(total_cost)
+            self._add_equipment(row, order)
+        self._ts.extend(ts)
+        self._district.extend(district)
+        self._depth_code.extend(depth_code)
+        self._depth.extend(depth)
+        self._cost.extend(cost)
+
+    def _append(self, order: Dict[str, Any]) -> None:
+        row = len(self._ts)
+        self._ts.append(ensure_order_ts(order))
+        self._district.append(self._districts.code(order.get("district_name", UNKNOWN_DISTRICT)))
+        value = order.get("depth", 0)
+        self._depth_code.append(self._depths.code(value))
+        self._depth.append(numeric(value))
+        total_cost = numeric(order.get("total_cost", 0))
+        self._integral_cost = self._integral_cost and isinstance(total_cost, int)
+        self._cost.append(total_cost)
+        self._add_equipment(row, order)
+
+    def _add_equipment(self, row: int, order: Dict[str, Any]) -> None:
+        pos = 0
+        for category, components in order.get("selected_equipment", {}).items():
+            for component in components:
+                self._equipment_row.append(row)
+                self._equipment_code.append(self._equipment.code(component))
+                self._equipment_pos.append(pos)
+                pos += 1
+        self._max_components = max(self._max_components, pos)
+
+    def _chronology(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._order is None:
+            self._order = np.argsort(self._ts.values, kind="stable")
+            self._rank = np.empty_like(self._order)
+            self._rank[self._order] = np.arange(len(self._order))
+        return self._order, self._rank
+
+    def query(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None, equipment_limit: int = 10) -> Dict[str, Any]:
+        """
+        Статистика за период в формате get_analytics_data()
+        """
+        with self._lock:
+            ts = self._ts.values
+            mask = np.ones(len(ts), dtype=bool)
+            if start_ts is not None:
+                mask &= ts >= start_ts
+            if end_ts is not None:
+                mask &= ts <= end_ts
+            _, rank = self._chronology()
+            # Номер первого появления значения: ранг заказа в хронологии (и позиция внутри заказа)
+            rows_rank = rank[mask]
+
+            district = self._district.values[mask]
+            district_counts = np.bincount(district, minlength=len(self._districts.values))
+            district_first = np.full(len(district_counts), len(ts), dtype=np.int64)
+            np.minimum.at(district_first, district, rows_rank)
+
+            depth_code = self._depth_code.values[mask]
+            depth_counts = np.bincount(depth_code, minlength=len(self._depths.values))
+            depth_first = np.full(len(depth_counts), len(ts), dtype=np.int64)
+            np.minimum.at(depth_first, depth_code, rows_rank)
+
+            selected = mask[self._equipment_row.values]
+            equipment = self._equipment_code.values[selected]
+            equipment_counts = np.bincount(equipment, minlength=len(self._equipment.values))
+            equipment_first = np.full(len(equipment_counts), (len(ts) + 1) * self._max_components, dtype=np.int64)
+            np.minimum.at(
+                equipment_first,
+                equipment,
+                rank[self._equipment_row.values[selected]] * self._max_components + self._equipment_pos.values[selected]
+            )
+
+            total_orders = int(mask.sum())
+            total_revenue = self._cost.values[mask].sum()
+            total_revenue = int(total_revenue) if self._integral_cost else float(total_revenue)
+            depth_sum = float(self._depth.values[mask].sum())
+
+            districts = self._districts.values
+            depths = self._depths.values
+            equipment_names = self._equipment.values
+            popular_districts = [
+                {"name": districts[code], "count": int(district_counts[code])}
+                for code in _rank(district_counts, district_first)
+            ]
+            popular_depths = [
+                {"depth": depths[code], "count": int(depth_counts[code])}
+                for code in _rank(depth_counts, depth_first)
+            ]
+            popular_equipment = [
+                {"name": equipment_names[code], "count": int(equipment_counts[code])}
+                for code in _rank(equipment_counts, equipment_first, equipment_limit)
+            ]
+
+        avg_order_cost = total_revenue / total_orders if total_orders > 0 else 0
+        avg_depth = depth_sum / total_orders if total_orders > 0 else 0
+        return {
+            "total_orders": total_orders,
+            "popular_districts": popular_districts,
+            "popular_depths": popular_depths,
+            "popular_equipment": popular_equipment,
+            "total_stats": {
+                "total_orders": total_orders,
+                "avg_order_cost": round(avg_order_cost, 2),
+                "total_revenue": total_revenue,
+                "avg_depth": round(avg_depth, 2)
+            }
+        }
+
+_columnar: Optional[ColumnarOrders] = None
+_columnar_lock = threading.Lock()
+
+def get_columnar() -> ColumnarOrders:
+    """
+    Колоночные данные, подписанные на хранилище заказов (создаются при первом обращении)
+    """
+    global _columnar
+    with _columnar_lock:
+        if _columnar is None:
+            columnar = ColumnarOrders()
+            get_storage().subscribe(columnar)
+            _columnar = columnar
+    # Изменения других процессов доставляются подписчикам при обращении
+    get_storage().refresh()
+    return _columnar
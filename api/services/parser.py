@@ -1,150 +1,155 @@
 import PyPDF2
 import re
 import os
-import json
-from typing import Dict, Any, List, Tuple
+import io
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, BinaryIO, Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 
-def parse_pdf_prices(pdf_path: str) -> Dict[str, Any]:
+from api.services.price_import import get_price_imports
+
+# Оборудование и цены: "Название: 12 500 ₽"
+EQUIPMENT_PATTERN = re.compile(r"([А-Яа-я\s№]+):\s*(\d+(?:\s*\d+)*)\s*₽")
+# Районы и базовые цены: "Название округ - 2 500 ₽/м"
+DISTRICT_PATTERN = re.compile(r"([А-Яа-я\s]+округ)[\s\-]*(\d+(?:\s*\d+)*)\s*₽/м")
+
+# Параллельный разбор: процессы и число страниц в одной задаче
+PRICE_PARSE_WORKERS = int(os.environ.get("PRICE_PARSE_WORKERS", os.cpu_count() or 1))
+PAGES_PER_TASK = 16
+
+class PageMatches(NamedTuple):
     """
-    Парсинг цен из PDF-файла
+    Найденные на странице позиции: (название, цена) оборудования и районов
     """
-    try:
-        # Открытие PDF-файла
-        with open(pdf_path, "rb") as file:
-            reader = PyPDF2.PdfReader(file)
-            
-            # Извлечение текста из всех страниц
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text()
-        
-        # Поиск цен и оборудования в тексте
-        # Это упрощенный пример, в реальном приложении нужно адаптировать регулярные выражения
-        # под конкретный формат PDF-файла с ценами
-        
-        # Поиск оборудования и цен
-        equipment_pattern = r"([А-Яа-я\s№]+):\s*(\d+(?:\s*\d+)*)\s*₽"
-        equipment_matches = re.findall(equipment_pattern, text)
-        
-        # Поиск районов и базовых цен
-        district_pattern = r"([А-Яа-я\s]+округ)[\s\-]*(\d+(?:\s*\d+)*)\s*₽/м"
-        district_matches = re.findall(district_pattern, text)
-        
-        # Формирование результата
-        result = {
-            "equipment_data": {},
-            "districts_data": []
-        }
-        
+    page: int
+    equipment: List[Tuple[str, str]]
+    districts: List[Tuple[str, str]]
+
+def _match_page(page: int, text: str) -> PageMatches:
+    return PageMatches(page, EQUIPMENT_PATTERN.findall(text), DISTRICT_PATTERN.findall(text))
+
+# Источник прайс-листа: путь к файлу или открытый двоичный файл (например, загрузка)
+PdfSource = Union[str, BinaryIO]
+# Прогресс разбора: (разобрано страниц, всего страниц)
+ProgressCallback = Callable[[int, int], None]
+
+# PDF, открытый в процессе-воркере (один раз на воркер, а не на задачу)
+_worker_reader: Optional[PyPDF2.PdfReader] = None
+
+def _open_worker_reader(source: Union[str, bytes]) -> None:
+    global _worker_reader
+    _worker_reader = PyPDF2.PdfReader(source if isinstance(source, str) else io.BytesIO(source))
+
+def _match_pages(start: int, stop: int) -> List[PageMatches]:
+    pages = _worker_reader.pages
+    return [_match_page(i, pages[i].extract_text() or "") for i in range(start, stop)]
+
+def iter_price_matches(
+    source: PdfSource,
+    workers: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Iterator[PageMatches]:
+    """
+    Позиции прайс-листа по страницам в порядке страниц.
+
+    Текст каждой страницы разбирается отдельно, без склейки всего документа
+    в одну строку. Большие файлы разбираются пачками страниц в пуле процессов,
+    результаты отдаются по мере готовности. Позиция, разорванная переходом
+    на следующую страницу, не распознается.
+    """
+    workers = PRICE_PARSE_WORKERS if workers is None else workers
+    reader = PyPDF2.PdfReader(source)
+    total = len(reader.pages)
+    if workers <= 1 or total <= PAGES_PER_TASK * 2:
+        for i, page in enumerate(reader.pages):
+            yield _match_page(i, page.extract_text() or "")
+            if progress is not None:
+                progress(i + 1, total)
+        return
+
+    # Воркерам передается путь или содержимое файла: открытый файл между процессами не передать
+    if not isinstance(source, str):
+        source.seek(0)
+        source = source.read()
+    starts = range(0, total, PAGES_PER_TASK)
+    stops = [min(start + PAGES_PER_TASK, total) for start in starts]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_open_worker_reader, initargs=(source,)) as executor:
+        for stop, chunk in zip(stops, executor.map(_match_pages, starts, stops)):
+            yield from chunk
+            if progress is not None:
+                progress(stop, total)
+
+def _classify(name: str) -> Tuple[str, str]:
+    """
+    Категория и компонент оборудования по названию (упрощенно)
+    """
+    lower = name.lower()
+    if "адаптер" in lower:
+        category = "адаптер №1" if "1" in name else "адаптер №2" if "2" in name else "адаптер №3"
+        component = "насос" if "насос" in lower else "колонка" if "колонка" in lower else name
+    elif "кессон" in lower:
+        category = "кессон №1" if "1" in name else "кессон №2" if "2" in name else "кессон №3"
+        component = name
+    else:
+        category = "другое"
+        component = name
+    return category, component
+
+def collect_prices(matches: Iterable[PageMatches]) -> Dict[str, Any]:
+    """
+    Сборка результата разбора из позиций по страницам
+    """
+    result = {
+        "equipment_data": {},
+        "districts_data": []
+    }
+    for page in matches:
         # Обработка найденного оборудования
-        for name, price in equipment_matches:
+        for name, price in page.equipment:
             name = name.strip()
-            price = int(price.replace(" ", ""))
-            
-            # Определение категории и компонента (упрощенно)
-            if "адаптер" in name.lower():
-                category = "адаптер №1" if "1" in name else "адаптер №2" if "2" in name else "адаптер №3"
-                component = "насос" if "насос" in name.lower() else "колонка" if "колонка" in name.lower() else name
-            elif "кессон" in name.lower():
-                category = "кессон №1" if "1" in name else "кессон №2" if "2" in name else "кессон №3"
-                component = name
-            else:
-                category = "другое"
-                component = name
-            
-            # Добавление в результат
-            if category not in result["equipment_data"]:
-                result["equipment_data"][category] = {}
-            
-            result["equipment_data"][category][component] = price
-        
+            category, component = _classify(name)
+            result["equipment_data"].setdefault(category, {})[component] = int(price.replace(" ", ""))
+
         # Обработка найденных районов
-        for name, price in district_matches:
-            name = name.strip()
-            price = int(price.replace(" ", ""))
-            
+        for name, price in page.districts:
             result["districts_data"].append({
-                "name": name,
-                "base_price": price
+                "name": name.strip(),
+                "base_price": int(price.replace(" ", ""))
             })
-        
-        return result
-    
+    return result
+
+def parse_price_list(
+    source: PdfSource,
+    workers: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """
+    Парсинг цен из PDF-файла или открытого файла (ошибки чтения PDF выбрасываются)
+    """
+    return collect_prices(iter_price_matches(source, workers, progress))
+
+def parse_pdf_prices(pdf_path: str) -> Dict[str, Any]:
+    """
+    Парсинг цен из PDF-файла
+    """
+    try:
+        return parse_price_list(pdf_path)
     except Exception as e:
         print(f"Ошибка при парсинге PDF: {str(e)}")
         return {"equipment_data": {}, "districts_data": []}
 
 def update_prices_from_pdf(pdf_path: str) -> Tuple[bool, str]:
     """
-    Обновление цен из PDF-файла
+    Обновление цен из PDF-файла (все изменения сохраняются одной операцией)
     """
     try:
         # Парсинг PDF
         parsed_data = parse_pdf_prices(pdf_path)
         
-        # Обновление данных об оборудовании
-        if parsed_data.get("equipment_data"):
-            equipment_file = os.path.join("data", "equipment.json")
-            
-            # Загрузка существующих данных
-            if os.path.exists(equipment_file):
-                with open(equipment_file, "r", encoding="utf-8") as file:
-                    equipment_data = json.load(file)
-            else:
-                equipment_data = {"equipment_data": {}, "cost_per_meter": 0}
-            
-            # Обновление данных
-            for category, components in parsed_data["equipment_data"].items():
-                if category not in equipment_data["equipment_data"]:
-                    equipment_data["equipment_data"][category] = {}
-                
-                for component, price in components.items():
-                    equipment_data["equipment_data"][category][component] = price
-            
-            # Сохранение обновленных данных
-            with open(equipment_file, "w", encoding="utf-8") as file:
-                json.dump(equipment_data, file, ensure_ascii=False, indent=4)
-        
-        # Обновление данных о районах
-        if parsed_data.get("districts_data"):
-            districts_file = os.path.join("data", "districts.json")
-            
-            # Загрузка существующих данных
-            if os.path.exists(districts_file):
-                with open(districts_file, "r", encoding="utf-8") as file:
-                    districts_data = json.load(file)
-            else:
-                districts_data = {"districts": []}
-            
-            # Обновление данных
-            for district_info in parsed_data["districts_data"]:
-                district_name = district_info["name"]
-                base_price = district_info["base_price"]
-                
-                # Поиск района по имени
-                district_found = False
-                for district in districts_data["districts"]:
-                    if district["name"] == district_name:
-                        district["base_price"] = base_price
-                        district_found = True
-                        break
-                
-                # Добавление нового района, если не найден
-                if not district_found:
-                    new_district = {
-                        "id": len(districts_data["districts"]) + 1,
-                        "name": district_name,
-                        "depths": [30, 40, 50, 60, 70, 80],  # Значения по умолчанию
-                        "base_price": base_price
-                    }
-                    districts_data["districts"].append(new_district)
-            
-            # Сохранение обновленных данных
-            with open(districts_file, "w", encoding="utf-8") as file:
-                json.dump(districts_data, file, ensure_ascii=False, indent=4)
+        diff = get_price_imports().run(parsed_data)
+        if diff.empty:
+            return True, "Цены не изменились"
         
         return True, "Цены успешно обновлены"
     
     except Exception as e:
         return False, f"Ошибка при обновлении цен: {str(e)}"
-
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import time
+import zipfile
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+
+from bot.utils.pdf_generator import load_order_pdf, PDF_WORKERS
+
+# Сколько PDF одновременно рендерится и держится в памяти при выгрузке архива
+PDF_EXPORT_WINDOW = PDF_WORKERS * 2
+
+class _ChunkBuffer:
+    """
+    Поток для zipfile, из которого готовые байты забираются кусками.
+
+    zipfile пишет в поток без seek заголовки с дескрипторами данных,
+    поэтому архив можно отдавать по мере записи файлов.
+    """
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+async def _load(order: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[bytes], Optional[str]]:
+    try:
+        content = await load_order_pdf(order)
+        return order, content, None if content else "PDF не создан"
+    except Exception as e:
+        return order, None, str(e) or type(e).__name__
+
+async def _order_pdfs(orders: List[Dict[str, Any]], window: int) -> AsyncIterator[Tuple[Dict[str, Any], Optional[bytes], Optional[str]]]:
+    """
+    PDF заказов в порядке готовности; одновременно в работе не больше window заказов
+    """
+    queue = iter(orders)
+    pending = set()
+    for order in queue:
+        pending.add(asyncio.ensure_future(_load(order)))
+        if len(pending) >= window:
+            break
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                order = next(queue, None)
+                if order is not None:
+                    pending.add(asyncio.ensure_future(_load(order)))
+                yield task.result()
+    finally:
+        # Клиент закрыл соединение: оставшиеся задачи не нужны
+        for task in pending:
+            task.cancel()
+
+async def stream_orders_zip(orders: List[Dict[str, Any]], window: int = PDF_EXPORT_WINDOW) -> AsyncIterator[bytes]:
+    """
+    ZIP-архив с PDF заказов, отдаваемый частями по мере рендеринга.
+
+    PDF берутся из кэша или рендерятся в пуле воркеров; в памяти одновременно
+    не больше window файлов. Файлы сохраняются без сжатия: содержимое PDF уже
+    сжато. Заказы, для которых PDF не удалось создать, перечислены в errors.txt.
+    """
+    started = time.perf_counter()
+    buffer = _ChunkBuffer()
+    errors = []
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        async for order, content, error in _order_pdfs(orders, window):
+            order_id = order.get("order_id")
+            if content is None:
+                errors.append(f"{order_id}: {error}")
+                continue
+            archive.writestr(f"order_{order_id}.pdf", content)
+            yield buffer.take()
+        if errors:
+            archive.writestr("errors.txt", "\n".join(errors) + "\n")
+    yield buffer.take()
+    logging.info(
+        f"Архив PDF: {len(orders) - len(errors)} из {len(orders)} заказов за {time.perf_counter() - started:.2f} с"
+    )
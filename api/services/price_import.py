@@ -0,0 +1,218 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from bot.utils.storage import StorageBackend, get_storage
+
+# Глубины нового района по умолчанию
+DEFAULT_DEPTHS = [30, 40, 50, 60, 70, 80]
+
+class PriceImportConflict(Exception):
+    """
+    Справочники изменились после построения разницы: ее нужно построить заново
+    """
+
+class PriceDiff:
+    """
+    Разница между разобранным прайс-листом и текущими ценами.
+
+    Хранит только изменения (новые и измененные позиции) и версию
+    справочников, от которой она построена: применить ее можно, только
+    если справочники с тех пор не менялись.
+    """
+    def __init__(
+        self,
+        base_version: int,
+        equipment: List[Dict[str, Any]],
+        districts: List[Dict[str, Any]],
+        unchanged: int
+    ):
+        self.id = uuid.uuid4().hex
+        self.created = time.time()
+        self.base_version = base_version
+        self.equipment = equipment
+        self.districts = districts
+        self.unchanged = unchanged
+
+    @property
+    def empty(self) -> bool:
+        return not self.equipment and not self.districts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "import_id": self.id,
+            "base_version": self.base_version,
+            "summary": {
+                "equipment_added": sum(1 for change in self.equipment if change["action"] == "add"),
+                "equipment_updated": sum(1 for change in self.equipment if change["action"] == "update"),
+                "districts_added": sum(1 for change in self.districts if change["action"] == "add"),
+                "districts_updated": sum(1 for change in self.districts if change["action"] == "update"),
+                "unchanged": self.unchanged
+            },
+            "equipment": self.equipment,
+            "districts": self.districts
+        }
+
+def district_name_index(districts_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Индекс районов по названию
+    """
+    return {district["name"]: district for district in districts_data.get("districts", [])}
+
+def build_price_diff(
+    parsed: Dict[str, Any],
+    equipment_data: Dict[str, Any],
+    districts_data: Dict[str, Any],
+    base_version: int
+) -> PriceDiff:
+    """
+    Разница между результатом разбора прайс-листа и текущими справочниками
+    """
+    unchanged = 0
+
+    equipment = []
+    current_equipment = equipment_data.get("equipment_data", {})
+    for category, components in parsed.get("equipment_data", {}).items():
+        current = current_equipment.get(category, {})
+        for component, price in components.items():
+            old_price = current.get(component)
+            if old_price == price:
+                unchanged += 1
+                continue
+            equipment.append({
+                "action": "add" if old_price is None else "update",
+                "category": category,
+                "component": component,
+                "old_price": old_price,
+                "new_price": price
+            })
+
+    # Если район встречается в прайс-листе несколько раз, действует последняя цена
+    prices: Dict[str, Any] = {}
+    for district_info in parsed.get("districts_data", []):
+        prices[district_info["name"]] = district_info["base_price"]
+
+    districts = []
+    by_name = district_name_index(districts_data)
+    for name, price in prices.items():
+        district = by_name.get(name)
+        if district is not None and district.get("base_price") == price:
+            unchanged += 1
+            continue
+        districts.append({
+            "action": "add" if district is None else "update",
+            "district_id": district["id"] if district is not None else None,
+            "name": name,
+            "old_price": district.get("base_price") if district is not None else None,
+            "new_price": price
+        })
+
+    return PriceDiff(base_version, equipment, districts, unchanged)
+
+def apply_price_diff(diff: PriceDiff, storage: StorageBackend) -> None:
+    """
+    Применение разницы одним сохранением справочников
+    (версия справочников увеличивается один раз)
+    """
+    equipment_data = None
+    if diff.equipment:
+        # Копия существующих данных
+        equipment_data = json.loads(json.dumps(storage.get_equipment_data()))
+        equipment_data.setdefault("equipment_data", {})
+        equipment_data.setdefault("cost_per_meter", 0)
+        for change in diff.equipment:
+            equipment_data["equipment_data"].setdefault(change["category"], {})[change["component"]] = change["new_price"]
+
+    districts_data = None
+    if diff.districts:
+        districts_data = json.loads(json.dumps(storage.get_districts_data()))
+        districts = districts_data.setdefault("districts", [])
+        by_name = district_name_index(districts_data)
+        next_id = max((district["id"] for district in districts), default=0) + 1
+        for change in diff.districts:
+            district = by_name.get(change["name"])
+            if district is not None:
+                district["base_price"] = change["new_price"]
+                continue
+            district = {
+                "id": next_id,
+                "name": change["name"],
+                "depths": list(DEFAULT_DEPTHS),
+                "base_price": change["new_price"]
+            }
+            districts.append(district)
+            by_name[district["name"]] = district
+            next_id += 1
+
+    if equipment_data is not None or districts_data is not None:
+        storage.save_reference_data(equipment_data=equipment_data, districts_data=districts_data)
+
+class PriceImports:
+    """
+    Импорт цен в два шага: предпросмотр разницы и ее применение.
+
+    Предпросмотр ничего не меняет и запоминает разницу под import_id.
+    Применение проверяет, что справочники не менялись с предпросмотра
+    (иначе PriceImportConflict), и сохраняет все изменения разом.
+    """
+    def __init__(self, storage: Optional[StorageBackend] = None, max_previews: int = 16):
+        self._storage = storage
+        self.max_previews = max_previews
+        self._previews: "OrderedDict[str, PriceDiff]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def storage(self) -> StorageBackend:
+        return self._storage or get_storage()
+
+    def preview(self, parsed: Dict[str, Any]) -> PriceDiff:
+        storage = self.storage
+        # Версия читается до данных: если справочники изменятся между чтениями, применение вернет конфликт
+        version = storage.get_reference_version()
+        diff = build_price_diff(parsed, storage.get_equipment_data(), storage.get_districts_data(), version)
+        with self._lock:
+            self._previews[diff.id] = diff
+            while len(self._previews) > self.max_previews:
+                self._previews.popitem(last=False)
+        return diff
+
+    def get(self, import_id: str) -> Optional[PriceDiff]:
+        with self._lock:
+            return self._previews.get(import_id)
+
+    def apply(self, diff: PriceDiff) -> int:
+        """
+        Применение разницы; возвращает новую версию справочников
+        """
+        storage = self.storage
+        with self._lock:
+            if storage.get_reference_version() != diff.base_version:
+                raise PriceImportConflict(
+                    f"Справочники изменились после предпросмотра {diff.id}, постройте разницу заново"
+                )
+            apply_price_diff(diff, storage)
+            self._previews.pop(diff.id, None)
+            return storage.get_reference_version()
+
+    def run(self, parsed: Dict[str, Any]) -> PriceDiff:
+        """
+        Импорт без предпросмотра: разница строится и сразу применяется
+        """
+        diff = self.preview(parsed)
+        if diff.empty:
+            with self._lock:
+                self._previews.pop(diff.id, None)
+            return diff
+        self.apply(diff)
+        return diff
+
+_price_imports: Optional[PriceImports] = None
+
+def get_price_imports() -> PriceImports:
+    global _price_imports
+    if _price_imports is None:
+        _price_imports = PriceImports()
+    return _price_imports
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from fastapi import UploadFile
+
+from bot.utils.workers import Job, WorkerPool
+from api.services.parser import parse_price_list
+
+# Ограничения загрузки прайс-листа
+PRICE_UPLOAD_MAX_MB = float(os.environ.get('PRICE_UPLOAD_MAX_MB', 20))
+# Сколько загрузки держится в памяти, остальное - во временном файле
+PRICE_UPLOAD_SPOOL_MB = float(os.environ.get('PRICE_UPLOAD_SPOOL_MB', 2))
+# Файлы больше этого размера разбираются фоновой задачей: ответ сразу с job_id
+PRICE_PARSE_SYNC_MB = float(os.environ.get('PRICE_PARSE_SYNC_MB', 1))
+PRICE_PARSE_QUEUE_LIMIT = int(os.environ.get('PRICE_PARSE_QUEUE_LIMIT', 8))
+PRICE_PARSE_TIMEOUT = float(os.environ.get('PRICE_PARSE_TIMEOUT', 300))
+
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+class UploadTooLarge(Exception):
+    """
+    Загруженный файл больше PRICE_UPLOAD_MAX_MB
+    """
+
+class _Progress:
+    __slots__ = ("filename", "size", "pages_done", "pages_total")
+
+    def __init__(self, filename: str, size: int):
+        self.filename = filename
+        self.size = size
+        self.pages_done = 0
+        self.pages_total: Optional[int] = None
+
+    def __call__(self, done: int, total: int) -> None:
+        self.pages_done = done
+        self.pages_total = total
+
+class PriceUploads:
+    """
+    Разбор загруженных прайс-листов вне цикла событий.
+
+    Загрузка копируется кусками в SpooledTemporaryFile: небольшие файлы
+    остаются в памяти, большие уходят во временный файл без имени
+    (одновременные загрузки с одинаковым именем не пересекаются).
+    Копия нужна потому, что UploadFile закрывается после ответа, а разбор
+    большого файла продолжается в фоне. Разбор идет в пуле потоков;
+    документы больше 32 страниц он сам делит между процессами.
+    """
+    def __init__(
+        self,
+        max_bytes: int = int(PRICE_UPLOAD_MAX_MB * 1024 * 1024),
+        spool_bytes: int = int(PRICE_UPLOAD_SPOOL_MB * 1024 * 1024),
+        sync_bytes: int = int(PRICE_PARSE_SYNC_MB * 1024 * 1024),
+        queue_limit: int = PRICE_PARSE_QUEUE_LIMIT,
+        timeout: float = PRICE_PARSE_TIMEOUT,
+        history: int = 100
+    ):
+        self.max_bytes = max_bytes
+        self.spool_bytes = spool_bytes
+        self.sync_bytes = sync_bytes
+        self.history = history
+        self.pool = WorkerPool("price-parse", workers=1, queue_limit=queue_limit, timeout=timeout, history=history)
+        self._lock = threading.Lock()
+        self._progress: "OrderedDict[str, _Progress]" = OrderedDict()
+
+    async def spool(self, upload: UploadFile) -> Tuple[tempfile.SpooledTemporaryFile, int]:
+        """
+        Копия загрузки и ее размер. Больше max_bytes - UploadTooLarge
+        """
+        if upload.size is not None and upload.size > self.max_bytes:
+            raise UploadTooLarge(self._too_large())
+        buffer = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        size = 0
+        try:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise UploadTooLarge(self._too_large())
+                if buffer._rolled:
+                    # Запись на диск - в потоке, чтобы не блокировать цикл событий
+                    await asyncio.to_thread(buffer.write, chunk)
+                else:
+                    buffer.write(chunk)
+        except BaseException:
+            buffer.close()
+            raise
+        buffer.seek(0)
+        return buffer, size
+
+    def _too_large(self) -> str:
+        return f"Файл больше {self.max_bytes / (1024 * 1024):g} МБ"
+
+    def submit(self, buffer: tempfile.SpooledTemporaryFile, filename: str, size: int) -> Job:
+        """
+        Разбор копии загрузки в пуле; копия закрывается после разбора.
+        При переполнении очереди выбрасывает PoolOverloaded
+        """
+        progress = _Progress(filename, size)
+
+        def parse() -> Dict[str, Any]:
+            with buffer:
+                return parse_price_list(buffer, progress=progress)
+
+        try:
+            job = self.pool.submit(parse, name="parse_price_list")
+        except Exception:
+            buffer.close()
+            raise
+        with self._lock:
+            self._progress[job.id] = progress
+            while len(self._progress) > self.history:
+                self._progress.popitem(last=False)
+        return job
+
+    def is_large(self, size: int) -> bool:
+        return size > self.sync_bytes
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Статус задачи разбора, прогресс по страницам и результат, если он готов
+        """
+        job = self.pool.get_job(job_id)
+        with self._lock:
+            progress = self._progress.get(job_id)
+        if job is None or progress is None:
+            return None
+        status = job.to_dict()
+        status.update({
+            "filename": progress.filename,
+            "size": progress.size,
+            "pages_done": progress.pages_done,
+            "pages_total": progress.pages_total
+        })
+        if status["status"] == "done":
+            status["result"] = job.result()
+        return status
+
+_price_uploads: Optional[PriceUploads] = None
+
+def get_price_uploads() -> PriceUploads:
+    global _price_uploads
+    if _price_uploads is None:
+        _price_uploads = PriceUploads()
+    return _price_uploads
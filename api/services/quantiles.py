@@ -0,0 +1,97 @@
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+class QuantileSketch:
+    """
+    Потоковый скетч квантилей с относительной точностью (по схеме DDSketch).
+
+    Значения раскладываются по логарифмическим корзинам: корзина i покрывает
+    (gamma^(i-1), gamma^i], поэтому оценка любого квантиля отличается от
+    точного значения не более чем на relative_accuracy. Скетчи с одинаковой
+    точностью объединяются сложением счетчиков корзин, что позволяет
+    хранить скетч на день и собирать из них недели и месяцы.
+    """
+    __slots__ = ("relative_accuracy", "_gamma", "_log_gamma", "_bins", "_negative", "_zero", "count", "min", "max", "_cache")
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._bins: Counter = Counter()
+        self._negative: Counter = Counter()
+        self._zero = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        # Оценки квантилей до следующего изменения: прошедшие дни не меняются
+        self._cache: Dict[Tuple[float, ...], List[Optional[float]]] = {}
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        # Середина корзины в смысле относительной ошибки
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def add(self, value: float) -> None:
+        if value > 0:
+            self._bins[self._key(value)] += 1
+        elif value < 0:
+            self._negative[self._key(-value)] += 1
+        else:
+            self._zero += 1
+        self._cache.clear()
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Нельзя объединить скетчи с разной точностью")
+        self._bins.update(other._bins)
+        self._negative.update(other._negative)
+        self._zero += other._zero
+        self._cache.clear()
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Оценка квантиля q (0..1); None для пустого скетча
+        """
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs: List[float]) -> List[Optional[float]]:
+        """
+        Оценки нескольких квантилей за один проход по корзинам
+        """
+        if self.count == 0:
+            return [None] * len(qs)
+        cached = self._cache.get(tuple(qs))
+        if cached is not None:
+            return list(cached)
+        # Корзины по возрастанию значений: отрицательные, ноль, положительные.
+        # Знак хранится явно: ключи корзин значений до 1 не больше нуля
+        bins = [(-1, key, count) for key, count in sorted(self._negative.items(), reverse=True)]
+        if self._zero:
+            bins.append((0, 0, self._zero))
+        bins.extend((1, key, count) for key, count in sorted(self._bins.items()))
+
+        # Один проход по корзинам для всех квантилей, значение корзины считается только для найденных
+        targets = sorted((q * (self.count - 1), i) for i, q in enumerate(qs))
+        result: List[Optional[float]] = [self.max] * len(qs)
+        bins_iter = iter(bins)
+        seen, sign, key = 0, 0, 0
+        for rank, i in targets:
+            while seen <= rank:
+                sign, key, count = next(bins_iter, (0, 0, None))
+                if count is None:
+                    break
+                seen += count
+            if seen > rank:
+                value = sign * self._value(key) if sign else 0.0
+                result[i] = min(max(value, self.min), self.max)
+        self._cache[tuple(qs)] = result
+        return list(result)
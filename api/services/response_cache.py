@@ -0,0 +1,199 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from bot.utils.order_events import OrderListener
+from bot.utils.storage import get_storage
+from api.services.quantiles import QuantileSketch
+
+# Кэшируемые GET-маршруты (пути; префиксы оканчиваются на "/") и данные,
+# от которых зависит ответ. PDF-отчет аналитики (/api/analytics/pdf) здесь
+# не кэшируется: готовые отчеты кэширует AnalyticsReport по хэшу данных
+CACHED_ROUTES: List[Tuple[str, str]] = [
+    ("/api/prices/equipment", "reference"),
+    ("/api/prices/districts", "reference"),
+    ("/api/analytics/stats", "orders"),
+    ("/api/analytics/timeseries", "orders"),
+    ("/api/analytics/popular-districts", "orders"),
+    ("/api/analytics/popular-depths", "orders"),
+    ("/api/analytics/popular-equipment", "orders"),
+]
+
+# Заголовки ответа, которые сохраняются вместе с телом
+_KEPT_HEADERS = ("content-type", "content-disposition")
+
+class _OrdersVersion(OrderListener):
+    """
+    Счетчик изменений заказов: растет на каждое сохранение заказа и смену статуса
+    """
+    def __init__(self):
+        self.version = 0
+
+    def reset(self, orders: List[Dict[str, Any]]) -> None:
+        self.version += 1
+
+    def order_added(self, order: Dict[str, Any]) -> None:
+        self.version += 1
+
+    def status_changed(self, order: Dict[str, Any], old_status: Any) -> None:
+        self.version += 1
+
+class CachedResponse:
+    """
+    Сериализованный ответ со строгим ETag
+    """
+    __slots__ = ("body", "headers", "etag")
+
+    def __init__(self, body: bytes, headers: Dict[str, str]):
+        self.body = body
+        self.headers = headers
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+class _RouteStats:
+    __slots__ = ("hits", "misses", "not_modified", "bypass", "latency")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bypass = 0
+        self.latency = QuantileSketch()
+
+class ResponseCache:
+    """
+    Кэш готовых ответов GET-маршрутов в памяти.
+
+    Ключ - путь, параметры запроса и версия данных маршрута (справочники
+    или заказы). После обновления цен, сохранения заказа или смены статуса
+    версия меняется, и следующий запрос строит ответ заново. Старые записи
+    вытесняются по LRU.
+    """
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _RouteStats] = {}
+        self._orders_version: Optional[_OrdersVersion] = None
+
+    def scope_for(self, path: str) -> Optional[str]:
+        for prefix, scope in CACHED_ROUTES:
+            if path == prefix or (prefix.endswith("/") and path.startswith(prefix)):
+                return scope
+        return None
+
+    def data_version(self, scope: str) -> int:
+        storage = get_storage()
+        if scope == "reference":
+            return storage.get_reference_version()
+        if self._orders_version is None:
+            listener = _OrdersVersion()
+            storage.subscribe(listener)
+            self._orders_version = listener
+        # Изменения других процессов доставляются подписчикам при обращении
+        storage.refresh()
+        return self._orders_version.version
+
+    def get(self, key: Tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Tuple, entry: CachedResponse) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, scope: Optional[str] = None) -> None:
+        """
+        Удаление записей маршрутов с данными scope (или всех записей)
+        """
+        with self._lock:
+            for key in [key for key in self._entries if scope is None or key[0] == scope]:
+                del self._entries[key]
+
+    def record(self, path: str, outcome: str, elapsed: float) -> None:
+        with self._lock:
+            stats = self._stats.get(path)
+            if stats is None:
+                stats = self._stats[path] = _RouteStats()
+            setattr(stats, outcome, getattr(stats, outcome) + 1)
+            stats.latency.add(elapsed * 1e3)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Доля попаданий и задержка ответа по маршрутам
+        """
+        with self._lock:
+            routes = {}
+            for path, stats in self._stats.items():
+                cached = stats.hits + stats.not_modified
+                total = cached + stats.misses + stats.bypass
+                p50, p99 = stats.latency.quantiles([0.5, 0.99])
+                routes[path] = {
+                    "requests": total,
+                    "hits": stats.hits,
+                    "not_modified": stats.not_modified,
+                    "misses": stats.misses,
+                    "bypass": stats.bypass,
+                    "hit_rate": round(cached / total, 4) if total else 0,
+                    "latency_ms_p50": round(p50, 3) if p50 is not None else None,
+                    "latency_ms_p99": round(p99, 3) if p99 is not None else None
+                }
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(len(entry.body) for entry in self._entries.values()),
+                "routes": routes
+            }
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """
+    Ответы кэшируемых маршрутов из ResponseCache с ETag и 304 на If-None-Match
+    """
+    async def dispatch(self, request: Request, call_next):
+        cache = get_response_cache()
+        scope = cache.scope_for(request.url.path) if request.method == "GET" else None
+        if scope is None:
+            return await call_next(request)
+
+        started = time.perf_counter()
+        path = request.url.path
+        key = (scope, path, tuple(sorted(request.query_params.multi_items())), cache.data_version(scope))
+        entry = cache.get(key)
+        outcome = "hits"
+        if entry is None:
+            response = await call_next(request)
+            # Ошибки и пустые ответы не кэшируются
+            if response.status_code != 200:
+                cache.record(path, "bypass", time.perf_counter() - started)
+                return response
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            headers = {name: value for name, value in response.headers.items() if name in _KEPT_HEADERS}
+            entry = CachedResponse(body, headers)
+            cache.put(key, entry)
+            outcome = "misses"
+
+        if entry.etag in request.headers.get("if-none-match", ""):
+            response = Response(status_code=304, headers={"ETag": entry.etag})
+            outcome = "not_modified"
+        else:
+            response = Response(content=entry.body, headers={**entry.headers, "ETag": entry.etag, "Cache-Control": "no-cache"})
+        cache.record(path, outcome, time.perf_counter() - started)
+        return response
+
+_response_cache: Optional[ResponseCache] = None
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
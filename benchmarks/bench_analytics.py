@@ -0,0 +1,121 @@
+"""
+Бенчмарк движков аналитики: полный проход по заказам (compute_analytics),
+дневные агрегаты и колоночные массивы numpy.
+
+Для каждого периода проверяется, что результаты движков совпадают с эталоном.
+Отдельно замеряется временной ряд за два года по дням: дневные агрегаты
+со скетчами квантилей против прохода по заказам с точными перцентилями.
+
+Запуск из корня проекта:
+    python benchmarks/bench_analytics.py [--orders 1000000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.utils import storage
+from bot.utils.order_store import OrderStore
+from bot.utils.order_time import date_range, SECONDS_PER_DAY
+from api.services.aggregates import OrderAggregates, PERCENTILES
+from api.services.analytics import compute_analytics
+from api.services.columnar import ColumnarOrders
+from api.services.quantiles import QuantileSketch
+from benchmarks.synthetic import make_orders
+
+PERIODS = [
+    ("все время", None, None),
+    ("год", "2023-01-01", "2023-12-31"),
+    ("месяц", "2024-06-01", "2024-06-30"),
+]
+
+def scan_timeseries(orders, start_ts: int, end_ts: int):
+    """
+    Временной ряд по дням проходом по заказам (точные перцентили)
+    """
+    days = {}
+    for order in orders:
+        if start_ts <= order["order_ts"] < end_ts:
+            days.setdefault(order["order_ts"] // SECONDS_PER_DAY, []).append(order["total_cost"])
+    result = {}
+    for day, costs in days.items():
+        costs.sort()
+        result[day] = [costs[int(q * (len(costs) - 1))] for q in PERCENTILES]
+    return result
+
+def check_sketch() -> None:
+    """
+    Квантили скетча для значений в (0, 1] (задержки попаданий в кэш в секундах)
+    и для смеси отрицательных, нулевых и положительных значений
+    """
+    for values in ([i / 1000 for i in range(1, 1001)], [-5.0, -0.25, 0.0, 0.0, 0.003, 0.5, 1.0, 40.0]):
+        sketch = QuantileSketch()
+        for value in values:
+            sketch.add(value)
+        qs = [0.0, 0.1, 0.5, 0.9, 0.99, 1.0]
+        for q, estimate in zip(qs, sketch.quantiles(qs)):
+            exact = sorted(values)[int(q * (len(values) - 1))]
+            assert abs(estimate - exact) <= sketch.relative_accuracy * abs(exact), (q, estimate, exact)
+
+def measure(fn, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    check_sketch()
+    orders = list(make_orders(args.orders))
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot = os.path.join(directory, "orders.json")
+        with open(snapshot, "w", encoding="utf-8") as file:
+            json.dump({"orders": orders}, file, ensure_ascii=False)
+        # Дневным агрегатам нужен индекс заказов для границы периода
+        storage._storage = storage.JsonStorage(OrderStore(snapshot, os.path.join(directory, "orders.journal.jsonl")))
+        orders = storage._storage.get_orders()
+
+        engines = {"агрегаты": OrderAggregates(), "numpy": ColumnarOrders()}
+        print(f"Заказов: {args.orders}")
+        for name, engine in engines.items():
+            started = time.perf_counter()
+            engine.reset(orders)
+            print(f"  построение ({name}): {time.perf_counter() - started:.2f} с")
+
+        for label, start_date, end_date in PERIODS:
+            start_ts, end_ts = date_range(start_date, end_date)
+            expected, legacy = measure(
+                lambda: compute_analytics(storage._storage.get_orders_in_range(start_ts, end_ts)), args.repeat
+            )
+            line = f"  {label:<10} заказов={expected['total_orders']:8d}  проход={legacy * 1e3:9.1f} мс"
+            for name, engine in engines.items():
+                result, elapsed = measure(lambda: engine.query(start_ts, end_ts), args.repeat)
+                status = "совпадает" if result == expected else "РАСХОЖДЕНИЕ"
+                line += f"  {name}={elapsed * 1e3:8.2f} мс ({status})"
+            print(line)
+
+        start_ts, end_ts = date_range("2023-01-01", "2024-12-31")
+        aggregates = engines["агрегаты"]
+        exact, scan = measure(lambda: scan_timeseries(orders, start_ts, end_ts), 1)
+        series, elapsed = measure(lambda: aggregates.timeseries(start_ts, end_ts, "day"), args.repeat)
+        # Наибольшая относительная ошибка перцентилей скетча
+        error = max(
+            abs(point[name] - value) / value
+            for point in series if point["orders"]
+            for name, value in zip(("p50", "p90", "p99"), exact[date_range(point["period"])[0] // SECONDS_PER_DAY])
+        )
+        print(
+            f"  ряд по дням за 2 года: точек={len(series)}  проход={scan * 1e3:9.1f} мс  "
+            f"агрегаты={elapsed * 1e3:8.2f} мс  ошибка перцентилей={error:.2%}"
+        )
+
+if __name__ == "__main__":
+    main()
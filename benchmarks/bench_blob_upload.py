@@ -0,0 +1,110 @@
+"""
+Нагрузочный тест загрузки PDF в хранилище файлов без сети.
+
+Локальный aiohttp-сервер отвечает как Vercel Blob API с задержкой
+и долей ответов 503. Сравниваются:
+  - новое соединение на каждую загрузку (как в vercel_blob.put);
+  - VercelBlobStorage с общим пулом соединений, ограничением
+    параллельности и повторами с разбросом задержки;
+  - LocalBlobStorage (каталог на диске) с той же имитацией сбоев.
+
+Сервер работает по HTTP без TLS, поэтому выигрыш пула соединений здесь
+меньше, чем с Vercel Blob, где каждое новое соединение - это TLS-рукопожатие.
+
+Запуск из корня проекта:
+    python benchmarks/bench_blob_upload.py [--uploads 500] [--concurrency 16] [--failure-rate 0.05]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.utils.blob_storage import BlobStorage, BlobUploadError, LocalBlobStorage, VercelBlobStorage
+
+PDF_SIZE = 17 * 1024
+
+def make_app(latency: float, failure_rate: float) -> web.Application:
+    async def upload(request: web.Request) -> web.Response:
+        await request.read()
+        await asyncio.sleep(latency)
+        if random.random() < failure_rate:
+            return web.Response(status=503)
+        return web.json_response({"url": f"http://blob.test/{request.query['pathname']}"})
+
+    app = web.Application()
+    app.router.add_put("/", upload)
+    return app
+
+class NewConnectionStorage(VercelBlobStorage):
+    """
+    Прежняя схема: отдельная сессия (и TLS/TCP-соединение) на каждую загрузку
+    """
+    async def _put(self, pathname: str, data: bytes, content_type: str) -> str:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            return await self._upload(session, pathname, data, content_type)
+
+async def run(storage: BlobStorage, uploads: int) -> float:
+    data = os.urandom(PDF_SIZE)
+
+    async def upload(i: int):
+        try:
+            return await storage.put(f"orders/order_{i}.pdf", data)
+        except BlobUploadError:
+            return None
+
+    started = time.perf_counter()
+    await asyncio.gather(*(upload(i) for i in range(uploads)))
+    elapsed = time.perf_counter() - started
+    await storage.close()
+    return elapsed
+
+def report(name: str, elapsed: float, uploads: int, storage: BlobStorage) -> None:
+    metrics = storage.metrics()
+    print(
+        f"  {name:<24} {uploads / elapsed:8.1f} загрузок/с  p50={metrics['latency_ms_p50']:7.1f} мс  "
+        f"p99={metrics['latency_ms_p99']:7.1f} мс  повторов={metrics['retries']:4d}  ошибок={metrics['failures']}"
+    )
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    runner = web.AppRunner(make_app(args.latency, args.failure_rate))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    api_url = f"http://127.0.0.1:{port}"
+
+    print(
+        f"Загрузок: {args.uploads} по {PDF_SIZE // 1024} КБ, параллельно: {args.concurrency}, "
+        f"задержка сервера: {args.latency * 1e3:.0f} мс, доля 503: {args.failure_rate:.0%}"
+    )
+    for name, storage in (
+        ("новое соединение", NewConnectionStorage(token="test", api_url=api_url, concurrency=args.concurrency)),
+        ("пул соединений", VercelBlobStorage(token="test", api_url=api_url, concurrency=args.concurrency)),
+    ):
+        report(name, await run(storage, args.uploads), args.uploads, storage)
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = LocalBlobStorage(
+            directory, latency=args.latency, failure_rate=args.failure_rate, concurrency=args.concurrency
+        )
+        report("локальный каталог", await run(storage, args.uploads), args.uploads, storage)
+
+    await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Нагрузочный тест обработки обновлений бота в нескольких процессах.
+
+Синтетические обновления (как в bench_webhook.py) раскладываются по
+процессам-обработчикам по chat_id через BotCluster. Бот в процессах
+работает с заглушкой сессии из bench_webhook.py (задержка Bot API
+--api-latency), состояния
+FSM - в общей базе SQLite. Для 1 и N процессов выводится общая скорость
+и скорость каждого процесса по его статистике.
+
+Прирост от процессов ограничен числом ядер: на одноядерной машине
+несколько процессов делят одно ядро.
+
+Запуск из корня проекта:
+    python benchmarks/bench_bot_workers.py [--updates 3000] [--workers 4]
+"""
+import argparse
+import asyncio
+import functools
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("BOT_WORKERS_STATS_INTERVAL", "0.2")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.cluster import BotCluster
+from bot.dispatcher import UpdateQueueFull, create_bot
+from bot.utils.fsm_storage import SqliteFsmStorage
+from benchmarks.bench_webhook import FakeSession, make_update
+
+def make_bot():
+    # Вызывается в процессе-обработчике: задержка передается через окружение
+    return create_bot("123456:bench", session=FakeSession(float(os.environ["BENCH_API_LATENCY"])))
+
+async def run(workers: int, updates: int, concurrency: int, fsm_path: str) -> None:
+    cluster = BotCluster(
+        workers=workers,
+        concurrency=concurrency,
+        queue_limit=1000,
+        bot_factory=make_bot,
+        storage_factory=functools.partial(SqliteFsmStorage, fsm_path)
+    )
+    cluster.start()
+    # Ожидание запуска процессов: первая статистика приходит после импорта и создания бота
+    while any(worker.get("pid") is None for worker in cluster.metrics()["workers"]):
+        await asyncio.sleep(0.1)
+
+    random.seed(42)
+    started = time.perf_counter()
+    for update_id in range(updates):
+        update = make_update(update_id)
+        while True:
+            try:
+                cluster.feed(update)
+                break
+            except UpdateQueueFull:
+                await asyncio.sleep(0.01)
+    while sum(worker.get("processed", 0) + worker.get("failed", 0) for worker in cluster.metrics()["workers"]) < updates:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    metrics = cluster.metrics()
+    await cluster.stop()
+
+    print(f"  процессов: {workers}  {updates / elapsed:7.0f} обн/с за {elapsed:.1f} с")
+    for worker in metrics["workers"]:
+        print(
+            f"    процесс {worker['worker']} (pid {worker['pid']}): отправлено {worker['sent']:5d}, "
+            f"обработано {worker['processed']:5d}, ошибок {worker['failed']}, "
+            f"{worker['processed'] / elapsed:6.0f} обн/с, p99 обработки {worker['handle_ms_p99']} мс"
+        )
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--api-latency", type=float, default=0.02)
+    args = parser.parse_args()
+    os.environ["BENCH_API_LATENCY"] = str(args.api_latency)
+
+    print(
+        f"Обновлений: {args.updates}, чатов в процессе одновременно: {args.concurrency}, "
+        f"задержка Bot API: {args.api_latency * 1e3:.0f} мс, ядер: {os.cpu_count()}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for workers in sorted({1, args.workers}):
+            await run(workers, args.updates, args.concurrency, os.path.join(directory, f"fsm_{workers}.db"))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+"""
+Бенчмарк хранилищ состояний FSM: пользователи параллельно проходят шаги
+мастера заказа (set_state, update_data, get_data, get_state - как обработчики).
+
+Сравниваются:
+  - MemoryStorage (без сохранения, нижняя граница);
+  - JSON-файл на сессию, записываемый при каждом изменении (через временный
+    файл, fsync и переименование);
+  - SqliteFsmStorage с записью при каждом изменении (FSM_FLUSH_INTERVAL=0);
+  - SqliteFsmStorage с отложенной записью пачками (по умолчанию).
+
+Запуск из корня проекта:
+    python benchmarks/bench_fsm_storage.py [--users 200] [--steps 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, Any, Mapping, Optional
+
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.states.order_states import OrderStates
+from bot.utils.fsm_storage import SqliteFsmStorage
+
+STATES = [
+    OrderStates.selecting_district,
+    OrderStates.selecting_depth,
+    OrderStates.selecting_equipment,
+    OrderStates.entering_contact_info
+]
+
+class JsonFileStorage(BaseStorage):
+    """
+    Наивное сохранение: JSON-файл на сессию, перезаписываемый при каждом изменении
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: StorageKey) -> str:
+        return os.path.join(self.directory, f"{key.bot_id}_{key.chat_id}_{key.user_id}.json")
+
+    def _read(self, key: StorageKey) -> Dict[str, Any]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {"state": None, "data": {}}
+
+    def _write(self, key: StorageKey, session: Dict[str, Any]) -> None:
+        path = self._path(key)
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(session, file, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        session = await asyncio.to_thread(self._read, key)
+        session["state"] = getattr(state, "state", state)
+        await asyncio.to_thread(self._write, key, session)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await asyncio.to_thread(self._read, key))["state"]
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        session = await asyncio.to_thread(self._read, key)
+        session["data"] = dict(data)
+        await asyncio.to_thread(self._write, key, session)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await asyncio.to_thread(self._read, key))["data"]
+
+    async def close(self) -> None:
+        pass
+
+async def run(name: str, storage: BaseStorage, users: int, steps: int) -> None:
+    latencies = []
+
+    async def user(user_id: int) -> None:
+        key = StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+        rng = random.Random(user_id)
+        for step in range(steps):
+            started = time.perf_counter()
+            # Как обработчик: состояние проверяет фильтр, данные читаются и дополняются
+            await storage.get_state(key)
+            data = await storage.get_data(key)
+            await storage.update_data(key, {
+                f"field_{step % 6}": rng.randint(1, 1000),
+                "total": data.get("total", 0) + 1,
+                "district_name": "Александровский район"
+            })
+            await storage.set_state(key, STATES[step % len(STATES)])
+            latencies.append((time.perf_counter() - started) * 1e3)
+            await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(users)))
+    await storage.close()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(
+        f"  {name:<28} {len(latencies) / elapsed:8.0f} шагов/с  "
+        f"p50={latencies[len(latencies) // 2]:7.2f} мс  p99={latencies[int(0.99 * (len(latencies) - 1))]:7.2f} мс"
+    )
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"Пользователей: {args.users}, шагов мастера: {args.steps} (шаг - get_state, get_data, update_data, set_state)")
+    with tempfile.TemporaryDirectory() as directory:
+        await run("память (MemoryStorage)", MemoryStorage(), args.users, args.steps)
+        await run("JSON-файл на изменение", JsonFileStorage(directory), args.users, args.steps)
+        await run(
+            "SQLite, запись на изменение",
+            SqliteFsmStorage(os.path.join(directory, "through.db"), flush_interval=0),
+            args.users, args.steps
+        )
+        storage = SqliteFsmStorage(os.path.join(directory, "back.db"))
+        await run("SQLite, отложенная запись", storage, args.users, args.steps)
+        stats = storage.stats()
+        print(f"    пачек записи: {stats['flushes']}, записано сессий: {stats['written']}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
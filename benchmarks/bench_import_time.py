@@ -0,0 +1,80 @@
+"""
+Проверка времени импорта при старте бота и API (python -X importtime).
+
+Для каждой точки входа импорт запускается в отдельном интерпретаторе.
+Из результата вычитаются модули, которые импортирует сам фреймворк
+(aiogram, fastapi): остаток - цена кода проекта и его зависимостей.
+
+Проверка падает (код возврата 1), если:
+  - при старте импортируется тяжелая зависимость PDF (matplotlib, fpdf2,
+    fontTools), которая должна загружаться при первом PDF;
+  - собственное время импорта превышает бюджет --budget-ms.
+
+Запуск из корня проекта:
+    python benchmarks/bench_import_time.py [--budget-ms 400] [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Точки входа: модули, которые импортируются при старте
+TARGETS = ["bot.handlers.order", "main"]
+# Модули фреймворков: их время не входит в бюджет проекта
+BASELINE = "aiogram, aiogram.types, aiogram.utils.keyboard, fastapi, fastapi.middleware.cors, uvicorn, dotenv"
+# Зависимости, которые не должны импортироваться при старте
+HEAVY = ("matplotlib", "fpdf", "fontTools", "numpy")
+
+def importtime(statement: str) -> dict:
+    """
+    Собственное время импорта модулей (мкс) по выводу -X importtime
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(self_us)
+    return modules
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=400)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    baseline = set()
+    for _ in range(args.runs):
+        baseline |= set(importtime(f"import {BASELINE}"))
+
+    failed = False
+    for target in TARGETS:
+        costs, heavy, slowest = [], set(), {}
+        for _ in range(args.runs):
+            modules = importtime(f"import {target}")
+            own = {name: us for name, us in modules.items() if name not in baseline}
+            costs.append(sum(own.values()) / 1e3)
+            heavy |= {name for name in modules if name.split(".")[0] in HEAVY}
+            for name, us in own.items():
+                slowest[name] = min(us, slowest.get(name, us))
+
+        cost = statistics.median(costs)
+        status = "OK" if cost <= args.budget_ms and not heavy else "ПРЕВЫШЕН"
+        print(f"{target}: собственный импорт {cost:.0f} мс (бюджет {args.budget_ms:.0f} мс) - {status}")
+        for name, us in sorted(slowest.items(), key=lambda item: -item[1])[:5]:
+            print(f"    {name:<40} {us / 1e3:7.1f} мс")
+        if heavy:
+            print(f"    тяжелые зависимости при старте: {', '.join(sorted({name.split('.')[0] for name in heavy}))}")
+        failed = failed or status != "OK"
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
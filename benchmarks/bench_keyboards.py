@@ -0,0 +1,102 @@
+"""
+Микробенчмарк клавиатур выбора района, глубины и оборудования на один callback.
+
+Сравниваются:
+  - построение клавиатуры при каждом обращении (как раньше): поиск
+    в справочнике, InlineKeyboardBuilder и определение типа грунта
+    для каждой кнопки глубины;
+  - готовая клавиатура из кэша (get_keyboard_cache()): проверка версии
+    справочных данных и словарь.
+
+Отдельно - время полной перестройки кэша после смены версии справочников.
+
+Запуск из корня проекта:
+    python benchmarks/bench_keyboards.py [--calls 2000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.keyboards.depth_kb import build_depths_keyboard, get_depths_keyboard
+from bot.keyboards.district_kb import build_districts_keyboard, get_districts_keyboard
+from bot.keyboards.equipment_kb import build_equipment_keyboard, get_simplified_equipment_keyboard, load_equipment_data
+from bot.keyboards.markup_cache import KeyboardCache, get_keyboard_cache
+from bot.utils import reference_data
+from bot.utils.storage import get_storage
+
+def measure(function, calls: int) -> float:
+    """
+    Среднее время вызова, мкс
+    """
+    started = time.perf_counter()
+    for i in range(calls):
+        function(i)
+    return (time.perf_counter() - started) / calls * 1e6
+
+def check_single_build() -> None:
+    """
+    Без смены справочных данных клавиатуры строятся один раз
+    """
+    cache = KeyboardCache()
+    cache.districts()
+    cache.equipment()
+    assert cache.stats()["builds"] == 1, cache.stats()
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    check_single_build()
+    storage = get_storage()
+    district_ids = [district["id"] for district in storage.get_districts()]
+    depth_buttons = sum(len(district.get("depths", [])) for district in storage.get_districts()) / len(district_ids)
+
+    cases = [
+        (
+            "районы",
+            lambda i: build_districts_keyboard(storage.get_districts()),
+            lambda i: get_districts_keyboard()
+        ),
+        (
+            "глубины района",
+            lambda i: build_depths_keyboard(storage.get_district(district_ids[i % len(district_ids)])),
+            lambda i: get_depths_keyboard(district_ids[i % len(district_ids)])
+        ),
+        (
+            "оборудование",
+            lambda i: build_equipment_keyboard(load_equipment_data()),
+            lambda i: get_simplified_equipment_keyboard()
+        )
+    ]
+
+    print(
+        f"Районов: {len(district_ids)}, кнопок глубины на район: {depth_buttons:.1f}, "
+        f"вызовов: {args.calls}, хранилище: {type(storage).__name__}"
+    )
+    # Прогрев: чтение справочников и первая сборка кэша
+    get_districts_keyboard()
+    for name, build, cached in cases:
+        built = measure(build, args.calls)
+        hit = measure(cached, args.calls)
+        print(f"  {name:<16} построение {built:8.1f} мкс  кэш {hit:6.1f} мкс  ({built / hit:5.0f}x)")
+
+    cache = get_keyboard_cache()
+    rebuilds = []
+    for _ in range(10):
+        # Смена версии справочников: следующее обращение перестраивает все клавиатуры
+        reference_data.invalidate()
+        started = time.perf_counter()
+        get_districts_keyboard()
+        rebuilds.append((time.perf_counter() - started) * 1e3)
+    print(
+        f"Перестройка кэша после смены версии: {statistics.median(rebuilds):.1f} мс (медиана), "
+        f"сборок: {cache.stats()['builds']}"
+    )
+
+if __name__ == "__main__":
+    main()
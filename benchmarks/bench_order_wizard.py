@@ -0,0 +1,121 @@
+"""
+Обращения к хранилищу FSM на шаг мастера заказа.
+
+Пользователи проходят мастер через диспетчер бота (те же роутеры, что в
+polling и вебхуке): новый расчет, район, глубина, тип техники, оборудование,
+ФИО и телефон, а также подтверждение и ввод контакта (process_contact_info).
+Бот работает с заглушкой сессии из bench_webhook.py, заказ не сохраняется
+и PDF не создается. Состояния - в SqliteFsmStorage с записью при каждом
+изменении (как удаленное хранилище: каждая операция - обращение).
+
+Для каждого шага выводятся операции хранилища на обновление
+(get_fsm_op_stats()) и среднее время обработки.
+
+Запуск из корня проекта:
+    python benchmarks/bench_order_wizard.py [--users 200]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram.types import Update
+
+from bot.dispatcher import create_bot, create_dispatcher
+from bot.handlers import order
+from bot.keyboards.depth_kb import get_depths_keyboard
+from bot.utils.fsm_storage import SqliteFsmStorage, get_fsm_op_stats
+from bot.utils.storage import get_storage
+from benchmarks.bench_webhook import FakeSession
+
+def wizard_steps() -> List[Tuple[str, str, str]]:
+    """
+    Шаги мастера: (название, вид обновления, текст или callback_data)
+    """
+    district_id = get_storage().get_districts()[0]["id"]
+    depth = get_depths_keyboard(district_id).inline_keyboard[0][0].callback_data
+    option = get_storage().get_equipment_data()["options"][0]["key"]
+    return [
+        ("новый расчет", "message", "🔍 Новый расчет"),
+        ("район", "callback", f"district_{district_id}"),
+        ("глубина", "callback", depth),
+        ("тип техники", "callback", "equipment_type_urb"),
+        ("оборудование", "callback", f"select_equipment_{option}"),
+        ("ФИО", "message", "Иванов Иван Иванович"),
+        ("телефон", "message", "+7 999 123-45-67"),
+        ("новый расчет", "message", "🔍 Новый расчет"),
+        ("район", "callback", f"district_{district_id}"),
+        ("глубина", "callback", depth),
+        ("тип техники", "callback", "equipment_type_urb"),
+        ("оборудование", "callback", f"select_equipment_{option}"),
+        ("подтверждение", "callback", "confirm_order"),
+        ("контакт (заказ)", "message", "+7 999 123-45-67")
+    ]
+
+def make_update(update_id: int, user_id: int, kind: str, payload: str) -> Dict[str, Any]:
+    user = {"id": user_id, "is_bot": False, "first_name": "Тест"}
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": user,
+        "text": payload
+    }
+    if kind == "message":
+        return {"update_id": update_id, "message": message}
+    message["from"] = {"id": 1, "is_bot": True, "first_name": "Bench"}
+    return {
+        "update_id": update_id,
+        "callback_query": {"id": str(update_id), "from": user, "chat_instance": "1", "message": message, "data": payload}
+    }
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+
+    # Заказ не сохраняется и PDF не ставится в очередь: измеряется работа с состоянием
+    order.save_order = lambda order_data: None
+    order.submit_order_pdf = lambda order_data: None
+
+    steps = wizard_steps()
+    stats = get_fsm_op_stats()
+    ops: List[Dict[str, int]] = [{} for _ in steps]
+    elapsed = [0.0] * len(steps)
+
+    with tempfile.TemporaryDirectory() as directory:
+        bot = create_bot("123456:bench", session=FakeSession(0))
+        dp = create_dispatcher(SqliteFsmStorage(os.path.join(directory, "fsm.db"), flush_interval=0))
+        update_id = 0
+        for user_id in range(1, args.users + 1):
+            for index, (_, kind, payload) in enumerate(steps):
+                update_id += 1
+                update = Update.model_validate(make_update(update_id, user_id, kind, payload), context={"bot": bot})
+                before = dict(stats.metrics()["ops"])
+                started = time.perf_counter()
+                await dp.feed_update(bot, update)
+                elapsed[index] += time.perf_counter() - started
+                for op, count in stats.metrics()["ops"].items():
+                    ops[index][op] = ops[index].get(op, 0) + count - before.get(op, 0)
+        await dp.storage.close()
+
+    print(f"Пользователей: {args.users}, состояния в SQLite с записью при каждом изменении")
+    for (name, _, _), step_ops, step_time in zip(steps, ops, elapsed):
+        detail = ", ".join(f"{op} {count / args.users:g}" for op, count in sorted(step_ops.items()) if count)
+        print(
+            f"  {name:<16} операций на обновление {sum(step_ops.values()) / args.users:4.1f}  "
+            f"{step_time / args.users * 1e3:6.2f} мс  ({detail})"
+        )
+    metrics = stats.metrics()
+    print(
+        f"Всего обновлений: {metrics['updates']}, операций на обновление: {metrics['ops_per_update']}, "
+        f"максимум: {metrics['ops_per_update_max']}"
+    )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Бенчмарк постраничного вывода /api/orders/all: полный проход по всем заказам.
+
+Сравниваются прежняя схема (сортировка всех заказов и срез на каждый запрос),
+offset по индексу дат и курсор (keyset) по индексу дат и по SQLite.
+
+Запуск из корня проекта:
+    python benchmarks/bench_pagination.py [--orders 1000000] [--limit 100]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.utils.order_index import OrderIndex, encode_cursor, decode_cursor
+from bot.utils.storage import SqliteStorage, _order_row
+from benchmarks.synthetic import make_orders
+
+def legacy_page(orders, offset: int, limit: int):
+    page = sorted(orders, key=lambda x: datetime.strptime(x["order_date"], "%d.%m.%Y %H:%M"), reverse=True)
+    return page[offset:offset + limit]
+
+def walk_cursor(get_page, limit: int):
+    """
+    Проход по всем страницам через next_cursor; возвращает число страниц и время
+    """
+    started = time.perf_counter()
+    pages, cursor = 0, None
+    while True:
+        orders, _ = get_page(limit + 1, decode_cursor(cursor) if cursor else None)
+        pages += 1
+        if len(orders) <= limit:
+            break
+        cursor = encode_cursor(orders[limit - 1])
+    return pages, time.perf_counter() - started
+
+def walk_offset(get_page, total: int, limit: int):
+    started = time.perf_counter()
+    pages = 0
+    for offset in range(0, total, limit):
+        get_page(offset, limit)
+        pages += 1
+    return pages, time.perf_counter() - started
+
+def report(name: str, pages: int, elapsed: float) -> None:
+    print(f"  {name:<22} страниц={pages:6d}  всего={elapsed:8.2f} с  на страницу={elapsed / pages * 1e3:8.3f} мс")
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--legacy-pages", type=int, default=3)
+    args = parser.parse_args()
+
+    orders = list(make_orders(args.orders))
+    index = OrderIndex()
+    started = time.perf_counter()
+    index.load(orders)
+    print(f"Заказов: {args.orders}, построение индекса: {time.perf_counter() - started:.2f} с")
+
+    # Прежняя схема слишком медленная для полного прохода: оцениваем по нескольким страницам
+    started = time.perf_counter()
+    for page in range(args.legacy_pages):
+        legacy_page(orders, page * args.limit, args.limit)
+    per_page = (time.perf_counter() - started) / args.legacy_pages
+    total_pages = -(-args.orders // args.limit)
+    print(f"  {'сортировка + срез':<22} страниц={total_pages:6d}  всего≈{per_page * total_pages:8.0f} с  на страницу={per_page * 1e3:8.3f} мс")
+
+    report("индекс, offset", *walk_offset(lambda offset, limit: index.newest_first(None, offset, limit), args.orders, args.limit))
+    report("индекс, курсор", *walk_cursor(lambda limit, cursor: index.newest_first(None, 0, limit, cursor), args.limit))
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SqliteStorage(os.path.join(directory, "orders.db"))
+        conn = storage._connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO orders (order_id, user_id, status, order_date, order_ts, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (_order_row(order) for order in orders)
+            )
+        report("sqlite, курсор", *walk_cursor(lambda limit, cursor: storage.get_orders_page(None, 0, limit, cursor), args.limit))
+
+if __name__ == "__main__":
+    main()
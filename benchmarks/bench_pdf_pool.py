@@ -0,0 +1,81 @@
+"""
+Нагрузочный тест рендеринга PDF: задержка цикла событий, пока 50 PDF
+заказов рендерятся одновременно.
+
+Задержка цикла измеряется "пульсом": корутина каждые 5 мс засыпает и
+замеряет, насколько позже запланированного она проснулась. Так же
+ведет себя диспетчер aiogram: пока цикл занят, апдейты других
+пользователей ждут.
+
+Сравниваются рендеринг прямо в обработчике (прежняя схема), пул потоков
+и пул процессов. Загрузка в Vercel Blob не выполняется.
+
+Запуск из корня проекта:
+    python benchmarks/bench_pdf_pool.py [--pdfs 50] [--workers 4]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.utils.pdf_generator import render_order_pdf
+from bot.utils.workers import WorkerPool
+from benchmarks.synthetic import make_orders
+
+TICK = 0.005
+
+async def heartbeat(lags: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+async def run_scenario(render, orders) -> tuple:
+    lags, stop = [], asyncio.Event()
+    pulse = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(render(order) for order in orders))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await pulse
+    assert all(results), "не все PDF созданы"
+    return elapsed, lags
+
+def report(name: str, elapsed: float, lags: list) -> None:
+    lags_ms = sorted(lag * 1e3 for lag in lags)
+    p99 = lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))]
+    print(
+        f"  {name:<18} всего={elapsed:6.2f} с  задержка цикла: "
+        f"p50={statistics.median(lags_ms):7.2f} мс  p99={p99:7.2f} мс  max={lags_ms[-1]:8.2f} мс"
+    )
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdfs", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    orders = list(make_orders(args.pdfs, seed=random.randrange(1000)))
+    print(f"PDF: {args.pdfs}, воркеров: {args.workers}")
+
+    async def inline(order):
+        # Прежняя схема: синхронный рендеринг прямо в корутине обработчика
+        return render_order_pdf(order)
+
+    report("в обработчике", *await run_scenario(inline, orders))
+
+    for name, use_processes in (("пул потоков", False), ("пул процессов", True)):
+        pool = WorkerPool("bench", workers=args.workers, queue_limit=args.pdfs, timeout=120, use_processes=use_processes)
+        # Прогрев: запуск воркеров и импорт модулей в процессах в замер не входят
+        await asyncio.gather(*(pool.run(render_order_pdf, order) for order in orders[:args.workers]))
+        report(name, *await run_scenario(lambda order: pool.run(render_order_pdf, order), orders))
+        pool.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
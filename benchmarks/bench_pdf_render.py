@@ -0,0 +1,49 @@
+"""
+Бенчмарк рендеринга PDF заказов в одном процессе: PDF в секунду.
+
+"До" - прежняя схема: на каждый PDF создается новый документ, заново
+разбираются полные TTF-шрифты и рисуется вся страница. Промежуточный
+вариант - заготовка с полными шрифтами. "После" - заготовка процесса (get_order_template) с урезанными шрифтами и
+заранее нарисованными статичными частями страницы.
+
+Запуск из корня проекта:
+    python benchmarks/bench_pdf_render.py [--pdfs 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.utils.pdf_generator import OrderPdfTemplate, get_order_template
+from benchmarks.synthetic import make_orders
+
+def measure(render, orders) -> float:
+    started = time.perf_counter()
+    for order in orders:
+        assert render(order), "PDF не создан"
+    return len(orders) / (time.perf_counter() - started)
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdfs", type=int, default=200)
+    args = parser.parse_args()
+
+    orders = list(make_orders(args.pdfs))
+    print(f"PDF: {args.pdfs}")
+
+    # Прежняя схема: полные шрифты разбираются для каждого документа
+    before = measure(lambda order: OrderPdfTemplate().render(order), orders)
+    print(f"  без кэша:   {before:7.1f} PDF/с")
+
+    started = time.perf_counter()
+    template = get_order_template()
+    print(f"  подготовка заготовки: {(time.perf_counter() - started) * 1e3:.1f} мс (один раз на процесс)")
+    full = measure(get_order_template(None).render, orders)
+    print(f"  заготовка с полными шрифтами: {full:7.1f} PDF/с")
+    after = measure(template.render, orders)
+    print(f"  с заготовкой: {after:7.1f} PDF/с  (x{after / before:.1f})")
+
+if __name__ == "__main__":
+    main()
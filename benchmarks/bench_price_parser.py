@@ -0,0 +1,102 @@
+"""
+Бенчмарк разбора прайс-листа PDF: синтетический документ на 500 страниц.
+
+Сравниваются прежний разбор (склейка текста всех страниц в одну строку
+и регулярные выражения, компилируемые при вызове) и потоковый разбор
+по страницам: в одном процессе и в пуле процессов. Результаты должны
+совпадать. Страница заканчивается позицией оборудования: при склейке
+без разделителя строка "₽/м" в конце страницы сливалась со следующей
+("мКессон ..."), и прежний разбор давал лишние позиции.
+
+Запуск из корня проекта:
+    python benchmarks/bench_price_parser.py [--pages 500] [--workers 4]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PyPDF2
+from fpdf import FPDF
+
+from api.services.parser import parse_price_list, _classify
+
+FONT_PATH = os.path.join("fonts", "DejaVuSansCondensed.ttf")
+LINES_PER_PAGE = 40
+
+def make_price_list(path: str, pages: int, seed: int = 42) -> None:
+    """
+    Прайс-лист: на каждой странице позиции оборудования и базовые цены округов
+    """
+    rng = random.Random(seed)
+    components = ["насос", "колонка", "оголовок", "кабель", "трос"]
+    # Названия только из букв: так их распознают шаблоны разбора
+    def word() -> str:
+        return "".join(rng.choice("абвгдежзиклмнопрстуфхцчшэюя") for _ in range(rng.randint(5, 9)))
+    pdf = FPDF()
+    pdf.add_font("DejaVu", "", FONT_PATH)
+    pdf.set_font("DejaVu", "", 10)
+    for page in range(pages):
+        pdf.add_page()
+        for line in range(LINES_PER_PAGE):
+            if line % 8 == 3:
+                text = f"{word().capitalize()} округ - {rng.randint(1, 9)} {rng.randint(100, 999)} ₽/м"
+            elif line % 2:
+                text = f"Адаптер {rng.choice(components)} {word()}: {rng.randint(1, 99)} {rng.randint(100, 999)} ₽"
+            else:
+                text = f"Кессон {word()} {word()}: {rng.randint(10, 199)} {rng.randint(100, 999)} ₽"
+            pdf.cell(0, 6, text, new_x="LMARGIN", new_y="NEXT")
+    pdf.output(path)
+
+def legacy_parse(pdf_path: str) -> dict:
+    """
+    Прежняя реализация: текст всех страниц склеивается в одну строку
+    """
+    with open(pdf_path, "rb") as file:
+        reader = PyPDF2.PdfReader(file)
+        text = ""
+        for page in reader.pages:
+            text += page.extract_text()
+
+    equipment_matches = re.findall(r"([А-Яа-я\s№]+):\s*(\d+(?:\s*\d+)*)\s*₽", text)
+    district_matches = re.findall(r"([А-Яа-я\s]+округ)[\s\-]*(\d+(?:\s*\d+)*)\s*₽/м", text)
+    result = {"equipment_data": {}, "districts_data": []}
+    for name, price in equipment_matches:
+        name = name.strip()
+        category, component = _classify(name)
+        result["equipment_data"].setdefault(category, {})[component] = int(price.replace(" ", ""))
+    for name, price in district_matches:
+        result["districts_data"].append({"name": name.strip(), "base_price": int(price.replace(" ", ""))})
+    return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "prices.pdf")
+        started = time.perf_counter()
+        make_price_list(path, args.pages)
+        print(f"Прайс-лист: {args.pages} страниц, {os.path.getsize(path) // 1024} КБ (создан за {time.perf_counter() - started:.1f} с)")
+
+        started = time.perf_counter()
+        expected = legacy_parse(path)
+        legacy = time.perf_counter() - started
+        print(f"  склейка текста:          {legacy:6.2f} с")
+
+        for name, workers in (("по страницам", 1), (f"пул из {args.workers} процессов", args.workers)):
+            started = time.perf_counter()
+            result = parse_price_list(path, workers=workers)
+            elapsed = time.perf_counter() - started
+            status = "совпадает" if result == expected else "РАСХОЖДЕНИЕ"
+            print(f"  {name:<24} {elapsed:6.2f} с  (x{legacy / elapsed:.1f}, {status})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Нагрузочный тест загрузки прайс-листов: не мешает ли разбор больших PDF
+остальным запросам API.
+
+Параллельно с загрузками больших прайс-листов клиент опрашивает дешевый
+маршрут (/ping) и измеряет его задержку. Сравниваются:
+  - прежний обработчик: файл целиком в память, запись в data/temp
+    и разбор прямо в цикле событий;
+  - POST /api/prices/parse-pdf: копия загрузки в SpooledTemporaryFile,
+    разбор в пуле, для больших файлов - job_id и опрос статуса.
+
+Запуск из корня проекта:
+    python benchmarks/bench_price_upload.py [--pages 300] [--uploads 4]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI, File, UploadFile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.routes import prices
+from api.services.parser import parse_price_list
+from benchmarks.bench_price_parser import make_price_list
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(prices.router, prefix="/api/prices")
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.post("/legacy/parse-pdf")
+    async def legacy_parse_pdf(file: UploadFile = File(...)):
+        with tempfile.TemporaryDirectory() as directory:
+            temp_file_path = os.path.join(directory, file.filename)
+            with open(temp_file_path, "wb") as temp_file:
+                temp_file.write(await file.read())
+            return parse_price_list(temp_file_path, workers=1)
+
+    return app
+
+async def upload(client: httpx.AsyncClient, url: str, content: bytes) -> None:
+    response = await client.post(url, files={"file": ("prices.pdf", content, "application/pdf")})
+    if response.status_code == 202:
+        status_url = response.json()["status_url"]
+        while True:
+            await asyncio.sleep(0.05)
+            status = (await client.get(status_url)).json()
+            if status["status"] not in ("queued", "running"):
+                break
+        response.raise_for_status()
+        assert status["status"] == "done", status
+    else:
+        response.raise_for_status()
+
+async def run(client: httpx.AsyncClient, url: str, content: bytes, uploads: int) -> None:
+    latencies = []
+    started = time.perf_counter()
+    task = asyncio.gather(*(upload(client, url, content) for _ in range(uploads)))
+    # Задержка считается от момента, когда запрос должен был уйти: остановка
+    # цикла событий (разбор в обработчике) тоже входит в задержку
+    while not task.done():
+        due = time.perf_counter() + 0.01
+        await asyncio.sleep(0.01)
+        await client.get("/ping")
+        latencies.append((time.perf_counter() - due) * 1e3)
+    await task
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(
+        f"  {url:<24} {elapsed:6.2f} с  /ping: p50={statistics.median(latencies):7.1f} мс  "
+        f"p99={latencies[int(0.99 * (len(latencies) - 1))]:7.1f} мс  max={latencies[-1]:7.1f} мс"
+    )
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--uploads", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "prices.pdf")
+        make_price_list(path, args.pages)
+        with open(path, "rb") as file:
+            content = file.read()
+    print(f"Загрузок: {args.uploads} по {len(content) // 1024} КБ ({args.pages} страниц)")
+
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        for url in ("/legacy/parse-pdf", "/api/prices/parse-pdf"):
+            await run(client, url, content, args.uploads)
+
+if __name__ == "__main__":
+    asyncio.run(main())
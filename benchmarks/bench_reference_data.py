@@ -0,0 +1,75 @@
+"""
+Микробенчмарк обработки callback выбора района/глубины.
+
+Имитирует одновременный всплеск из 1000 пользователей: каждый callback
+находит район по ID и строит список глубин, как это делают
+process_district_selection, get_depths_keyboard и process_depth_selection.
+
+Запуск из корня проекта:
+    python benchmarks/bench_reference_data.py [--users 1000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.utils import reference_data
+
+def lookup_uncached(district_id: int):
+    # Прежнее поведение: полный разбор districts.json на каждое обращение
+    with open(reference_data.DISTRICTS_FILE, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    return next((d for d in data.get("districts", []) if d["id"] == district_id), None)
+
+def lookup_cached(district_id: int):
+    return reference_data.get_district(district_id)
+
+async def callback(lookup, district_id: int) -> float:
+    started = time.perf_counter()
+    # Выбор района, клавиатура глубин и выбор глубины: три обращения к справочнику
+    buttons = []
+    for _ in range(3):
+        district = lookup(district_id)
+        buttons = [f"depth_{depth}" for depth in (district.get("depths", []) if district else [])]
+    elapsed = time.perf_counter() - started
+    if not buttons:
+        raise ValueError(f"У района {district_id} нет глубин")
+    await asyncio.sleep(0)
+    return elapsed
+
+async def burst(lookup, users: int, district_ids):
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(
+        callback(lookup, district_ids[i % len(district_ids)]) for i in range(users)
+    ))
+    return latencies, time.perf_counter() - started
+
+def report(name: str, latencies, total: float) -> None:
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{name:<10} mean={statistics.mean(latencies) * 1e6:9.1f} мкс  "
+        f"p99={p99 * 1e6:9.1f} мкс  всплеск={total * 1e3:8.1f} мс"
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+
+    district_ids = [d["id"] for d in reference_data.get_districts()]
+    if not district_ids:
+        print(f"Нет данных в {reference_data.DISTRICTS_FILE}")
+        return
+
+    print(f"Одновременных пользователей: {args.users}")
+    report("до", *asyncio.run(burst(lookup_uncached, args.users, district_ids)))
+    report("после", *asyncio.run(burst(lookup_cached, args.users, district_ids)))
+
+if __name__ == "__main__":
+    main()
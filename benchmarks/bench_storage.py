@@ -0,0 +1,74 @@
+"""
+Бенчмарк движков хранения заказов: JSON (снапшот + журнал) и SQLite.
+
+Для каждого размера измеряется поиск заказа по ID, поиск заказов
+пользователя и добавление одного заказа.
+
+Запуск из корня проекта:
+    python benchmarks/bench_storage.py [--sizes 10000,100000,1000000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.utils.order_store import OrderStore
+from bot.utils.storage import JsonStorage, SqliteStorage, _order_row
+from benchmarks.synthetic import make_orders
+
+def build_json(directory: str, orders) -> JsonStorage:
+    snapshot = os.path.join(directory, "orders.json")
+    with open(snapshot, "w", encoding="utf-8") as file:
+        json.dump({"orders": orders}, file, ensure_ascii=False)
+    return JsonStorage(OrderStore(snapshot, os.path.join(directory, "orders.journal.jsonl")))
+
+def build_sqlite(directory: str, orders) -> SqliteStorage:
+    storage = SqliteStorage(os.path.join(directory, "orders.db"))
+    conn = storage._connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO orders (order_id, user_id, status, order_date, order_ts, data) VALUES (?, ?, ?, ?, ?, ?)",
+            [_order_row(dict(o)) for o in orders]
+        )
+    return storage
+
+def measure(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return (time.perf_counter() - started) / repeat
+
+def run(name: str, storage, orders, repeat: int) -> None:
+    # Первое обращение загружает данные, в замеры не входит
+    started = time.perf_counter()
+    storage.get_order(orders[0]["order_id"])
+    warmup = time.perf_counter() - started
+
+    by_id = measure(lambda i: storage.get_order(orders[i * 7919 % len(orders)]["order_id"]), repeat)
+    by_user = measure(lambda i: storage.get_user_orders(orders[i * 104729 % len(orders)]["user_id"]), repeat)
+    insert = measure(lambda i: storage.add_order(dict(orders[i], order_id=f"NEW{i:08d}")), repeat)
+
+    print(
+        f"  {name:<7} загрузка={warmup * 1e3:9.1f} мс  по id={by_id * 1e6:10.1f} мкс  "
+        f"по user_id={by_user * 1e6:10.1f} мкс  вставка={insert * 1e6:9.1f} мкс"
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        orders = list(make_orders(size))
+        print(f"Заказов: {size}")
+        with tempfile.TemporaryDirectory() as directory:
+            run("json", build_json(directory, orders), orders, args.repeat)
+            run("sqlite", build_sqlite(directory, orders), orders, args.repeat)
+
+if __name__ == "__main__":
+    main()
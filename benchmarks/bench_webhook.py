@@ -0,0 +1,159 @@
+"""
+Нагрузочный тест вебхука бота: синтетические обновления Telegram
+отправляются в /api/telegram/webhook.
+
+Бот работает с заглушкой сессии: запросы к Bot API не уходят в сеть,
+а отвечают с задержкой --api-latency (как настоящий Telegram). Обработчики -
+те же роутеры, что и в режиме polling. Сравниваются:
+  - обработка до ответа (WEBHOOK_WORKERS=0): Telegram ждет, пока
+    обработчик отправит все сообщения;
+  - очередь с обработчиками: ответ сразу после постановки в очередь.
+
+Как и Telegram, генератор держит ограниченное число одновременных
+запросов и повторяет доставку после 503. Для каждого режима - задержка
+ответа вебхука (p50/p99), скорость приема и скорость обработки обновлений.
+
+Запуск из корня проекта:
+    python benchmarks/bench_webhook.py [--updates 1000] [--concurrency 40] [--workers 32]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Any, AsyncGenerator, Dict, Optional
+
+os.environ.setdefault("BOT_MODE", "webhook")
+os.environ.setdefault("WEBHOOK_SECRET", "bench-secret")
+
+import httpx
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, Message, User
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot import dispatcher
+from bot.dispatcher import SECRET_HEADER, UpdateQueue, create_bot, create_dispatcher
+from api.routes import telegram
+
+# Команды пользователей: справка, начало работы и выбор района (чтение справочников)
+TEXTS = ["/start", "/help", "ℹ️ Помощь", "🔍 Новый расчет"]
+# Пауза перед повторной доставкой после 503
+RETRY_DELAY = 0.5
+
+class FakeSession(BaseSession):
+    """
+    Сессия без сети: методы Bot API отвечают с задержкой latency
+    """
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.requests = 0
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        if method.__returning__ is User:
+            return User(id=1, is_bot=True, first_name="Bench", username="bench_bot")
+        if method.__returning__ is Message:
+            chat_id = getattr(method, "chat_id", 1)
+            # Каналы задаются по username: в ответе нужен числовой ID
+            chat_id = chat_id if isinstance(chat_id, int) else 1
+            return Message(message_id=1, date=int(time.time()), chat=Chat(id=chat_id, type="private"), text="ok")
+        return True
+
+    async def stream_content(self, url: str, headers=None, timeout: int = 30, chunk_size: int = 65536,
+                             raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+def make_update(update_id: int) -> Dict[str, Any]:
+    chat_id = random.randint(1, 10_000)
+    text = random.choice(TEXTS)
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": "Тест"},
+        "text": text
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+    return {"update_id": update_id, "message": message}
+
+async def run(name: str, queue: UpdateQueue, updates: int, concurrency: int) -> None:
+    dispatcher._update_queue = queue
+    app = FastAPI()
+    app.include_router(telegram.router, prefix="/api/telegram")
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+    headers = {SECRET_HEADER: os.environ["WEBHOOK_SECRET"]}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def post(update_id: int) -> None:
+            update = make_update(update_id)
+            while True:
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post("/api/telegram/webhook", json=update, headers=headers)
+                    latencies.append((time.perf_counter() - started) * 1e3)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code != 503:
+                    return
+                # Как Telegram: доставка повторяется позже
+                await asyncio.sleep(RETRY_DELAY)
+
+        queue.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(post(i) for i in range(updates)))
+        acked = time.perf_counter() - started
+        await queue.stop(timeout=120)
+        processed = time.perf_counter() - started
+
+    latencies.sort()
+    metrics = queue.metrics()
+    print(
+        f"  {name:<22} ответ вебхука p50={latencies[len(latencies) // 2]:7.1f} мс  "
+        f"p99={latencies[int(0.99 * (len(latencies) - 1))]:7.1f} мс  "
+        f"прием {updates / acked:7.0f} обн/с  обработка {metrics['processed'] / processed:6.0f} обн/с  "
+        f"ответы {statuses}  ошибок {metrics['failed']}"
+    )
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--queue-limit", type=int, default=1000)
+    parser.add_argument("--api-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    random.seed(42)
+    session = FakeSession(args.api_latency)
+    bot = create_bot("123456:bench", session=session)
+    # Роутеры подключаются к одному диспетчеру, он общий для обоих режимов.
+    # Состояния в памяти: тест измеряет доставку, а не хранилище (см. bench_fsm_storage.py)
+    dp = create_dispatcher(MemoryStorage())
+
+    print(
+        f"Обновлений: {args.updates}, одновременных запросов Telegram: {args.concurrency}, "
+        f"задержка Bot API: {args.api_latency * 1e3:.0f} мс"
+    )
+    await run("обработка до ответа", UpdateQueue(bot, dp, workers=0), args.updates, args.concurrency)
+    await run(
+        f"очередь, {args.workers} обработчиков",
+        UpdateQueue(bot, dp, workers=args.workers, limit=args.queue_limit),
+        args.updates, args.concurrency
+    )
+    print(f"Запросов к Bot API: {session.requests}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
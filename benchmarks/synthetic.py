@@ -0,0 +1,50 @@
+"""
+Генерация синтетических заказов для бенчмарков
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator
+
+DISTRICTS = [
+    "Александровский район", "Балашихинский район", "Бронницы", "Видное",
+    "Дмитровский район", "Ступинский район", "Одинцовский район", "Раменский район"
+]
+EQUIPMENT = [("Летний вариант", 70000), ("Кессон", 180000), ("Адаптер", 120000)]
+COMPONENTS = {"адаптер №2": ["насос", "реле", "обвязка"], "кессон №1": ["кессон", "оголовок"]}
+
+def make_order(i: int, rng: random.Random, start: datetime, span_minutes: int) -> Dict[str, Any]:
+    depth = rng.choice([30, 40, 50, 60, 70, 80, 90, 100, 120, 150])
+    price_per_meter = rng.choice([2800, 2900, 3000, 3200, 3400])
+    equipment_name, equipment_price = rng.choice(EQUIPMENT)
+    order_date = start + timedelta(minutes=rng.randrange(span_minutes))
+    order = {
+        "order_id": f"{i:08X}",
+        "user_id": rng.randrange(1, 50_000),
+        "username": f"user{i}",
+        "full_name": "Тестовый Клиент",
+        "phone": "+79990000000",
+        "district_name": rng.choice(DISTRICTS),
+        "depth": depth,
+        "ground_type": rng.choice(["Песок", "Известняк"]),
+        "price_per_meter": price_per_meter,
+        "drilling_cost": depth * price_per_meter,
+        "equipment_name": equipment_name,
+        "equipment_price": equipment_price,
+        "total_cost": depth * price_per_meter + equipment_price,
+        "order_date": order_date.strftime("%d.%m.%Y %H:%M"),
+        "status": rng.choice(["new", "new", "in_progress", "completed"])
+    }
+    if rng.random() < 0.5:
+        category = rng.choice(list(COMPONENTS))
+        order["selected_equipment"] = {category: rng.sample(COMPONENTS[category], 2)}
+    return order
+
+def make_orders(count: int, seed: int = 42, years: int = 3) -> Iterator[Dict[str, Any]]:
+    """
+    Синтетические заказы, равномерно распределенные по последним years годам
+    """
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1) - timedelta(days=365 * years)
+    span_minutes = 365 * years * 24 * 60
+    for i in range(count):
+        yield make_order(i, rng, start, span_minutes)
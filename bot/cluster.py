@@ -0,0 +1,345 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+
+from bot.dispatcher import UpdateQueueFull, WEBHOOK_QUEUE_LIMIT, create_bot, create_dispatcher
+from bot.utils.fsm_storage import get_fsm_op_stats
+
+# Процессы-обработчики обновлений бота; 0 или 1 - все в одном процессе
+BOT_WORKERS = int(os.environ.get('BOT_WORKERS', 0))
+# Одновременно обрабатываемых чатов в одном процессе
+BOT_WORKER_CONCURRENCY = int(os.environ.get('BOT_WORKER_CONCURRENCY', 16))
+# Как часто процессы присылают статистику (секунды) и как часто она пишется в лог
+BOT_WORKERS_STATS_INTERVAL = float(os.environ.get('BOT_WORKERS_STATS_INTERVAL', 1))
+BOT_WORKERS_LOG_INTERVAL = float(os.environ.get('BOT_WORKERS_LOG_INTERVAL', 60))
+
+# Разделы обновления, в которых есть чат (в порядке проверки)
+_CHAT_SECTIONS = (
+    "message", "edited_message", "channel_post", "edited_channel_post",
+    "business_message", "edited_business_message"
+)
+
+def update_chat_id(update: Dict[str, Any]) -> Optional[int]:
+    """
+    ID чата (или пользователя, если чата нет) из обновления в виде JSON
+    """
+    for section in _CHAT_SECTIONS:
+        message = update.get(section)
+        if message:
+            return message["chat"]["id"]
+    callback = update.get("callback_query")
+    if callback:
+        message = callback.get("message")
+        if message:
+            return message["chat"]["id"]
+        return callback["from"]["id"]
+    for payload in update.values():
+        if isinstance(payload, dict):
+            chat = payload.get("chat")
+            if isinstance(chat, dict) and "id" in chat:
+                return chat["id"]
+            user = payload.get("from") or payload.get("user")
+            if isinstance(user, dict) and "id" in user:
+                return user["id"]
+    return None
+
+def shard_for(update: Dict[str, Any], shards: int) -> int:
+    """
+    Номер процесса для обновления: все обновления чата попадают в один процесс
+    """
+    chat_id = update_chat_id(update)
+    return (chat_id if chat_id is not None else update.get("update_id", 0)) % shards
+
+class _WorkerStats:
+    def __init__(self, worker: int, history: int = 1000):
+        self.worker = worker
+        self.processed = 0
+        self.failed = 0
+        self.handle: deque = deque(maxlen=history)
+        self.started = time.monotonic()
+
+    def snapshot(self, queued: int) -> Dict[str, Any]:
+        ordered = sorted(self.handle)
+        def percentile(q: float) -> Optional[float]:
+            return round(ordered[int(q * (len(ordered) - 1))] * 1e3, 2) if ordered else None
+        return {
+            "worker": self.worker,
+            "pid": os.getpid(),
+            "processed": self.processed,
+            "failed": self.failed,
+            "queued": queued,
+            "uptime": round(time.monotonic() - self.started, 1),
+            "handle_ms_p50": percentile(0.5),
+            "handle_ms_p99": percentile(0.99),
+            "fsm_ops_per_update": get_fsm_op_stats().metrics()["ops_per_update"]
+        }
+
+async def _serve(
+    worker: int,
+    inbox: multiprocessing.Queue,
+    stats_queue: multiprocessing.Queue,
+    concurrency: int,
+    bot_factory: Callable[[], Bot],
+    storage_factory: Optional[Callable[[], BaseStorage]]
+) -> None:
+    from bot.utils.pdf_generator import start_pdf_warm_up
+
+    bot = bot_factory()
+    dp = create_dispatcher(storage_factory() if storage_factory else None)
+    stats = _WorkerStats(worker)
+    # Полосы: чат всегда обрабатывается одной полосой, поэтому его обновления идут по порядку
+    lanes: List[asyncio.Queue] = [asyncio.Queue(maxsize=64) for _ in range(concurrency)]
+    reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"bot-worker-{worker}")
+    loop = asyncio.get_running_loop()
+
+    async def lane_worker(lane: asyncio.Queue) -> None:
+        while True:
+            update = await lane.get()
+            started = time.perf_counter()
+            try:
+                await dp.feed_update(bot, update)
+                stats.processed += 1
+            except Exception as e:
+                stats.failed += 1
+                logging.error(f"Процесс {worker}: ошибка обработки обновления {update.update_id}: {e}", exc_info=True)
+            finally:
+                stats.handle.append(time.perf_counter() - started)
+                lane.task_done()
+
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(BOT_WORKERS_STATS_INTERVAL)
+            stats_queue.put(stats.snapshot(sum(lane.qsize() for lane in lanes)))
+
+    tasks = [asyncio.create_task(lane_worker(lane)) for lane in lanes]
+    tasks.append(asyncio.create_task(report()))
+    start_pdf_warm_up()
+    logging.info(f"Процесс бота {worker} (pid {os.getpid()}) запущен, полос: {concurrency}")
+
+    try:
+        while True:
+            payload = await loop.run_in_executor(reader, inbox.get)
+            if payload is None:
+                break
+            try:
+                data = json.loads(payload)
+                update = Update.model_validate(data, context={"bot": bot})
+            except ValueError as e:
+                stats.failed += 1
+                logging.error(f"Процесс {worker}: некорректное обновление: {e}")
+                continue
+            chat_id = update_chat_id(data)
+            lane = lanes[(chat_id if chat_id is not None else update.update_id) % concurrency]
+            await lane.put(update)
+
+        # Остановка: принятые обновления дорабатываются
+        for lane in lanes:
+            await lane.join()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        stats_queue.put(stats.snapshot(0))
+        reader.shutdown(wait=False)
+        await dp.storage.close()
+        await bot.session.close()
+
+def _worker_main(*args) -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    try:
+        asyncio.run(_serve(*args))
+    except KeyboardInterrupt:
+        pass
+
+class BotCluster:
+    """
+    Обработка обновлений бота в нескольких процессах.
+
+    Принимающий процесс (вебхук или polling) раскладывает обновления по
+    процессам-обработчикам по chat_id через очереди multiprocessing: все
+    обновления одного чата попадают в один процесс и внутри него в одну
+    полосу, поэтому обрабатываются по порядку, а разные чаты - параллельно
+    на нескольких ядрах. Заказы и состояния FSM процессы делят через общие
+    хранилища (журнал заказов или SQLite, SQLite для FSM): кэш состояний
+    каждого процесса согласован, потому что чат не переходит между процессами.
+
+    Процессы раз в BOT_WORKERS_STATS_INTERVAL присылают статистику:
+    обработано, ошибки, очередь и время обработки (metrics()).
+    """
+    def __init__(
+        self,
+        workers: int = BOT_WORKERS,
+        concurrency: int = BOT_WORKER_CONCURRENCY,
+        queue_limit: int = WEBHOOK_QUEUE_LIMIT,
+        bot_factory: Callable[[], Bot] = create_bot,
+        storage_factory: Optional[Callable[[], BaseStorage]] = None
+    ):
+        self.workers = workers
+        self.concurrency = concurrency
+        self.queue_limit = queue_limit
+        self.bot_factory = bot_factory
+        self.storage_factory = storage_factory
+        # spawn: процесс-обработчик не наследует цикл событий и потоки принимающего процесса
+        self._context = multiprocessing.get_context("spawn")
+        self._inboxes: List[multiprocessing.Queue] = []
+        self._processes: List[multiprocessing.Process] = []
+        self._stats_queue: Optional[multiprocessing.Queue] = None
+        self._stats_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats: Dict[int, Dict[str, Any]] = {}
+        self._rates: Dict[int, float] = {}
+        self._sent = [0] * workers
+        self._rejected = 0
+        self._last_log = time.monotonic()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._processes)
+
+    def start(self) -> None:
+        if self._processes:
+            return
+        self._stats_queue = self._context.Queue()
+        for worker in range(self.workers):
+            inbox = self._context.Queue(maxsize=self.queue_limit)
+            process = self._context.Process(
+                target=_worker_main,
+                args=(worker, inbox, self._stats_queue, self.concurrency, self.bot_factory, self.storage_factory),
+                name=f"bot-worker-{worker}",
+                daemon=True
+            )
+            process.start()
+            self._inboxes.append(inbox)
+            self._processes.append(process)
+        self._stats_thread = threading.Thread(target=self._collect_stats, name="bot-cluster-stats", daemon=True)
+        self._stats_thread.start()
+        logging.info(f"Запущено процессов бота: {self.workers}")
+
+    def feed(self, update: Dict[str, Any]) -> int:
+        """
+        Передача обновления (JSON от Telegram) процессу его чата; возвращает номер процесса.
+        Очередь процесса заполнена - UpdateQueueFull
+        """
+        self.start()
+        worker = shard_for(update, self.workers)
+        try:
+            self._inboxes[worker].put_nowait(json.dumps(update, ensure_ascii=False))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise UpdateQueueFull(f"Очередь процесса бота {worker} заполнена ({self.queue_limit})") from None
+        with self._lock:
+            self._sent[worker] += 1
+        return worker
+
+    async def put(self, update: Update) -> None:
+        self.feed(update.model_dump(mode="json", exclude_unset=True, by_alias=True))
+
+    async def start_polling(self, bot: Bot) -> None:
+        """
+        Polling в этом процессе с обработкой в процессах бота: обновления
+        только получаются и передаются процессу своего чата
+        """
+        self.start()
+        # Диспетчер без обработчиков
+        front = Dispatcher(storage=MemoryStorage())
+
+        @front.update.outer_middleware()
+        async def forward(handler, update: Update, data: Dict[str, Any]) -> None:
+            # Очередь процесса заполнена - получение новых обновлений ждет
+            while True:
+                try:
+                    await self.put(update)
+                    return
+                except UpdateQueueFull:
+                    await asyncio.sleep(0.1)
+
+        await bot.delete_webhook(drop_pending_updates=True)
+        # Без задач на обновление: порядок передачи совпадает с порядком получения
+        await front.start_polling(bot, handle_as_tasks=False)
+
+    def _collect_stats(self) -> None:
+        while True:
+            try:
+                snapshot = self._stats_queue.get()
+            except (EOFError, OSError):
+                return
+            if snapshot is None:
+                return
+            with self._lock:
+                previous = self._stats.get(snapshot["worker"])
+                if previous is not None and snapshot["uptime"] > previous["uptime"]:
+                    self._rates[snapshot["worker"]] = round(
+                        (snapshot["processed"] - previous["processed"]) / (snapshot["uptime"] - previous["uptime"]), 1
+                    )
+                self._stats[snapshot["worker"]] = snapshot
+                log = time.monotonic() - self._last_log >= BOT_WORKERS_LOG_INTERVAL
+                if log:
+                    self._last_log = time.monotonic()
+            if log:
+                for worker in self.metrics()["workers"]:
+                    logging.info(
+                        f"Процесс бота {worker['worker']}: {worker.get('updates_per_s') or 0} обн/с, "
+                        f"обработано {worker.get('processed', 0)}, в очереди {worker.get('queued', 0)}"
+                    )
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Статистика по процессам: отправлено, обработано, обновлений в секунду, время обработки
+        """
+        with self._lock:
+            workers = []
+            for worker in range(self.workers):
+                item = {"worker": worker, "sent": self._sent[worker]}
+                item.update(self._stats.get(worker, {}))
+                item["updates_per_s"] = self._rates.get(worker)
+                item["alive"] = worker < len(self._processes) and self._processes[worker].is_alive()
+                workers.append(item)
+            return {"workers": workers, "rejected": self._rejected}
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """
+        Остановка процессов: принятые обновления дорабатываются
+        """
+        if not self._processes:
+            return
+        for inbox in self._inboxes:
+            inbox.put(None)
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            await asyncio.to_thread(process.join, max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logging.warning(f"Процесс {process.name} не завершился за {timeout:.0f} с, остановка")
+                process.terminate()
+        # Итоговая статистика процессов уже в очереди: поток сбора дочитывает ее и завершается
+        self._stats_queue.put(None)
+        await asyncio.to_thread(self._stats_thread.join, 5)
+        self._processes = []
+        self._inboxes = []
+
+_bot_cluster: Optional[BotCluster] = None
+
+def get_bot_cluster() -> Optional[BotCluster]:
+    """
+    Общий кластер процессов бота (None, если BOT_WORKERS не больше 1)
+    """
+    global _bot_cluster
+    if _bot_cluster is None and BOT_WORKERS > 1:
+        _bot_cluster = BotCluster()
+    return _bot_cluster
@@ -0,0 +1,245 @@
+import asyncio
+import hmac
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.enums import ParseMode
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.types import Update
+
+from bot.handlers import common, district, depth, equipment, order
+from bot.utils.fsm_storage import CountingStorage, FsmOpsMiddleware, create_fsm_storage
+from bot.utils.order_session import OrderSessionMiddleware
+
+# Режим получения обновлений: polling (по умолчанию) или webhook
+BOT_MODE = os.environ.get('BOT_MODE', 'polling')
+# Публичный адрес вебхука (например, https://example.com/api/telegram/webhook);
+# если задан, вебхук регистрируется в Telegram при старте
+WEBHOOK_URL = os.environ.get('WEBHOOK_URL')
+# Секрет, который Telegram передает в заголовке X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET')
+# Прием обновлений без секрета (1 - разрешен; только для отладки: вебхук
+# без секрета принимает поддельные обновления от кого угодно)
+WEBHOOK_ALLOW_NO_SECRET = os.environ.get('WEBHOOK_ALLOW_NO_SECRET', '0') == '1'
+# Обработчики очереди обновлений; 0 - обработка до ответа Telegram
+# (для бессерверных платформ, где после ответа процесс замораживается)
+WEBHOOK_WORKERS = int(os.environ.get('WEBHOOK_WORKERS', 32))
+WEBHOOK_QUEUE_LIMIT = int(os.environ.get('WEBHOOK_QUEUE_LIMIT', 1000))
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+def create_bot(token: Optional[str] = None, **kwargs) -> Bot:
+    """
+    Бот с токеном из BOT_TOKEN
+    """
+    bot = Bot(token=token or os.environ.get("BOT_TOKEN"), **kwargs)
+    # Установка параметров по умолчанию
+    bot.parse_mode = ParseMode.HTML
+    return bot
+
+def create_dispatcher(storage: Optional[BaseStorage] = None) -> Dispatcher:
+    """
+    Диспетчер со всеми роутерами бота (одинаковый для polling и вебхука).
+    Состояния хранятся в FSM_STORAGE (по умолчанию SQLite); обращения
+    к хранилищу считаются на каждое обновление (get_fsm_op_stats())
+    """
+    dp = Dispatcher(storage=CountingStorage(storage or create_fsm_storage()), disable_fsm=True)
+    # Подсчет операций - снаружи промежуточного слоя FSM, чтобы учесть и его чтение состояния
+    dp.update.outer_middleware(FsmOpsMiddleware())
+    dp.update.outer_middleware(dp.fsm)
+    # Мастер заказа работает с состоянием через OrderSession: одна запись на обновление
+    dp.message.middleware(OrderSessionMiddleware())
+    dp.callback_query.middleware(OrderSessionMiddleware())
+
+    # Регистрация обработчиков
+    dp.include_router(common.router)
+    dp.include_router(district.router)
+    dp.include_router(depth.router)
+    dp.include_router(equipment.router)
+    dp.include_router(order.router)
+    return dp
+
+def check_secret(
+    token: Optional[str],
+    secret: Optional[str] = WEBHOOK_SECRET,
+    allow_no_secret: bool = WEBHOOK_ALLOW_NO_SECRET
+) -> bool:
+    """
+    Проверка секрета вебхука. Без секрета в настройках запросы отклоняются,
+    если прием без секрета не разрешен явно (WEBHOOK_ALLOW_NO_SECRET=1)
+    """
+    if not secret:
+        return allow_no_secret
+    return token is not None and hmac.compare_digest(token.encode(), secret.encode())
+
+class UpdateQueueFull(Exception):
+    """
+    Очередь обновлений заполнена: Telegram повторит доставку позже
+    """
+
+class UpdateQueue:
+    """
+    Ограниченная очередь обновлений вебхука с несколькими обработчиками.
+
+    Вебхук кладет обновление в очередь и сразу отвечает Telegram, а
+    обработчики передают обновления диспетчеру. Переполненная очередь
+    не растет: put() выбрасывает UpdateQueueFull, вебхук отвечает 503,
+    и Telegram повторяет доставку. Для обновлений считаются время
+    ожидания в очереди и время обработки.
+    """
+    def __init__(
+        self,
+        bot: Bot,
+        dp: Dispatcher,
+        workers: int = WEBHOOK_WORKERS,
+        limit: int = WEBHOOK_QUEUE_LIMIT,
+        history: int = 1000
+    ):
+        self.bot = bot
+        self.dp = dp
+        self.workers = workers
+        self.limit = limit
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._lock = threading.Lock()
+        self._wait: deque = deque(maxlen=history)
+        self._handle: deque = deque(maxlen=history)
+        self._accepted = 0
+        self._rejected = 0
+        self._processed = 0
+        self._failed = 0
+
+    @property
+    def inline(self) -> bool:
+        return self.workers <= 0
+
+    def start(self) -> None:
+        """
+        Запуск обработчиков в текущем цикле событий (повторный вызов ничего не делает)
+        """
+        if self.inline or self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.limit)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logging.info(f"Очередь обновлений вебхука: {self.workers} обработчиков, лимит {self.limit}")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Остановка обработчиков; обновления, уже принятые в очередь, дорабатываются,
+        после чего закрывается хранилище состояний
+        """
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logging.warning(f"Очередь обновлений не разобрана за {timeout:.0f} с: {self._queue.qsize()} осталось")
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+        # Запись отложенных изменений состояний
+        await self.dp.storage.close()
+
+    async def put(self, update: Update) -> None:
+        """
+        Прием обновления. В режиме без очереди обновление обрабатывается сразу
+        """
+        if self.inline:
+            with self._lock:
+                self._accepted += 1
+            await self._process(update, time.perf_counter())
+            return
+        self.start()
+        try:
+            self._queue.put_nowait((update, time.perf_counter()))
+        except asyncio.QueueFull:
+            with self._lock:
+                self._rejected += 1
+            raise UpdateQueueFull(f"Очередь обновлений заполнена ({self.limit})") from None
+        with self._lock:
+            self._accepted += 1
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            update, queued = await self._queue.get()
+            try:
+                await self._process(update, queued)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, update: Update, queued: float) -> None:
+        started = time.perf_counter()
+        failed = False
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception as e:
+            failed = True
+            logging.error(f"Ошибка обработки обновления {update.update_id}: {e}", exc_info=True)
+        finished = time.perf_counter()
+        with self._lock:
+            self._wait.append(started - queued)
+            self._handle.append(finished - started)
+            if failed:
+                self._failed += 1
+            else:
+                self._processed += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Принятые, отклоненные и обработанные обновления, время ожидания и обработки (мс)
+        """
+        with self._lock:
+            def percentile(values: deque, q: float) -> Optional[float]:
+                ordered = sorted(values)
+                return round(ordered[int(q * (len(ordered) - 1))] * 1e3, 2) if ordered else None
+            return {
+                "workers": self.workers,
+                "queue_limit": self.limit,
+                "queued": self._queue.qsize() if self._queue is not None else 0,
+                "accepted": self._accepted,
+                "rejected": self._rejected,
+                "processed": self._processed,
+                "failed": self._failed,
+                "wait_ms_p50": percentile(self._wait, 0.5),
+                "wait_ms_p99": percentile(self._wait, 0.99),
+                "handle_ms_p50": percentile(self._handle, 0.5),
+                "handle_ms_p99": percentile(self._handle, 0.99)
+            }
+
+_update_queue: Optional[UpdateQueue] = None
+
+def get_update_queue() -> UpdateQueue:
+    """
+    Очередь обновлений вебхука с ботом и диспетчером (создается при первом обращении)
+    """
+    global _update_queue
+    if _update_queue is None:
+        _update_queue = UpdateQueue(create_bot(), create_dispatcher())
+    return _update_queue
+
+def check_webhook_config(secret: Optional[str] = WEBHOOK_SECRET) -> None:
+    """
+    Режим вебхука без секрета запускается только при WEBHOOK_ALLOW_NO_SECRET=1
+    """
+    if not secret and not WEBHOOK_ALLOW_NO_SECRET:
+        raise RuntimeError(
+            "WEBHOOK_SECRET не задан: вебхук без секрета принимает поддельные обновления "
+            "(для отладки - WEBHOOK_ALLOW_NO_SECRET=1)"
+        )
+
+async def setup_webhook(bot: Bot, url: Optional[str] = WEBHOOK_URL, secret: Optional[str] = WEBHOOK_SECRET) -> None:
+    """
+    Регистрация вебхука в Telegram (если задан WEBHOOK_URL). Без секрета
+    вебхук не регистрируется, если это не разрешено явно (WEBHOOK_ALLOW_NO_SECRET=1)
+    """
+    check_webhook_config(secret)
+    if not url:
+        logging.warning("WEBHOOK_URL не задан: вебхук должен быть зарегистрирован заранее")
+        return
+    await bot.set_webhook(url, secret_token=secret)
+    logging.info(f"Вебхук зарегистрирован: {url}")
@@ -1,10 +1,10 @@
 from aiogram import Router, F
 from aiogram.filters import Command, CommandStart
 from aiogram.types import Message, CallbackQuery
-from aiogram.fsm.context import FSMContext
 
 from bot.keyboards.common_kb import get_main_keyboard
 from bot.states.order_states import OrderStates
+from bot.utils.order_session import OrderSession
 
 # Создание роутера
 router = Router()
@@ -45,12 +45,12 @@ async def cmd_help(message: Message):
 
 @router.message(Command("cancel"))
 @router.callback_query(F.data == "cancel")
-async def cmd_cancel(message_or_query: Message | CallbackQuery, state: FSMContext):
+async def cmd_cancel(message_or_query: Message | CallbackQuery, session: OrderSession):
     """
     Обработчик команды /cancel и кнопки "Отмена"
     """
     # Сброс состояния
-    await state.clear()
+    session.clear()
     
     if isinstance(message_or_query, CallbackQuery):
         await message_or_query.message.edit_text(
@@ -68,17 +68,17 @@ async def cmd_cancel(message_or_query: Message | CallbackQuery, state: FSMContex
         )
 
 @router.message(F.text == "🔍 Новый расчет")
-async def new_calculation(message: Message, state: FSMContext):
+async def new_calculation(message: Message, session: OrderSession):
     """
     Обработчик кнопки "Новый расчет"
     """
     # Переход к выбору района
-    await state.set_state(OrderStates.selecting_district)
+    session.set_state(OrderStates.selecting_district)
     
     # Импорт здесь для избежания циклических импортов
     from bot.handlers.district import send_district_selection
     
-    await send_district_selection(message, state)
+    await send_district_selection(message, session)
 
 @router.message(F.text == "📋 Мои заказы")
 async def my_orders(message: Message):
@@ -1,21 +1,26 @@
+from typing import Optional
+
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
-from aiogram.fsm.context import FSMContext
 
 from bot.states.order_states import OrderStates
 from bot.keyboards.depth_kb import get_depths_keyboard
 from bot.keyboards.district_kb import get_districts_keyboard
+from bot.utils.order_session import OrderSession
+from bot.utils.storage import get_storage
 
 # Создание роутера
 router = Router()
 
-async def send_depth_selection(message: Message, state: FSMContext, district_id: int):
+async def send_depth_selection(message: Message, session: OrderSession, district_id: Optional[int] = None):
     """
-    Отправка сообщения с выбором глубины
+    Отправка сообщения с выбором глубины (по умолчанию - для района из заказа)
     """
     # Получение данных о выбранном районе
-    data = await state.get_data()
-    district_name = data.get("district_name", "Неизвестный район")
+    draft = await session.load()
+    district_name = draft.district_name or "Неизвестный район"
+    if district_id is None:
+        district_id = draft.district_id or 1
     
     await message.edit_text(
         f"🏙️ <b>Выбранный район:</b> {district_name}\n\n"
@@ -24,7 +29,7 @@ async def send_depth_selection(message: Message, state: FSMContext, district_id:
     )
 
 @router.callback_query(F.data.startswith("depth_"))
-async def process_depth_selection(callback: CallbackQuery, state: FSMContext):
+async def process_depth_selection(callback: CallbackQuery, session: OrderSession):
     """
     Обработчик выбора глубины
     """
@@ -32,19 +37,12 @@ async def process_depth_selection(callback: CallbackQuery, state: FSMContext):
     depth = int(callback.data.split("_")[1])
     
     # Получение данных о заказе
-    data = await state.get_data()
-    district_id = data.get("district_id", 1)
-    district_name = data.get("district_name", "Неизвестный район")
-    
-    # Загрузка данных о районах
-    import json
-    import os
-    
-    with open(os.path.join("data", "districts.json"), "r", encoding="utf-8") as file:
-        districts_data = json.load(file)
+    draft = await session.load()
+    district_id = draft.district_id or 1
+    district_name = draft.district_name or "Неизвестный район"
     
     # Поиск выбранного района
-    selected_district = next((d for d in districts_data.get("districts", []) if d["id"] == district_id), None)
+    selected_district = get_storage().get_district(district_id)
     
     if not selected_district:
         await callback.answer("❌ Район не найден. Пожалуйста, выберите другой район.")
@@ -75,16 +73,14 @@ async def process_depth_selection(callback: CallbackQuery, state: FSMContext):
     drilling_cost = price_per_meter * depth
     
     # Сохранение данных о выбранной глубине, типе грунта и стоимости
-    await state.update_data(
-        depth=depth,
-        ground_type=ground_type,
-        price_per_meter=price_per_meter,
-        drilling_cost=drilling_cost,
-        total_cost=drilling_cost  # Начальная общая стоимость равна стоимости бурения
-    )
+    draft.depth = depth
+    draft.ground_type = ground_type
+    draft.price_per_meter = price_per_meter
+    draft.drilling_cost = drilling_cost
+    draft.total_cost = drilling_cost  # Начальная общая стоимость равна стоимости бурения
     
     # Переход к выбору типа техники
-    await state.set_state(OrderStates.selecting_equipment_type)
+    session.set_state(OrderStates.selecting_equipment_type)
     
     # Создаем клавиатуру для выбора техники
     from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -104,16 +100,16 @@ async def process_depth_selection(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.callback_query(F.data == "back_to_districts")
-async def back_to_districts(callback: CallbackQuery, state: FSMContext):
+async def back_to_districts(callback: CallbackQuery, session: OrderSession):
     """
     Обработчик кнопки "Назад" при выборе глубины
     """
     # Возврат к выбору района
-    await state.set_state(OrderStates.selecting_district)
+    session.set_state(OrderStates.selecting_district)
     
     # Импорт здесь для избежания циклических импортов
     from bot.handlers.district import send_district_selection
     
     await callback.answer()
-    await send_district_selection(callback.message, state)
+    await send_district_selection(callback.message, session)
 
@@ -1,16 +1,19 @@
 from aiogram import Router, F, Bot
-from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, FSInputFile
+from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, BufferedInputFile
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.fsm.context import FSMContext
-import json
-import os
 from datetime import datetime
+from operator import itemgetter
 import uuid
 import logging
 
 from bot.states.order_states import OrderStates
 from bot.keyboards.common_kb import get_main_keyboard, get_confirm_keyboard
-from bot.utils.pdf_generator import generate_order_pdf
+from bot.utils.pdf_generator import OrderPdf, submit_order_pdf, create_order_pdf, cache_order_pdf
+from bot.utils.pdf_cache import get_pdf_cache
+from bot.utils.workers import PoolOverloaded
+from bot.utils.order_session import OrderSession
+from bot.utils.storage import get_storage
 
 # ID канала для уведомлений менеджеру
 MANAGER_CHANNEL_ID = -1001910234699
@@ -19,12 +22,12 @@ MANAGER_CHANNEL_ID = -1001910234699
 router = Router()
 
 @router.callback_query(F.data == "confirm_order")
-async def confirm_order(callback: CallbackQuery, state: FSMContext):
+async def confirm_order(callback: CallbackQuery, session: OrderSession):
     """
     Обработчик подтверждения заказа
     """
     # Переход к вводу контактной информации
-    await state.set_state(OrderStates.entering_contact_info)
+    session.set_state(OrderStates.entering_contact_info)
     
     await callback.answer()
     await callback.message.edit_text(
@@ -35,42 +38,32 @@ async def confirm_order(callback: CallbackQuery, state: FSMContext):
     )
 
 @router.message(OrderStates.entering_contact_info)
-async def process_contact_info(message: Message, state: FSMContext, bot: Bot):
+async def process_contact_info(message: Message, session: OrderSession, bot: Bot):
     """
     Обработчик ввода контактной информации
     """
-    # Сохранение контактной информации
-    await state.update_data(
-        phone=message.text,
-        user_id=message.from_user.id,
-        username=message.from_user.username,
-        full_name=message.from_user.full_name
-    )
-    
-    # Переход к завершению заказа
-    await state.set_state(OrderStates.completing_order)
+    # Данные заказа читаются один раз, изменения записываются одной операцией
+    draft = await session.load()
     
-    # Получение данных о заказе
-    data = await state.get_data()
+    # Сохранение контактной информации
+    draft.phone = message.text
+    draft.user_id = message.from_user.id
+    draft.username = message.from_user.username
+    draft.full_name = message.from_user.full_name
     
     # Проверка наличия информации о районе
-    district_name = data.get("district_name")
+    district_name = draft.district_name
     if district_name is None or district_name == "None":
         # Пытаемся восстановить название района по его ID
-        district_id = data.get("district_id")
+        district_id = draft.district_id
         if district_id:
             try:
-                # Загрузка данных о районах
-                with open(os.path.join("data", "districts.json"), "r", encoding="utf-8") as file:
-                    districts_data = json.load(file)
-                
                 # Поиск района по ID
-                for district in districts_data.get("districts", []):
-                    if district.get("id") == district_id:
-                        district_name = district.get("name", "Неизвестный район")
-                        # Обновляем данные с корректным именем района
-                        await state.update_data(district_name=district_name)
-                        break
+                district = get_storage().get_district(district_id)
+                if district:
+                    district_name = district.get("name", "Неизвестный район")
+                    # Обновляем данные с корректным именем района
+                    draft.district_name = district_name
             except Exception as e:
                 logging.error(f"Ошибка при восстановлении названия района: {e}")
                 district_name = "Неизвестный район"
@@ -78,42 +71,26 @@ async def process_contact_info(message: Message, state: FSMContext, bot: Bot):
             district_name = "Неизвестный район"
     
     # Генерация уникального ID заказа
-    order_id = str(uuid.uuid4())[:8].upper()
+    draft.order_id = order_id = str(uuid.uuid4())[:8].upper()
     
     # Текущая дата и время
-    order_date = datetime.now().strftime("%d.%m.%Y %H:%M")
-    
-    # Сохранение ID и даты заказа
-    await state.update_data(
-        order_id=order_id,
-        order_date=order_date
-    )
-    
-    # Получаем обновленные данные
-    data = await state.get_data()
+    draft.order_date = order_date = datetime.now().strftime("%d.%m.%Y %H:%M")
     
     # Формирование данных заказа для сохранения и отправки
     order_data = {
         "order_id": order_id,
-        "user_id": data.get("user_id"),
-        "username": data.get("username", "-"),
-        "full_name": data.get("full_name", "-"),
-        "phone": data.get("phone", "-"),
+        "user_id": draft.user_id,
+        "username": draft.username or "-",
+        "full_name": draft.full_name or "-",
+        "phone": draft.phone or "-",
         "district_name": district_name,
-        "depth": data.get("depth", 0),
-        "ground_type": data.get("ground_type", "Неизвестный"),
-        "price_per_meter": data.get("price_per_meter", 0),
-        "drilling_cost": data.get("drilling_cost", 0),
-        "equipment_name": data.get("equipment_name", "Не выбрано"), # Используем новое поле
-        "equipment_price": data.get("equipment_price", 0), # Используем новое поле
-        "total_cost": data.get("total_cost", 0),
-        # Старые поля удалены
-        # "selected_equipment": data.get("selected_equipment", {}),
-        # "equipment_details": data.get("equipment_details", []),
-        # "adapter_info": data.get("adapter_info", {}),
-        # "caisson_info": data.get("caisson_info", {}),
-        # "selected_adapter": data.get("selected_adapter", {}),
-        # "selected_caisson": data.get("selected_caisson", {}),
+        "depth": draft.depth or 0,
+        "ground_type": draft.ground_type or "Неизвестный",
+        "price_per_meter": draft.price_per_meter or 0,
+        "drilling_cost": draft.drilling_cost or 0,
+        "equipment_name": draft.equipment_name or "Не выбрано",
+        "equipment_price": draft.equipment_price or 0,
+        "total_cost": draft.total_cost or 0,
         "order_date": order_date,
         "status": "new"
     }
@@ -121,19 +98,18 @@ async def process_contact_info(message: Message, state: FSMContext, bot: Bot):
     # Сохранение заказа в JSON
     save_order(order_data)
 
-    # Генерация PDF с деталями заказа
+    # Сброс состояния сразу после сохранения заказа (одна запись в хранилище):
+    # повторное сообщение, пока готовится PDF, не оформит заказ еще раз
+    session.clear()
+    await session.commit()
+
+    # Постановка PDF с деталями заказа в очередь: рендеринг идет в пуле воркеров,
+    # пока пользователю отправляется подтверждение
     try:
-        try:
-            pdf_path = generate_order_pdf(order_data) # Передаем обновленный order_data
-            pdf_exists = True
-        except Exception as e:
-            logging.error(f"Ошибка при создании PDF для заказа {order_id}: {e}")
-            pdf_path = None
-            pdf_exists = False
-    except Exception as e:
-        logging.error(f"Ошибка при создании PDF для заказа {order_id}: {e}")
-        pdf_path = None
-        pdf_exists = False
+        pdf_job = submit_order_pdf(order_data) # Передаем обновленный order_data
+    except PoolOverloaded as e:
+        logging.error(f"Очередь PDF переполнена, PDF для заказа {order_id} не создан: {e}")
+        pdf_job = None
 
     # Формирование сообщения для пользователя
     user_message = (
@@ -152,13 +128,26 @@ async def process_contact_info(message: Message, state: FSMContext, bot: Bot):
     # Отправка сообщения пользователю
     await message.answer(user_message, parse_mode='HTML')
 
+    # Ожидание PDF без блокировки диспетчера
+    pdf_file = None
+    if pdf_job is not None:
+        try:
+            pdf = cache_order_pdf(order_data, await pdf_job.wait())
+            if pdf.content:
+                pdf_file = pdf_document(pdf, order_id)
+        except Exception as e:
+            logging.error(f"Ошибка при создании PDF для заказа {order_id}: {e}")
+
     # Отправка PDF-файла пользователю, если он создан
-    if pdf_exists and pdf_path:
+    if pdf_file:
         try:
-            await message.answer_document(
-                document=FSInputFile(pdf_path),
+            sent_document = await message.answer_document(
+                document=pdf_file,
                 caption=f"📄 Детали заказа #{order_id}"
             )
+            # Менеджеру файл отправляется по file_id, без повторной загрузки
+            pdf_file = sent_document.document.file_id
+            get_pdf_cache().set_file_id(pdf.key, pdf_file)
         except Exception as e:
             logging.error(f"Ошибка при отправке PDF пользователю {message.from_user.id} для заказа {order_id}: {e}")
 
@@ -190,11 +179,11 @@ async def process_contact_info(message: Message, state: FSMContext, bot: Bot):
         logging.info(f"Сообщение успешно отправлено, message_id: {sent_message.message_id}")
         
         # Отправка PDF менеджеру, если он создан
-        if pdf_exists and pdf_path:
+        if pdf_file:
             logging.info(f"Отправка PDF документа для заказа {order_id}")
             sent_document = await bot.send_document(
                 "@cargptgroza",
-                document=FSInputFile(pdf_path),
+                document=pdf_file,
                 caption=f"\ud83d\udcc4 Детали заказа #{order_id} для менеджера"
             )
             logging.info(f"PDF успешно отправлен, document_id: {sent_document.document.file_id}")
@@ -207,46 +196,34 @@ async def process_contact_info(message: Message, state: FSMContext, bot: Bot):
         sent_message = await bot.send_message("@cargptgroza", manager_message, parse_mode='HTML')
         logging.info(f"Сообщение успешно отправлено по username, message_id: {sent_message.message_id}")
         
-        if pdf_exists and pdf_path:
+        if pdf_file:
             logging.info(f"Попытка отправки PDF по username для заказа {order_id}")
             sent_document = await bot.send_document(
                 "@cargptgroza",
-                document=FSInputFile(pdf_path),
+                document=pdf_file,
                 caption=f"\ud83d\udcc4 Детали заказа #{order_id} для менеджера"
             )
             logging.info(f"PDF успешно отправлен по username, document_id: {sent_document.document.file_id}")
     except Exception as e:
         logging.error(f"Ошибка при отправке уведомления менеджеру в канал @cargptgroza для заказа {order_id}: {str(e)}", exc_info=True)
     
-    # Сброс состояния
-    await state.clear()
-    
     # Отправка главного меню
     await message.answer(
         "Выберите действие:",
         reply_markup=get_main_keyboard()
     )
 
+def pdf_document(pdf: OrderPdf, order_id: str):
+    """
+    Документ для отправки: file_id уже отправленного файла или содержимое PDF
+    """
+    return pdf.file_id or BufferedInputFile(pdf.content, filename=f"order_{order_id}.pdf")
+
 def save_order(order_data):
     """
-    Сохранение заказа в JSON-файл
+    Сохранение заказа в хранилище
     """
-    # Путь к файлу с заказами
-    orders_file = os.path.join("data", "orders.json")
-    
-    # Загрузка существующих заказов
-    if os.path.exists(orders_file):
-        with open(orders_file, "r", encoding="utf-8") as file:
-            data = json.load(file)
-    else:
-        data = {"orders": []}
-    
-    # Добавление нового заказа
-    data["orders"].append(order_data)
-    
-    # Сохранение обновленных данных
-    with open(orders_file, "w", encoding="utf-8") as file:
-        json.dump(data, file, ensure_ascii=False, indent=4)
+    get_storage().add_order(order_data)
 
 async def send_user_orders(message: Message):
     """
@@ -254,27 +231,15 @@ async def send_user_orders(message: Message):
     """
     user_id = message.from_user.id
     
-    # Путь к файлу с заказами
-    orders_file = os.path.join("data", "orders.json")
-    
-    # Проверка существования файла с заказами
-    if not os.path.exists(orders_file):
-        await message.answer("У вас пока нет заказов.")
-        return
-    
-    # Загрузка заказов
-    with open(orders_file, "r", encoding="utf-8") as file:
-        data = json.load(file)
-    
     # Фильтрация заказов пользователя
-    user_orders = [order for order in data.get("orders", []) if order.get("user_id") == user_id]
+    user_orders = get_storage().get_user_orders(user_id)
     
     if not user_orders:
         await message.answer("У вас пока нет заказов.")
         return
     
     # Сортировка заказов по дате (от новых к старым)
-    user_orders.sort(key=lambda x: datetime.strptime(x.get("order_date", "01.01.2000 00:00"), "%d.%m.%Y %H:%M"), reverse=True)
+    user_orders.sort(key=itemgetter("order_ts"), reverse=True)
     
     # Отправляем каждый заказ отдельным сообщением с кнопкой для скачивания PDF
     for order in user_orders:
@@ -314,20 +279,8 @@ async def get_order_pdf(callback: CallbackQuery):
         # Получение ID заказа из callback_data
         order_id = callback.data.replace("get_pdf_", "")
         
-        # Путь к файлу с заказами
-        orders_file = os.path.join("data", "orders.json")
-        
-        # Проверка существования файла с заказами
-        if not os.path.exists(orders_file):
-            await callback.answer("Файл с заказами не найден", show_alert=True)
-            return
-        
-        # Загрузка заказов
-        with open(orders_file, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        
         # Поиск заказа по ID
-        order = next((o for o in data.get("orders", []) if o.get("order_id") == order_id), None)
+        order = get_storage().get_order(order_id)
         
         if not order:
             await callback.answer("Заказ не найден", show_alert=True)
@@ -338,17 +291,34 @@ async def get_order_pdf(callback: CallbackQuery):
             await callback.answer("У вас нет доступа к этому заказу", show_alert=True)
             return
         
-        # Генерация PDF с деталями заказа
+        # Генерация PDF с деталями заказа в пуле воркеров
         try:
-            pdf_path = generate_order_pdf(order)
+            pdf = await create_order_pdf(order)
+            if not pdf.content and not pdf.file_id:
+                raise RuntimeError(f"PDF для заказа {order_id} не создан")
             
-            # Отправка PDF-файла
-            await callback.message.answer_document(
-                document=FSInputFile(pdf_path),
-                caption=f"📄 Детали заказа #{order_id}"
-            )
+            # Отправка PDF-файла (повторно - по file_id из кэша)
+            try:
+                sent_document = await callback.message.answer_document(
+                    document=pdf_document(pdf, order_id),
+                    caption=f"📄 Детали заказа #{order_id}"
+                )
+            except TelegramBadRequest:
+                if not pdf.file_id:
+                    raise
+                # Telegram не принял сохраненный file_id: отправляем сам файл
+                pdf = await create_order_pdf(order, use_file_id=False)
+                if not pdf.content:
+                    raise RuntimeError(f"PDF для заказа {order_id} не создан")
+                sent_document = await callback.message.answer_document(
+                    document=pdf_document(pdf._replace(file_id=None), order_id),
+                    caption=f"📄 Детали заказа #{order_id}"
+                )
+            get_pdf_cache().set_file_id(pdf.key, sent_document.document.file_id)
             
             await callback.answer()
+        except PoolOverloaded:
+            await callback.answer("Сейчас много запросов, попробуйте через минуту", show_alert=True)
         except Exception as e:
             await callback.answer(f"Ошибка при создании PDF", show_alert=True)
             import logging
@@ -1,24 +1,23 @@
+from typing import Dict, Any
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-import json
-import os
+
+from bot.keyboards.markup_cache import get_keyboard_cache
+
+# Клавиатура для неизвестного района
+NO_DISTRICT_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="Назад", callback_data="back")]])
 
 def get_depths_keyboard(district_id: int) -> InlineKeyboardMarkup:
     """
-    Клавиатура для выбора глубины
+    Клавиатура для выбора глубины (готовая, из кэша клавиатур)
+    """
+    return get_keyboard_cache().depths(district_id) or NO_DISTRICT_KEYBOARD
+
+def build_depths_keyboard(selected_district: Dict[str, Any]) -> InlineKeyboardMarkup:
+    """
+    Построение клавиатуры выбора глубины для района
     """
-    # Загрузка данных о районах
-    with open(os.path.join("data", "districts.json"), "r", encoding="utf-8") as file:
-        data = json.load(file)
-    
-    districts = data.get("districts", [])
-    
-    # Поиск выбранного района
-    selected_district = next((d for d in districts if d["id"] == district_id), None)
-    
-    if not selected_district:
-        return InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="Назад", callback_data="back")]])
-    
     # Получение доступных глубин для выбранного района
     depths = selected_district.get("depths", [])
     ground_types = selected_district.get("ground_types", {})
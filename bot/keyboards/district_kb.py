@@ -1,18 +1,20 @@
+from typing import Dict, Any, List
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-import json
-import os
+
+from bot.keyboards.markup_cache import get_keyboard_cache
 
 def get_districts_keyboard() -> InlineKeyboardMarkup:
     """
-    Клавиатура для выбора района
+    Клавиатура для выбора района (готовая, из кэша клавиатур)
+    """
+    return get_keyboard_cache().districts()
+
+def build_districts_keyboard(districts: List[Dict[str, Any]]) -> InlineKeyboardMarkup:
+    """
+    Построение клавиатуры выбора района
     """
-    # Загрузка данных о районах
-    with open(os.path.join("data", "districts.json"), "r", encoding="utf-8") as file:
-        data = json.load(file)
-    
-    districts = data.get("districts", [])
-    
     # Создание клавиатуры
     builder = InlineKeyboardBuilder()
     
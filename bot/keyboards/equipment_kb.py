@@ -1,27 +1,26 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 import json
-import os
+from typing import Dict, Any
+
+from bot.keyboards.markup_cache import get_keyboard_cache
+from bot.utils.storage import get_storage
 
 def load_equipment_data():
-    """Загружает данные об оборудовании из JSON."""
+    """Загружает данные об оборудовании из хранилища."""
     try:
-        # Используем относительный путь от корня проекта
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        file_path = os.path.join(base_dir, "data", "equipment.json")
-        with open(file_path, "r", encoding="utf-8") as file:
-            return json.load(file)
-    except FileNotFoundError:
-        print(f"Ошибка: Файл {file_path} не найден.")
-        return {}
+        return get_storage().get_equipment_data()
     except json.JSONDecodeError:
-        print(f"Ошибка: Неверный формат JSON в {file_path}.")
+        print("Ошибка: Неверный формат JSON в equipment.json.")
         return {}
 
 def get_simplified_equipment_keyboard() -> InlineKeyboardMarkup:
+    """Возвращает готовую клавиатуру выбора варианта оборудования (из кэша клавиатур)."""
+    return get_keyboard_cache().equipment()
+
+def build_equipment_keyboard(equipment_data: Dict[str, Any]) -> InlineKeyboardMarkup:
     """Создает клавиатуру для выбора одного из четырех вариантов оборудования."""
     builder = InlineKeyboardBuilder()
-    equipment_data = load_equipment_data()
     options = equipment_data.get("options", [])
 
     if not options:
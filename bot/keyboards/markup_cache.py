@@ -0,0 +1,95 @@
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from aiogram.types import InlineKeyboardMarkup
+
+from bot.utils.storage import get_storage
+
+class _Keyboards:
+    """
+    Клавиатуры одной версии справочных данных
+    """
+    __slots__ = ("version", "districts", "depths", "equipment")
+
+    def __init__(self, version: int, districts: InlineKeyboardMarkup,
+                 depths: Dict[int, InlineKeyboardMarkup], equipment: InlineKeyboardMarkup):
+        self.version = version
+        self.districts = districts
+        self.depths = depths
+        self.equipment = equipment
+
+class KeyboardCache:
+    """
+    Готовые клавиатуры выбора района, глубины (по району) и оборудования.
+
+    Клавиатуры строятся все сразу для текущей версии справочных данных и
+    заменяются одним присваиванием, когда версия меняется (обновление цен,
+    импорт прайс-листа): обработчик получает клавиатуры одной версии и не
+    видит частично перестроенный набор. Возвращаемые объекты общие,
+    изменять их нельзя.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keyboards: Optional[_Keyboards] = None
+        self._builds = 0
+        self._build_ms: Optional[float] = None
+
+    def _current(self) -> _Keyboards:
+        version = get_storage().get_reference_version()
+        keyboards = self._keyboards
+        if keyboards is not None and keyboards.version == version:
+            return keyboards
+
+        with self._lock:
+            keyboards = self._keyboards
+            if keyboards is not None and keyboards.version == version:
+                return keyboards
+            keyboards = self._build(version)
+            self._keyboards = keyboards
+            return keyboards
+
+    def _build(self, version: int) -> _Keyboards:
+        # Импорт здесь для избежания циклических импортов
+        from bot.keyboards.district_kb import build_districts_keyboard
+        from bot.keyboards.depth_kb import build_depths_keyboard
+        from bot.keyboards.equipment_kb import build_equipment_keyboard, load_equipment_data
+
+        started = time.perf_counter()
+        storage = get_storage()
+        districts = storage.get_districts()
+        keyboards = _Keyboards(
+            version,
+            build_districts_keyboard(districts),
+            {district["id"]: build_depths_keyboard(district) for district in districts},
+            build_equipment_keyboard(load_equipment_data())
+        )
+        self._builds += 1
+        self._build_ms = round((time.perf_counter() - started) * 1e3, 2)
+        return keyboards
+
+    def districts(self) -> InlineKeyboardMarkup:
+        return self._current().districts
+
+    def depths(self, district_id: int) -> Optional[InlineKeyboardMarkup]:
+        return self._current().depths.get(district_id)
+
+    def equipment(self) -> InlineKeyboardMarkup:
+        return self._current().equipment
+
+    def stats(self) -> Dict[str, Any]:
+        keyboards = self._keyboards
+        return {
+            "version": keyboards.version if keyboards is not None else None,
+            "districts": len(keyboards.depths) if keyboards is not None else 0,
+            "builds": self._builds,
+            "build_ms": self._build_ms
+        }
+
+_keyboard_cache: Optional[KeyboardCache] = None
+
+def get_keyboard_cache() -> KeyboardCache:
+    global _keyboard_cache
+    if _keyboard_cache is None:
+        _keyboard_cache = KeyboardCache()
+    return _keyboard_cache
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+from urllib.parse import quote
+
+import aiohttp
+
+# Хранилище файлов: vercel - Vercel Blob, local - каталог на диске (работа и нагрузочные тесты без сети).
+# По умолчанию vercel, если задан токен
+BLOB_READ_WRITE_TOKEN = os.environ.get('BLOB_READ_WRITE_TOKEN')
+BLOB_BACKEND = os.environ.get('BLOB_BACKEND', 'vercel' if BLOB_READ_WRITE_TOKEN else 'local')
+BLOB_LOCAL_DIR = os.environ.get('BLOB_LOCAL_DIR', os.path.join("data", "blobs"))
+BLOB_LOCAL_URL = os.environ.get('BLOB_LOCAL_URL')  # базовый URL раздачи каталога (по умолчанию file://)
+BLOB_CONCURRENCY = int(os.environ.get('BLOB_CONCURRENCY', 8))
+BLOB_RETRIES = int(os.environ.get('BLOB_RETRIES', 3))
+BLOB_TIMEOUT = float(os.environ.get('BLOB_TIMEOUT', 10))
+
+VERCEL_BLOB_API_URL = "https://blob.vercel-storage.com"
+VERCEL_BLOB_API_VERSION = "10"
+
+class BlobUploadError(Exception):
+    """
+    Файл не загружен (после всех повторов или из-за ошибки, которую повторять бессмысленно)
+    """
+
+class BlobRetryableError(BlobUploadError):
+    """
+    Временная ошибка загрузки: сеть, таймаут, 429 или 5xx
+    """
+
+class BlobStorage:
+    """
+    Асинхронное хранилище файлов с ограничением параллельных загрузок
+    и повторами с экспоненциальной задержкой со случайным разбросом.
+
+    Задержка перед повтором n - случайная величина в [0, backoff * 2^n]
+    ("full jitter"): при сбое хранилища загрузки не повторяются волной
+    в один и тот же момент. Время и исход загрузок копятся в метриках.
+    """
+    name = "base"
+
+    def __init__(
+        self,
+        concurrency: int = BLOB_CONCURRENCY,
+        retries: int = BLOB_RETRIES,
+        backoff: float = 0.2,
+        history: int = 1000
+    ):
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=history)
+        self._uploads = 0
+        self._failures = 0
+        self._retried = 0
+        self._bytes = 0
+
+    async def _put(self, pathname: str, data: bytes, content_type: str) -> str:
+        raise NotImplementedError
+
+    async def put(self, pathname: str, data: bytes, content_type: str = "application/pdf") -> str:
+        """
+        Загрузка файла; возвращает его URL. При неудаче выбрасывает BlobUploadError
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            started = time.perf_counter()
+            attempt = 0
+            while True:
+                try:
+                    url = await self._put(pathname, data, content_type)
+                    self._record(time.perf_counter() - started, len(data), attempt, failed=False)
+                    return url
+                except BlobRetryableError as e:
+                    if attempt >= self.retries:
+                        self._record(time.perf_counter() - started, 0, attempt, failed=True)
+                        raise BlobUploadError(f"Загрузка {pathname} не удалась после {attempt + 1} попыток: {e}") from e
+                    delay = random.uniform(0, self.backoff * 2 ** attempt)
+                    logging.warning(f"Ошибка загрузки {pathname} ({e}), повтор через {delay:.2f} с")
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                except BlobUploadError:
+                    self._record(time.perf_counter() - started, 0, attempt, failed=True)
+                    raise
+
+    def _record(self, elapsed: float, size: int, retried: int, failed: bool) -> None:
+        with self._lock:
+            self._latencies.append(elapsed)
+            self._retried += retried
+            if failed:
+                self._failures += 1
+            else:
+                self._uploads += 1
+                self._bytes += size
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Загрузки, ошибки, повторы и задержка (мс) по последним загрузкам
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            def percentile(q: float) -> Optional[float]:
+                return round(latencies[int(q * (len(latencies) - 1))] * 1e3, 2) if latencies else None
+            return {
+                "backend": self.name,
+                "uploads": self._uploads,
+                "failures": self._failures,
+                "retries": self._retried,
+                "bytes": self._bytes,
+                "latency_ms_p50": percentile(0.5),
+                "latency_ms_p99": percentile(0.99),
+                "latency_ms_max": round(latencies[-1] * 1e3, 2) if latencies else None
+            }
+
+    async def close(self) -> None:
+        pass
+
+class VercelBlobStorage(BlobStorage):
+    """
+    Vercel Blob через HTTP API: одна сессия aiohttp с пулом соединений
+    на все загрузки вместо нового HTTPS-соединения на каждый файл
+    """
+    name = "vercel"
+
+    def __init__(
+        self,
+        token: Optional[str] = BLOB_READ_WRITE_TOKEN,
+        timeout: float = BLOB_TIMEOUT,
+        api_url: str = VERCEL_BLOB_API_URL,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.token = token
+        self.api_url = api_url
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def _put(self, pathname: str, data: bytes, content_type: str) -> str:
+        return await self._upload(self._get_session(), pathname, data, content_type)
+
+    async def _upload(self, session: aiohttp.ClientSession, pathname: str, data: bytes, content_type: str) -> str:
+        if not self.token:
+            raise BlobUploadError("Токен BLOB_READ_WRITE_TOKEN не найден в переменных окружения")
+        headers = {
+            "access": "public",
+            "authorization": f"Bearer {self.token}",
+            "x-api-version": VERCEL_BLOB_API_VERSION,
+            "x-content-type": content_type,
+            "x-allow-overwrite": "1",
+        }
+        try:
+            async with session.put(
+                f"{self.api_url}/?pathname={quote(pathname)}", data=data, headers=headers
+            ) as response:
+                if response.status == 429 or response.status >= 500:
+                    raise BlobRetryableError(f"HTTP {response.status}")
+                if response.status >= 400:
+                    raise BlobUploadError(f"HTTP {response.status}: {await response.text()}")
+                return (await response.json())["url"]
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise BlobRetryableError(str(e) or type(e).__name__) from e
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+class LocalBlobStorage(BlobStorage):
+    """
+    Файлы в локальном каталоге. latency и failure_rate имитируют сетевое
+    хранилище при нагрузочных тестах (включая повторы после ошибок).
+    """
+    name = "local"
+
+    def __init__(
+        self,
+        directory: str = BLOB_LOCAL_DIR,
+        base_url: Optional[str] = BLOB_LOCAL_URL,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.directory = directory
+        self.base_url = base_url
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+    async def _put(self, pathname: str, data: bytes, content_type: str) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise BlobRetryableError("имитация сбоя хранилища")
+        path = os.path.join(self.directory, *pathname.split("/"))
+        await asyncio.to_thread(self._write, path, data)
+        if self.base_url:
+            return f"{self.base_url.rstrip('/')}/{quote(pathname)}"
+        return "file://" + os.path.abspath(path)
+
+_blob_storage: Optional[BlobStorage] = None
+
+def get_blob_storage() -> BlobStorage:
+    """
+    Хранилище файлов, выбранное в BLOB_BACKEND
+    """
+    global _blob_storage
+    if _blob_storage is None:
+        _blob_storage = VercelBlobStorage() if BLOB_BACKEND == "vercel" else LocalBlobStorage()
+    return _blob_storage
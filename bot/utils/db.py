@@ -3,12 +3,18 @@ import os
 from typing import Dict, Any, List, Optional
 import aiofiles
 
+from bot.utils.storage import StorageBackend, get_storage
+
 class JsonDB:
     """
-    Класс для работы с JSON-файлами как с базой данных
+    Класс для работы с данными бота.
+
+    Заказы и справочники хранятся в выбранном движке хранения
+    (JSON-файлы или SQLite), read_json/write_json работают с файлами напрямую.
     """
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", storage: Optional[StorageBackend] = None):
         self.data_dir = data_dir
+        self.storage = storage or get_storage()
         os.makedirs(data_dir, exist_ok=True)
     
     async def read_json(self, filename: str) -> Dict[str, Any]:
@@ -45,73 +51,68 @@ class JsonDB:
         """
         Получение списка районов
         """
-        data = await self.read_json("districts.json")
-        return data.get("districts", [])
+        return self.storage.get_districts()
     
     async def get_district_by_id(self, district_id: int) -> Optional[Dict[str, Any]]:
         """
         Получение района по ID
         """
-        districts = await self.get_districts()
-        return next((d for d in districts if d.get("id") == district_id), None)
+        return self.storage.get_district(district_id)
     
     async def get_equipment(self) -> Dict[str, Any]:
         """
         Получение данных об оборудовании
         """
-        return await self.read_json("equipment.json")
+        return self.storage.get_equipment_data()
     
     async def get_orders(self) -> List[Dict[str, Any]]:
         """
         Получение списка заказов
         """
-        data = await self.read_json("orders.json")
-        return data.get("orders", [])
+        return self.storage.get_orders()
+    
+    async def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Получение заказа по ID
+        """
+        return self.storage.get_order(order_id)
     
     async def get_user_orders(self, user_id: int) -> List[Dict[str, Any]]:
         """
         Получение заказов пользователя
         """
-        orders = await self.get_orders()
-        return [order for order in orders if order.get("user_id") == user_id]
+        return self.storage.get_user_orders(user_id)
     
     async def add_order(self, order_data: Dict[str, Any]) -> bool:
         """
         Добавление нового заказа
         """
-        data = await self.read_json("orders.json")
-        orders = data.get("orders", [])
-        orders.append(order_data)
-        data["orders"] = orders
-        return await self.write_json("orders.json", data)
+        try:
+            self.storage.add_order(order_data)
+            return True
+        except Exception as e:
+            print(f"Ошибка при добавлении заказа: {str(e)}")
+            return False
+    
+    async def update_order_status(self, order_id: str, status: str) -> bool:
+        """
+        Обновление статуса заказа
+        """
+        return self.storage.update_order_status(order_id, status)
     
     async def update_equipment_price(self, category: str, component: str, price: float) -> bool:
         """
         Обновление цены на компонент оборудования
         """
-        data = await self.read_json("equipment.json")
-        equipment_data = data.get("equipment_data", {})
-        
-        if category not in equipment_data:
-            equipment_data[category] = {}
-        
-        equipment_data[category][component] = price
-        data["equipment_data"] = equipment_data
-        
-        return await self.write_json("equipment.json", data)
+        try:
+            self.storage.update_equipment_price(category, component, price)
+            return True
+        except Exception as e:
+            print(f"Ошибка при обновлении цены оборудования: {str(e)}")
+            return False
     
     async def update_district_price(self, district_id: int, base_price: float) -> bool:
         """
         Обновление базовой цены для района
         """
-        data = await self.read_json("districts.json")
-        districts = data.get("districts", [])
-        
-        for district in districts:
-            if district.get("id") == district_id:
-                district["base_price"] = base_price
-                break
-        
-        data["districts"] = districts
-        return await self.write_json("districts.json", data)
-
+        return self.storage.update_district_price(district_id, base_price)
@@ -0,0 +1,413 @@
+import asyncio
+import contextvars
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, Awaitable, Callable, List, Mapping, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import TelegramObject, Update
+
+# Хранилище состояний бота: sqlite (переживает перезапуск) или memory
+FSM_STORAGE = os.environ.get('FSM_STORAGE', 'sqlite')
+FSM_SQLITE_PATH = os.environ.get('FSM_SQLITE_PATH', os.path.join("data", "fsm.db"))
+# Сколько сессий держится в памяти
+FSM_CACHE_SIZE = int(os.environ.get('FSM_CACHE_SIZE', 10000))
+# Как часто изменения пишутся в базу (секунды); 0 - запись при каждом изменении
+FSM_FLUSH_INTERVAL = float(os.environ.get('FSM_FLUSH_INTERVAL', 0.5))
+# Через сколько часов без изменений брошенная сессия удаляется
+FSM_TTL_HOURS = float(os.environ.get('FSM_TTL_HOURS', 72))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm_sessions (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fsm_sessions_updated ON fsm_sessions(updated);
+"""
+
+class _Session:
+    __slots__ = ("state", "data", "payload", "updated", "dirty")
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any], payload: str, updated: float, dirty: bool = False):
+        self.state = state
+        self.data = data
+        self.payload = payload
+        self.updated = updated
+        self.dirty = dirty
+
+class SqliteFsmStorage(BaseStorage):
+    """
+    Хранилище состояний FSM в SQLite с кэшем в памяти и отложенной записью.
+
+    Чтения обслуживает LRU-кэш сессий, промах читает одну строку по ключу
+    в отдельном потоке через свое соединение (не дожидаясь записи пачки).
+    Изменения попадают в кэш сразу, а в базу - пачкой раз в flush_interval
+    одной транзакцией в отдельном потоке: сообщение пользователя не ждет
+    записи на диск. При сбое процесса теряются изменения не больше чем
+    за flush_interval; close() записывает все оставшиеся.
+
+    Сессия без изменений дольше ttl считается брошенной: она читается как
+    пустая и удаляется из базы. Пустые сессии (после state.clear()) в базе
+    не хранятся.
+
+    Кэш у каждого процесса свой: если ботов несколько, обновления одного
+    чата должны обрабатываться одним процессом.
+    """
+    def __init__(
+        self,
+        path: str = FSM_SQLITE_PATH,
+        cache_size: int = FSM_CACHE_SIZE,
+        flush_interval: float = FSM_FLUSH_INTERVAL,
+        ttl: float = FSM_TTL_HOURS * 3600
+    ):
+        self.path = path
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_business_connection_id=True, with_destiny=True)
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._dirty: Dict[str, _Session] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flushing = False
+        self._db_lock = threading.Lock()
+        self._last_purge = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._flushes = 0
+        self._written = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._read_lock = threading.Lock()
+        self._reader = sqlite3.connect(path, timeout=30, check_same_thread=False)
+
+    # --- Кэш ---
+
+    async def _session(self, key: StorageKey) -> Tuple[str, _Session]:
+        name = self.key_builder.build(key)
+        session = self._sessions.get(name)
+        if session is not None:
+            self._hits += 1
+            self._sessions.move_to_end(name)
+        else:
+            self._misses += 1
+            while True:
+                evictions = self._evictions
+                row = await asyncio.to_thread(self._read, name)
+                # Пока строка читалась, сессию мог загрузить или изменить другой
+                # обработчик, а после записи и вытеснения строка могла устареть
+                session = self._sessions.get(name)
+                if session is not None or evictions == self._evictions:
+                    break
+            if session is None:
+                if row is not None:
+                    session = _Session(row[0], json.loads(row[1]), row[1], row[2])
+                else:
+                    session = _Session(None, {}, "{}", time.time())
+                self._sessions[name] = session
+                self._evict()
+
+        if self.ttl and not session.dirty and session.updated < time.time() - self.ttl and (session.state or session.data):
+            # Брошенная сессия: читается пустой, строка удалится при записи
+            session = self._store(name, session, None, {}, "{}")
+        return name, session
+
+    def _read(self, name: str) -> Optional[Tuple[Optional[str], str, float]]:
+        # Отдельное соединение: в режиме WAL чтение не ждет пачку, которую пишет поток записи
+        with self._read_lock:
+            return self._reader.execute(
+                "SELECT state, data, updated FROM fsm_sessions WHERE key = ?", (name,)
+            ).fetchone()
+
+    def _evict(self) -> None:
+        # Сессии с незаписанными изменениями остаются в кэше до записи
+        excess = len(self._sessions) - self.cache_size
+        if excess <= 0:
+            return
+        evicted = []
+        for name, session in self._sessions.items():
+            if len(evicted) >= excess:
+                break
+            if not session.dirty:
+                evicted.append(name)
+        for name in evicted:
+            del self._sessions[name]
+        self._evictions += len(evicted)
+
+    def _store(self, name: str, session: _Session, state: Optional[str], data: Dict[str, Any], payload: str) -> _Session:
+        session.state = state
+        session.data = data
+        session.payload = payload
+        session.updated = time.time()
+        session.dirty = True
+        self._dirty[name] = session
+        self._schedule_flush()
+        return session
+
+    # --- BaseStorage ---
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        name, session = await self._session(key)
+        state = state.state if isinstance(state, State) else state
+        self._store(name, session, state, session.data, session.payload)
+        await self._write_through()
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._session(key))[1].state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        name, session = await self._session(key)
+        # Сериализация сразу: несериализуемые данные - ошибка в обработчике, а не при записи
+        payload = json.dumps(data, ensure_ascii=False)
+        self._store(name, session, session.state, copy.deepcopy(dict(data)), payload)
+        await self._write_through()
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return copy.deepcopy((await self._session(key))[1].data)
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        name, session = await self._session(key)
+        current = copy.deepcopy(session.data)
+        current.update(data)
+        payload = json.dumps(current, ensure_ascii=False)
+        self._store(name, session, session.state, current, payload)
+        await self._write_through()
+        return copy.deepcopy(current)
+
+    async def set_session(self, key: StorageKey, state: StateType, data: Mapping[str, Any]) -> None:
+        """
+        Состояние и данные одной записью (вместо set_state и set_data)
+        """
+        name, session = await self._session(key)
+        state = state.state if isinstance(state, State) else state
+        payload = json.dumps(data, ensure_ascii=False)
+        self._store(name, session, state, copy.deepcopy(dict(data)), payload)
+        await self._write_through()
+
+    async def close(self) -> None:
+        task = self._flush_task
+        if task is not None and not task.done():
+            if self._flushing:
+                # Пачка уже пишется: дожидаемся записи
+                await task
+            else:
+                task.cancel()
+        self._flush_task = None
+        await self.flush()
+        with self._read_lock:
+            self._reader.close()
+        with self._db_lock:
+            self._conn.close()
+
+    # --- Запись в базу ---
+
+    def _schedule_flush(self) -> None:
+        if self.flush_interval <= 0:
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        try:
+            await self.flush()
+        except Exception as e:
+            logging.error(f"Ошибка записи состояний FSM: {e}")
+        # Изменения, сделанные во время записи (или не записанные из-за ошибки), - в следующую пачку
+        self._flush_task = None
+        if self._dirty:
+            self._schedule_flush()
+
+    async def _write_through(self) -> None:
+        if self.flush_interval <= 0:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Запись накопленных изменений в базу одной транзакцией (в отдельном потоке).
+        Возвращает число записанных сессий
+        """
+        # Пачка снимается в цикле событий: обработчики меняют сессии только в нем
+        batch, self._dirty = self._dirty, {}
+        rows = [(name, session.state, session.payload, session.updated) for name, session in batch.items()]
+        if not rows:
+            return 0
+        self._flushing = True
+        try:
+            await asyncio.to_thread(self._write, rows)
+        except BaseException:
+            # Незаписанные изменения вернутся в следующую пачку (если их не перезаписали)
+            for name, session in batch.items():
+                self._dirty.setdefault(name, session)
+            raise
+        finally:
+            self._flushing = False
+        for name, session in batch.items():
+            if name not in self._dirty:
+                session.dirty = False
+        self._flushes += 1
+        self._written += len(rows)
+        self._evict()
+        return len(rows)
+
+    def _write(self, rows: List[Tuple[str, Optional[str], str, float]]) -> None:
+        now = time.time()
+        with self._db_lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO fsm_sessions (key, state, data, updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data, updated = excluded.updated",
+                [row for row in rows if row[1] is not None or row[2] != "{}"]
+            )
+            self._conn.executemany(
+                "DELETE FROM fsm_sessions WHERE key = ?",
+                [(row[0],) for row in rows if row[1] is None and row[2] == "{}"]
+            )
+            # Брошенные сессии удаляются не чаще раза в час
+            if self.ttl and now - self._last_purge > min(self.ttl, 3600):
+                self._conn.execute("DELETE FROM fsm_sessions WHERE updated < ?", (now - self.ttl,))
+                self._last_purge = now
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "sqlite",
+            "cached": len(self._sessions),
+            "dirty": len(self._dirty),
+            "hits": self._hits,
+            "misses": self._misses,
+            "flushes": self._flushes,
+            "written": self._written
+        }
+
+# Счетчик операций хранилища текущего обновления (задает FsmOpsMiddleware)
+_update_ops: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar("fsm_update_ops", default=None)
+
+class FsmOpStats:
+    """
+    Статистика операций хранилища FSM: всего по видам и на одно обновление
+    """
+    def __init__(self, history: int = 1000):
+        self._lock = threading.Lock()
+        self._ops: Dict[str, int] = {}
+        self._updates = 0
+        self._update_ops = 0
+        self._max = 0
+        self._history: deque = deque(maxlen=history)
+
+    def count(self, op: str) -> None:
+        with self._lock:
+            self._ops[op] = self._ops.get(op, 0) + 1
+        ops = _update_ops.get()
+        if ops is not None:
+            ops[op] = ops.get(op, 0) + 1
+
+    def record_update(self, ops: Dict[str, int]) -> None:
+        total = sum(ops.values())
+        with self._lock:
+            self._updates += 1
+            self._update_ops += total
+            self._max = max(self._max, total)
+            self._history.append(total)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            ordered = sorted(self._history)
+            return {
+                "updates": self._updates,
+                "ops": dict(self._ops),
+                "ops_per_update": round(self._update_ops / self._updates, 2) if self._updates else None,
+                "ops_per_update_p99": ordered[int(0.99 * (len(ordered) - 1))] if ordered else None,
+                "ops_per_update_max": self._max
+            }
+
+_fsm_op_stats = FsmOpStats()
+
+def get_fsm_op_stats() -> FsmOpStats:
+    return _fsm_op_stats
+
+class CountingStorage(BaseStorage):
+    """
+    Обертка хранилища FSM, считающая вызовы (каждый - обращение к хранилищу)
+    """
+    def __init__(self, storage: BaseStorage, stats: Optional[FsmOpStats] = None):
+        self.storage = storage
+        self.stats = stats or get_fsm_op_stats()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self.stats.count("set_state")
+        await self.storage.set_state(key, state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        self.stats.count("get_state")
+        return await self.storage.get_state(key)
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        self.stats.count("set_data")
+        await self.storage.set_data(key, data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        self.stats.count("get_data")
+        return await self.storage.get_data(key)
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        self.stats.count("update_data")
+        return await self.storage.update_data(key, data)
+
+    async def set_session(self, key: StorageKey, state: StateType, data: Mapping[str, Any]) -> None:
+        """
+        Состояние и данные одним обращением, если хранилище это умеет
+        """
+        if hasattr(self.storage, "set_session"):
+            self.stats.count("set_session")
+            await self.storage.set_session(key, state, data)
+        else:
+            await self.set_state(key, state)
+            await self.set_data(key, data)
+
+    async def close(self) -> None:
+        await self.storage.close()
+
+class FsmOpsMiddleware(BaseMiddleware):
+    """
+    Подсчет операций хранилища FSM на одно обновление. Регистрируется
+    первым, до промежуточного слоя FSM: его чтение состояния тоже считается
+    """
+    def __init__(self, stats: Optional[FsmOpStats] = None):
+        self.stats = stats or get_fsm_op_stats()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        ops: Dict[str, int] = {}
+        token = _update_ops.set(ops)
+        try:
+            return await handler(event, data)
+        finally:
+            _update_ops.reset(token)
+            self.stats.record_update(ops)
+            if isinstance(event, Update):
+                logging.debug(f"Обновление {event.update_id}: операций FSM {sum(ops.values())} {ops}")
+
+def create_fsm_storage() -> BaseStorage:
+    """
+    Хранилище состояний FSM, выбранное в FSM_STORAGE
+    """
+    if FSM_STORAGE == "memory":
+        return MemoryStorage()
+    return SqliteFsmStorage()
@@ -0,0 +1,58 @@
+import importlib
+import logging
+import threading
+import time
+from types import ModuleType
+from typing import Callable, Dict, Optional
+
+class LazyModule:
+    """
+    Модуль, который импортируется при первом обращении к атрибуту.
+
+    Тяжелые зависимости (matplotlib, fpdf2, fontTools) нужны только для
+    PDF, а большинство апдейтов бота их не касается: отложенный импорт
+    убирает их из холодного старта. on_load вызывается один раз сразу
+    после импорта (например, для настройки бэкенда).
+    """
+    def __init__(self, name: str, on_load: Optional[Callable[[ModuleType], None]] = None):
+        self.__dict__["_name"] = name
+        self.__dict__["_on_load"] = on_load
+        self.__dict__["_module"] = None
+
+    def load(self) -> ModuleType:
+        module = self.__dict__["_module"]
+        if module is None:
+            # Импорт потокобезопасен: повторный вызов дождется первого
+            with _load_lock:
+                module = self.__dict__["_module"]
+                if module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    if self._on_load is not None:
+                        self._on_load(module)
+                    self.__dict__["_module"] = module
+                    load_times[self._name] = time.perf_counter() - started
+                    logging.debug(f"Отложенный импорт {self._name}: {load_times[self._name] * 1e3:.0f} мс")
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__["_module"] is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+    def __setattr__(self, attr: str, value) -> None:
+        setattr(self.load(), attr, value)
+
+    def __repr__(self) -> str:
+        state = "загружен" if self.loaded else "не загружен"
+        return f"<LazyModule {self._name} ({state})>"
+
+_load_lock = threading.RLock()
+
+# Время отложенного импорта по модулям (секунды)
+load_times: Dict[str, float] = {}
+
+def lazy_import(name: str, on_load: Optional[Callable[[ModuleType], None]] = None) -> LazyModule:
+    return LazyModule(name, on_load)
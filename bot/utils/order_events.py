@@ -0,0 +1,45 @@
+import logging
+from typing import Dict, Any, List
+
+class OrderListener:
+    """
+    Подписчик на изменения заказов в хранилище.
+
+    reset() получает полный список заказов при подписке и после полной
+    перезагрузки хранилища, остальные методы вызываются на каждое изменение,
+    включая изменения, сделанные другими процессами.
+    """
+    def reset(self, orders: List[Dict[str, Any]]) -> None:
+        pass
+
+    def order_added(self, order: Dict[str, Any]) -> None:
+        pass
+
+    def status_changed(self, order: Dict[str, Any], old_status: Any) -> None:
+        pass
+
+class OrderListeners:
+    """
+    Набор подписчиков; ошибка одного подписчика не мешает записи и остальным
+    """
+    def __init__(self):
+        self._listeners: List[OrderListener] = []
+
+    def add(self, listener: OrderListener) -> None:
+        self._listeners.append(listener)
+
+    def _emit(self, method: str, *args) -> None:
+        for listener in self._listeners:
+            try:
+                getattr(listener, method)(*args)
+            except Exception as e:
+                logging.error(f"Ошибка подписчика {type(listener).__name__}.{method}: {e}", exc_info=True)
+
+    def reset(self, orders: List[Dict[str, Any]]) -> None:
+        self._emit("reset", orders)
+
+    def order_added(self, order: Dict[str, Any]) -> None:
+        self._emit("order_added", order)
+
+    def status_changed(self, order: Dict[str, Any], old_status: Any) -> None:
+        self._emit("status_changed", order, old_status)
@@ -0,0 +1,216 @@
+import base64
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Any, List, Optional, Tuple
+
+from bot.utils.order_time import ensure_order_ts
+
+# Ключ индекса по дате: (order_ts, -позиция). Обход ключей с конца дает
+# порядок "от новых к старым", а заказы с одинаковой датой остаются
+# в порядке добавления, как при устойчивой сортировке с reverse=True.
+DateKey = Tuple[int, int]
+
+# Курсор постраничного вывода: (order_ts, order_id) последнего заказа страницы
+Cursor = Tuple[int, str]
+
+_ALL = object()
+
+def encode_cursor(order: Dict[str, Any]) -> str:
+    """
+    Непрозрачный токен курсора для заказа
+    """
+    raw = f"{order['order_ts']}:{order.get('order_id', '')}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str) -> Cursor:
+    """
+    Разбор токена курсора. При неверном формате выбрасывает ValueError
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("utf-8")
+        order_ts, order_id = raw.split(":", 1)
+        return int(order_ts), order_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Некорректный курсор: {token}") from e
+
+class OrderIndex:
+    """
+    Вторичные индексы заказов в памяти: по order_id, user_id, статусу и дате.
+
+    Индексы обновляются инкрементально при добавлении заказа и смене
+    статуса, поэтому выборка k заказов стоит O(k), а не O(всех заказов).
+    Индекс по дате отсортирован по order_ts, поэтому выборка за период
+    и постраничный вывод "от новых к старым" сводятся к bisect и срезу.
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self._orders: List[Dict[str, Any]] = []
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._position: Dict[str, int] = {}
+        self._by_user: Dict[Any, List[Dict[str, Any]]] = {}
+        self._by_status: Dict[Any, Dict[str, Dict[str, Any]]] = {}
+        self._by_date: Dict[Any, List[DateKey]] = {_ALL: []}
+
+    def _date_key(self, order: Dict[str, Any], position: int) -> DateKey:
+        return order["order_ts"], -position
+
+    def add(self, order: Dict[str, Any], _sorted: bool = True) -> None:
+        """
+        Добавление заказа во все индексы. Заказ с уже известным order_id
+        заменяет прежний на его месте
+        """
+        ensure_order_ts(order)
+        order_id = order.get("order_id")
+        if order_id is not None and order_id in self._by_id:
+            self._replace(order_id, order, _sorted)
+            return
+        position = len(self._orders)
+        self._orders.append(order)
+        key = self._date_key(order, position)
+        insert = insort if _sorted else list.append
+        insert(self._by_date[_ALL], key)
+        if order_id is None:
+            return
+        self._by_id[order_id] = order
+        self._position[order_id] = position
+        self._by_user.setdefault(order.get("user_id"), []).append(order)
+        self._by_status.setdefault(order.get("status"), {})[order_id] = order
+        insert(self._by_date.setdefault(order.get("status"), []), key)
+
+    def _replace(self, order_id: str, order: Dict[str, Any], _sorted: bool) -> None:
+        old = self._by_id[order_id]
+        position = self._position[order_id]
+        old_key = self._date_key(old, position)
+        key = self._date_key(order, position)
+
+        def discard(keys: List[DateKey]) -> None:
+            if _sorted:
+                i = bisect_left(keys, old_key)
+                if i < len(keys) and keys[i] == old_key:
+                    del keys[i]
+            else:
+                keys.remove(old_key)
+
+        insert = insort if _sorted else list.append
+        discard(self._by_date[_ALL])
+        insert(self._by_date[_ALL], key)
+        self._orders[position] = order
+        self._by_id[order_id] = order
+
+        user_orders = self._by_user.get(old.get("user_id"), [])
+        i = next(i for i, item in enumerate(user_orders) if item is old)
+        if old.get("user_id") == order.get("user_id"):
+            user_orders[i] = order
+        else:
+            del user_orders[i]
+            if not user_orders:
+                del self._by_user[old.get("user_id")]
+            self._by_user.setdefault(order.get("user_id"), []).append(order)
+
+        old_status = old.get("status")
+        self._by_status[old_status].pop(order_id)
+        if not self._by_status[old_status]:
+            del self._by_status[old_status]
+        self._by_status.setdefault(order.get("status"), {})[order_id] = order
+        discard(self._by_date[old_status])
+        if not self._by_date[old_status]:
+            del self._by_date[old_status]
+        insert(self._by_date.setdefault(order.get("status"), []), key)
+
+    def load(self, orders: List[Dict[str, Any]]) -> None:
+        """
+        Массовая загрузка (снапшот): индексы по дате сортируются один раз в конце
+        """
+        for order in orders:
+            self.add(order, _sorted=False)
+        for keys in self._by_date.values():
+            keys.sort()
+
+    def set_status(self, order_id: str, status: str) -> Optional[Dict[str, Any]]:
+        """
+        Смена статуса заказа с переносом между индексами статусов
+        """
+        order = self._by_id.get(order_id)
+        if order is None:
+            return None
+        old_status = order.get("status")
+        key = self._date_key(order, self._position[order_id])
+
+        orders = self._by_status.get(old_status)
+        if orders is not None:
+            orders.pop(order_id, None)
+            if not orders:
+                del self._by_status[old_status]
+        keys = self._by_date.get(old_status)
+        if keys is not None:
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+            if not keys:
+                del self._by_date[old_status]
+
+        order["status"] = status
+        self._by_status.setdefault(status, {})[order_id] = order
+        insort(self._by_date.setdefault(status, []), key)
+        return order
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self._by_id
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def all(self) -> List[Dict[str, Any]]:
+        return list(self._orders)
+
+    def get(self, order_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(order_id)
+
+    def by_user(self, user_id: Any) -> List[Dict[str, Any]]:
+        return list(self._by_user.get(user_id, ()))
+
+    def by_status(self, status: Any) -> List[Dict[str, Any]]:
+        orders = list(self._by_status.get(status, {}).values())
+        # После смены статуса заказ попадает в конец; восстанавливаем порядок добавления
+        orders.sort(key=lambda order: self._position[order["order_id"]])
+        return orders
+
+    def _date_keys(self, status: Any = None) -> List[DateKey]:
+        return self._by_date.get(_ALL if status is None else status, [])
+
+    def by_date(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Заказы с start_ts <= order_ts <= end_ts в хронологическом порядке
+        """
+        keys = self._date_keys()
+        lo = bisect_left(keys, (start_ts, float("-inf"))) if start_ts is not None else 0
+        hi = bisect_right(keys, (end_ts, float("inf"))) if end_ts is not None else len(keys)
+        return [self._orders[-neg_position] for _, neg_position in keys[lo:hi]]
+
+    def newest_first(
+        self,
+        status: Any = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cursor: Optional[Cursor] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Страница заказов "от новых к старым" и общее число заказов (с фильтром по статусу).
+
+        С курсором страница начинается сразу после заказа из курсора,
+        а offset отсчитывается от него: O(limit + log N) на любой глубине.
+        """
+        keys = self._date_keys(status)
+        total = len(keys)
+        end = total
+        if cursor is not None:
+            order_ts, order_id = cursor
+            position = self._position.get(order_id)
+            if position is not None:
+                end = bisect_left(keys, (order_ts, -position))
+            else:
+                end = bisect_left(keys, (order_ts, float("-inf")))
+        hi = max(end - offset, 0)
+        lo = 0 if limit is None else max(hi - limit, 0)
+        return [self._orders[-neg_position] for _, neg_position in reversed(keys[lo:hi])], total
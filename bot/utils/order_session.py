@@ -0,0 +1,136 @@
+import dataclasses
+from dataclasses import dataclass, field
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType
+from aiogram.types import TelegramObject
+
+@dataclass
+class OrderDraft:
+    """
+    Данные мастера заказа в состоянии FSM
+    """
+    district_id: Optional[int] = None
+    district_name: Optional[str] = None
+    base_price: Optional[int] = None
+    depth: Optional[int] = None
+    ground_type: Optional[str] = None
+    price_per_meter: Optional[int] = None
+    drilling_cost: Optional[int] = None
+    equipment_type: Optional[str] = None
+    selected_equipment_key: Optional[str] = None
+    equipment_name: Optional[str] = None
+    equipment_price: Optional[int] = None
+    total_cost: Optional[int] = None
+    user_id: Optional[int] = None
+    username: Optional[str] = None
+    full_name: Optional[str] = None
+    phone: Optional[str] = None
+    order_id: Optional[str] = None
+    order_date: Optional[str] = None
+    # Прочие ключи данных FSM сохраняются как есть
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_data(cls, data: Dict[str, Any]) -> "OrderDraft":
+        known = {name: value for name, value in data.items() if name in _DRAFT_FIELDS}
+        extra = {name: value for name, value in data.items() if name not in _DRAFT_FIELDS}
+        return cls(**known, extra=extra)
+
+    def to_data(self) -> Dict[str, Any]:
+        # Пустые поля не хранятся: чтение через get() дает тот же результат
+        data = {name: getattr(self, name) for name in _DRAFT_FIELDS if getattr(self, name) is not None}
+        data.update(self.extra)
+        return data
+
+_DRAFT_FIELDS = tuple(item.name for item in dataclasses.fields(OrderDraft) if item.name != "extra")
+
+class OrderSession:
+    """
+    Состояние мастера заказа на время обработки одного обновления.
+
+    Данные читаются из хранилища один раз при первом обращении (load()),
+    обработчик меняет состояние и OrderDraft в памяти, а после обработчика
+    commit() записывает изменения одним обращением к хранилищу (если
+    хранилище умеет set_session) вместо цепочки update_data и get_data.
+    Без изменений запись не делается. Состояние текущего обновления уже
+    прочитано промежуточным слоем FSM (raw_state) и не читается повторно.
+    """
+    def __init__(self, context: FSMContext, raw_state: Optional[str] = None):
+        self.context = context
+        self._state = raw_state
+        self._saved_state = raw_state
+        self._draft: Optional[OrderDraft] = None
+        self._saved_data: Optional[Dict[str, Any]] = None
+
+    @property
+    def state(self) -> Optional[str]:
+        return self._state
+
+    def set_state(self, state: StateType = None) -> None:
+        self._state = state.state if isinstance(state, State) else state
+
+    async def load(self) -> OrderDraft:
+        """
+        Данные заказа (из хранилища - только при первом вызове)
+        """
+        if self._draft is None:
+            self._saved_data = await self.context.get_data()
+            self._draft = OrderDraft.from_data(self._saved_data)
+        return self._draft
+
+    def clear(self) -> None:
+        """
+        Сброс состояния и данных (как FSMContext.clear())
+        """
+        self._state = None
+        self._draft = OrderDraft()
+
+    async def commit(self) -> None:
+        """
+        Запись изменений состояния и данных одним обращением. Вызывается
+        промежуточным слоем после обработчика; обработчик может записать
+        изменения раньше, если дальше идет долгая работа
+        """
+        state_changed = self._state != self._saved_state
+        data = self._draft.to_data() if self._draft is not None else None
+        data_changed = data is not None and data != self._saved_data
+        if state_changed and data_changed:
+            storage = self.context.storage
+            if hasattr(storage, "set_session"):
+                await storage.set_session(self.context.key, self._state, data)
+            else:
+                await self.context.set_state(self._state)
+                await self.context.set_data(data)
+        elif state_changed:
+            await self.context.set_state(self._state)
+        elif data_changed:
+            await self.context.set_data(data)
+        self._saved_state = self._state
+        if data_changed:
+            self._saved_data = data
+
+class OrderSessionMiddleware(BaseMiddleware):
+    """
+    Передает обработчикам OrderSession (аргумент session) и записывает
+    изменения после обработчика, в том числе если он завершился ошибкой:
+    как и при записи по ходу обработки, выполненные шаги не теряются
+    """
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        context: Optional[FSMContext] = data.get("state")
+        if context is None:
+            return await handler(event, data)
+        session = OrderSession(context, data.get("raw_state"))
+        data["session"] = session
+        try:
+            return await handler(event, data)
+        finally:
+            await session.commit()
@@ -0,0 +1,372 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+from bot.utils.order_events import OrderListener, OrderListeners
+from bot.utils.order_index import OrderIndex, Cursor
+from bot.utils.order_time import ensure_order_ts
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессная блокировка недоступна
+    fcntl = None
+
+# Снапшот заказов (прежний формат orders.json) и журнал изменений после него
+ORDERS_FILE = os.path.join("data", "orders.json")
+ORDERS_JOURNAL_FILE = os.path.join("data", "orders.journal.jsonl")
+
+class OrderStore:
+    """
+    Хранилище заказов: снапшот orders.json + журнал в формате JSON Lines.
+
+    Новый заказ или смена статуса дописывается в журнал одной строкой,
+    fsync выполняется пачками. Когда журнал вырастает до compact_every
+    записей, он сворачивается в новый снапшот. Существующий orders.json
+    без журнала читается как снапшот, поэтому миграция не требуется.
+
+    У журнала есть поколение (первая строка), а снапшот хранит поколение
+    журнала, который идет после него. Если процесс упал между записью
+    снапшота и очисткой журнала, журнал старого поколения уже учтен
+    в снапшоте: он не воспроизводится, а следующая запись завершает свертку.
+    """
+    def __init__(
+        self,
+        snapshot_path: str = ORDERS_FILE,
+        journal_path: str = ORDERS_JOURNAL_FILE,
+        fsync_every: int = 32,
+        fsync_interval: float = 1.0,
+        compact_every: int = 1000
+    ):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.lock_path = journal_path + ".lock"
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+
+        self._lock = threading.RLock()
+        self._index = OrderIndex()
+        self._listeners = OrderListeners()
+        self._snapshot_signature: Optional[Tuple[int, int, int]] = None
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._generation = 0
+        self._journal_stale = False
+        self._loaded = False
+
+        self._journal = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        os.makedirs(os.path.dirname(journal_path) or ".", exist_ok=True)
+
+    # --- Блокировки ---
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """
+        Межпроцессная блокировка журнала и снапшота
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # --- Загрузка и воспроизведение журнала ---
+
+    def _signature(self, path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        """
+        Применение одной записи журнала к состоянию в памяти
+        """
+        op = record.get("op")
+        if op == "add":
+            order = record["order"]
+            existing = self._index.get(order.get("order_id"))
+            self._index.add(order)
+            if existing is None:
+                self._listeners.order_added(order)
+            elif existing.get("status") != order.get("status"):
+                # Повторная запись заказа заменяет прежнюю
+                self._listeners.status_changed(order, existing.get("status"))
+        elif op == "status":
+            order = self._index.get(record.get("order_id"))
+            old_status = order.get("status") if order is not None else None
+            if self._index.set_status(record.get("order_id"), record.get("status")) is not None:
+                self._listeners.status_changed(order, old_status)
+
+    def _load_snapshot(self) -> None:
+        self._index.clear()
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            self._index.load(data.get("orders", []))
+            self._generation = data.get("journal_generation", 0)
+        else:
+            self._generation = 0
+        self._listeners.reset(self._index.all())
+        self._snapshot_signature = self._signature(self.snapshot_path)
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._journal_stale = False
+
+    def _replay_journal(self) -> None:
+        """
+        Применение записей журнала, добавленных после последнего чтения
+        """
+        try:
+            size = os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            size = 0
+        if size <= self._journal_offset or self._journal_stale:
+            return
+
+        with open(self.journal_path, "rb") as file:
+            file.seek(self._journal_offset)
+            chunk = file.read(size - self._journal_offset)
+
+        # Незавершенная последняя строка (запись в процессе или сбой) пропускается
+        end = chunk.rfind(b"\n") + 1
+        lines = chunk[:end].splitlines()
+        if self._journal_offset == 0:
+            # Журнал без заголовка (прежний формат) - поколение 0
+            generation = 0
+            if lines and lines[0].startswith(b'{"op": "generation"'):
+                try:
+                    generation = json.loads(lines.pop(0))["generation"]
+                except (ValueError, KeyError) as e:
+                    logging.error(f"Поврежден заголовок журнала заказов: {e}")
+            if generation < self._generation:
+                # Записи уже в снапшоте: свертка прервалась до очистки журнала
+                logging.warning(f"Журнал заказов поколения {generation} уже учтен в снапшоте, пропущен")
+                self._journal_stale = True
+                return
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                self._apply(json.loads(line))
+                self._journal_records += 1
+            except (ValueError, KeyError) as e:
+                logging.error(f"Пропущена поврежденная запись журнала заказов: {e}")
+        self._journal_offset += end
+
+    def _refresh(self) -> None:
+        """
+        Синхронизация состояния в памяти с файлами (в т.ч. с записями других процессов)
+        """
+        if not self._loaded or self._signature(self.snapshot_path) != self._snapshot_signature:
+            self._load_snapshot()
+            self._loaded = True
+        self._replay_journal()
+
+    # --- Запись ---
+
+    def _header(self) -> bytes:
+        return json.dumps({"op": "generation", "generation": self._generation}).encode("utf-8") + b"\n"
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        if self._journal is None:
+            self._journal = open(self.journal_path, "ab")
+
+        line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+        if self._journal.tell() == 0:
+            # Новый журнал начинается с поколения, следующего за снапшотом
+            line = self._header() + line
+        self._journal.write(line)
+        self._journal.flush()
+        self._journal_offset = self._journal.tell()
+        self._journal_records += 1
+        self._unsynced += 1
+
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._sync()
+
+    def _sync(self) -> None:
+        if self._journal is not None and self._unsynced:
+            os.fsync(self._journal.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        with self._file_lock(exclusive=True):
+            self._refresh()
+            if self._journal_stale:
+                # Завершение прерванной свертки: журнал очищается вместе с новым снапшотом
+                self._compact()
+            if record.get("op") == "status" and record.get("order_id") not in self._index:
+                raise KeyError(record.get("order_id"))
+            self._append(record)
+            self._apply(record)
+            if self._journal_records >= self.compact_every:
+                self._compact()
+
+    def _compact(self) -> None:
+        """
+        Свертка журнала в новый снапшот (вызывается под эксклюзивной блокировкой)
+        """
+        generation = self._generation + 1
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"orders": self._index.all(), "journal_generation": generation}, file, ensure_ascii=False, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+        # После замены снапшота журнал прежнего поколения не воспроизводится,
+        # даже если очистить его не удастся
+        os.replace(temp_path, self.snapshot_path)
+        self._generation = generation
+
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        header = self._header()
+        with open(self.journal_path, "wb") as file:
+            file.write(header)
+            file.flush()
+            os.fsync(file.fileno())
+
+        self._snapshot_signature = self._signature(self.snapshot_path)
+        self._journal_offset = len(header)
+        self._journal_records = 0
+        self._journal_stale = False
+        self._unsynced = 0
+
+    # --- Публичный интерфейс ---
+
+    def add_order(self, order_data: Dict[str, Any]) -> None:
+        """
+        Добавление нового заказа
+        """
+        ensure_order_ts(order_data)
+        with self._lock:
+            self._write({"op": "add", "order": order_data})
+
+    def update_order_status(self, order_id: str, status: str) -> bool:
+        """
+        Обновление статуса заказа. Возвращает False, если заказ не найден
+        """
+        with self._lock:
+            try:
+                self._write({"op": "status", "order_id": order_id, "status": status})
+            except KeyError:
+                return False
+            return True
+
+    def _read(self) -> OrderIndex:
+        """
+        Индексы, синхронизированные с файлами (вызывается под self._lock)
+        """
+        with self._file_lock(exclusive=False):
+            self._refresh()
+        return self._index
+
+    def get_orders(self) -> List[Dict[str, Any]]:
+        """
+        Получение списка заказов в порядке добавления
+        """
+        with self._lock:
+            return self._read().all()
+
+    def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Получение заказа по ID
+        """
+        with self._lock:
+            return self._read().get(order_id)
+
+    def get_user_orders(self, user_id: int) -> List[Dict[str, Any]]:
+        """
+        Получение заказов пользователя
+        """
+        with self._lock:
+            return self._read().by_user(user_id)
+
+    def get_orders_by_status(self, status: str) -> List[Dict[str, Any]]:
+        """
+        Получение заказов с указанным статусом
+        """
+        with self._lock:
+            return self._read().by_status(status)
+
+    def get_orders_by_date(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Получение заказов за период (границы включительно) в хронологическом порядке
+        """
+        with self._lock:
+            return self._read().by_date(start_ts, end_ts)
+
+    def get_orders_page(
+        self,
+        status: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cursor: Optional[Cursor] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Страница заказов от новых к старым и общее количество
+        """
+        with self._lock:
+            return self._read().newest_first(status, offset, limit, cursor)
+
+    def refresh(self) -> None:
+        """
+        Применение изменений, сделанных другими процессами
+        """
+        with self._lock:
+            self._read()
+
+    def subscribe(self, listener: OrderListener) -> None:
+        """
+        Подписка на изменения заказов: listener сразу получает текущие заказы
+        """
+        with self._lock:
+            self._read()
+            listener.reset(self._index.all())
+            self._listeners.add(listener)
+
+    def flush(self) -> None:
+        """
+        Принудительный fsync журнала
+        """
+        with self._lock:
+            self._sync()
+
+    def compact(self) -> None:
+        """
+        Принудительная свертка журнала в снапшот
+        """
+        with self._lock:
+            with self._file_lock(exclusive=True):
+                self._refresh()
+                self._compact()
+
+_store: Optional[OrderStore] = None
+_store_lock = threading.Lock()
+
+def get_order_store() -> OrderStore:
+    """
+    Общий экземпляр хранилища заказов
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = OrderStore()
+                atexit.register(_store.flush)
+    return _store
@@ -0,0 +1,53 @@
+import calendar
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+
+# Формат даты заказа, который показывается пользователю и хранится в order_date
+ORDER_DATE_FORMAT = "%d.%m.%Y %H:%M"
+DEFAULT_ORDER_DATE = "01.01.2000 00:00"
+
+# Формат дат в параметрах start_date/end_date API
+QUERY_DATE_FORMAT = "%Y-%m-%d"
+
+SECONDS_PER_DAY = 86400
+
+def to_timestamp(value: datetime) -> int:
+    """
+    Секунды от эпохи для локального времени заказа.
+
+    Время кодируется как UTC без сдвига часового пояса, поэтому
+    ts // 86400 совпадает с календарным днем заказа.
+    """
+    return calendar.timegm(value.timetuple())
+
+def from_timestamp(ts: int) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(seconds=ts)
+
+def parse_order_date(order_date: Optional[str]) -> int:
+    """
+    Преобразование order_date ("ДД.ММ.ГГГГ ЧЧ:ММ") в order_ts
+    """
+    try:
+        return to_timestamp(datetime.strptime(order_date, ORDER_DATE_FORMAT))
+    except (TypeError, ValueError):
+        return to_timestamp(datetime.strptime(DEFAULT_ORDER_DATE, ORDER_DATE_FORMAT))
+
+def ensure_order_ts(order: Dict[str, Any]) -> int:
+    """
+    Проставление order_ts заказу, у которого его нет (старые записи)
+    """
+    ts = order.get("order_ts")
+    if not isinstance(ts, int):
+        ts = parse_order_date(order.get("order_date", DEFAULT_ORDER_DATE))
+        order["order_ts"] = ts
+    return ts
+
+def date_range(start_date: Optional[str] = None, end_date: Optional[str] = None) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Границы фильтра start_date/end_date ("ГГГГ-ММ-ДД") в виде order_ts.
+
+    Обе границы включительные; end_date включает весь указанный день.
+    """
+    start_ts = to_timestamp(datetime.strptime(start_date, QUERY_DATE_FORMAT)) if start_date else None
+    end_ts = to_timestamp(datetime.strptime(end_date, QUERY_DATE_FORMAT)) + SECONDS_PER_DAY if end_date else None
+    return start_ts, end_ts
@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+# Каталог и предельный размер кэша готовых PDF
+PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR', os.path.join("data", "pdf_cache"))
+PDF_CACHE_MAX_MB = float(os.environ.get('PDF_CACHE_MAX_MB', 100))
+
+class PdfArtifact:
+    """
+    Запись кэша: размер PDF на диске, URL в хранилище файлов и file_id в Telegram
+    """
+    __slots__ = ("key", "size", "url", "file_id")
+
+    def __init__(self, key: str, size: int, url: Optional[str] = None, file_id: Optional[str] = None):
+        self.key = key
+        self.size = size
+        self.url = url
+        self.file_id = file_id
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"size": self.size, "url": self.url, "file_id": self.file_id}
+
+class PdfCache:
+    """
+    Кэш готовых PDF с адресацией по содержимому.
+
+    Ключ - хэш полей заказа, попадающих в PDF (order_pdf_key), поэтому
+    смена статуса не сбрасывает запись, а изменение данных дает новый ключ.
+    На диске для ключа хранятся <key>.pdf и <key>.json (URL и file_id).
+    Когда суммарный размер превышает max_bytes, удаляются записи,
+    к которым дольше всего не обращались (LRU по времени изменения файлов,
+    общему для процессов бота и API).
+    """
+    def __init__(self, directory: str = PDF_CACHE_DIR, max_bytes: int = int(PDF_CACHE_MAX_MB * 1024 * 1024)):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, PdfArtifact]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evicted = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def _scan(self) -> None:
+        """
+        Восстановление индекса по файлам каталога (от старых записей к новым)
+        """
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pdf"):
+                continue
+            key = name[:-4]
+            artifact = self._load(key)
+            if artifact is not None:
+                found.append((os.path.getmtime(self._path(key, "pdf")), artifact))
+        for _, artifact in sorted(found, key=lambda item: item[0]):
+            self._entries[artifact.key] = artifact
+            self._bytes += artifact.size
+
+    def _load(self, key: str) -> Optional[PdfArtifact]:
+        try:
+            size = os.path.getsize(self._path(key, "pdf"))
+        except OSError:
+            return None
+        meta = {}
+        try:
+            with open(self._path(key, "json"), "r", encoding="utf-8") as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            pass
+        return PdfArtifact(key, size, meta.get("url"), meta.get("file_id"))
+
+    def _write(self, path: str, data: bytes) -> None:
+        # Запись через временный файл: читатели не видят недописанный PDF
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+    def _save_meta(self, artifact: PdfArtifact) -> None:
+        self._write(self._path(artifact.key, "json"), json.dumps(artifact.to_dict()).encode("utf-8"))
+
+    def _remove(self, key: str) -> None:
+        artifact = self._entries.pop(key, None)
+        if artifact is not None:
+            self._bytes -= artifact.size
+        for ext in ("pdf", "json"):
+            try:
+                os.remove(self._path(key, ext))
+            except OSError:
+                pass
+
+    def _touch(self, key: str) -> None:
+        self._entries.move_to_end(key)
+        try:
+            os.utime(self._path(key, "pdf"))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[PdfArtifact]:
+        """
+        Запись кэша по ключу или None. Записи, добавленные другим процессом,
+        подхватываются с диска.
+        """
+        with self._lock:
+            artifact = self._entries.get(key)
+            if artifact is None:
+                artifact = self._load(key)
+                if artifact is not None:
+                    self._entries[key] = artifact
+                    self._bytes += artifact.size
+            elif artifact.file_id is None or artifact.url is None:
+                # URL или file_id мог сохранить другой процесс
+                stored = self._load(key)
+                if stored is not None:
+                    artifact.url = artifact.url or stored.url
+                    artifact.file_id = artifact.file_id or stored.file_id
+            if artifact is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._touch(key)
+            return artifact
+
+    def read(self, key: str) -> Optional[bytes]:
+        """
+        Содержимое PDF или None, если запись вытеснена
+        """
+        try:
+            with open(self._path(key, "pdf"), "rb") as file:
+                return file.read()
+        except OSError:
+            # Файл удалил другой процесс при вытеснении
+            with self._lock:
+                artifact = self._entries.pop(key, None)
+                if artifact is not None:
+                    self._bytes -= artifact.size
+            return None
+
+    def put(self, key: str, content: bytes, url: Optional[str] = None) -> PdfArtifact:
+        """
+        Сохранение PDF с вытеснением старых записей сверх max_bytes
+        """
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._bytes -= previous.size
+            artifact = PdfArtifact(key, len(content), url or (previous.url if previous else None),
+                                   previous.file_id if previous else None)
+            self._write(self._path(key, "pdf"), content)
+            self._save_meta(artifact)
+            self._entries[key] = artifact
+            self._entries.move_to_end(key)
+            self._bytes += artifact.size
+
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evicted += 1
+            return artifact
+
+    def set_url(self, key: str, url: str) -> None:
+        self._update(key, url=url)
+
+    def set_file_id(self, key: str, file_id: str) -> None:
+        """
+        Сохранение file_id отправленного документа: повторная отправка идет без загрузки файла
+        """
+        self._update(key, file_id=file_id)
+
+    def _update(self, key: str, **fields) -> None:
+        with self._lock:
+            artifact = self._entries.get(key)
+            if artifact is None:
+                return
+            for name, value in fields.items():
+                setattr(artifact, name, value)
+            try:
+                self._save_meta(artifact)
+            except OSError as e:
+                logging.error(f"Ошибка при сохранении данных PDF {key} в кэше: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evicted": self._evicted
+            }
+
+_pdf_cache: Optional[PdfCache] = None
+
+def get_pdf_cache() -> PdfCache:
+    global _pdf_cache
+    if _pdf_cache is None:
+        _pdf_cache = PdfCache()
+    return _pdf_cache
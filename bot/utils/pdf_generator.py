@@ -1,153 +1,551 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
 import os
+import threading
 import time
 from datetime import datetime
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')  # Использование Agg бэкенда для работы без GUI
-from fpdf import FPDF
-from vercel_blob import put # Импортируем функцию put
 import io # Для работы с байтами в памяти
+from typing import NamedTuple, Optional
 
-# Получаем токен из переменных окружения
-BLOB_READ_WRITE_TOKEN = os.environ.get('BLOB_READ_WRITE_TOKEN')
+from bot.utils.workers import WorkerPool, Job
+from bot.utils.pdf_cache import get_pdf_cache
+from bot.utils.blob_storage import BlobUploadError, get_blob_storage
+from bot.utils.lazy import lazy_import
+
+# Тяжелые зависимости импортируются при первом PDF, а не при старте бота.
+# Графики рисуются через FigureCanvasAgg напрямую, без выбора бэкенда pyplot
+mpl_figure = lazy_import("matplotlib.figure")
+mpl_backend_agg = lazy_import("matplotlib.backends.backend_agg")
+fpdf = lazy_import("fpdf")
+fpdf_fonts = lazy_import("fpdf.fonts")
+ttLib = lazy_import("fontTools.ttLib")
+subset = lazy_import("fontTools.subset")
+
+# Фоновый прогрев воркеров PDF после старта (1 - включен)
+PDF_WARMUP = os.environ.get('PDF_WARMUP', '0') == '1'
+
+# Пул рендеринга PDF: процессы не конкурируют с циклом событий за GIL
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', 2))
+PDF_QUEUE_LIMIT = int(os.environ.get('PDF_QUEUE_LIMIT', 100))
+PDF_TIMEOUT = float(os.environ.get('PDF_TIMEOUT', 30))
+PDF_POOL = os.environ.get('PDF_POOL', 'process')  # process | thread
 
 # Пути к шрифтам
 FONT_DIR = "fonts"
 FONT_REGULAR_PATH = os.path.join(FONT_DIR, "DejaVuSansCondensed.ttf")
 FONT_BOLD_PATH = os.path.join(FONT_DIR, "DejaVuSansCondensed-Bold.ttf") # Добавили путь к жирному
 
-# Функция для генерации PDF заказа
-def generate_order_pdf(order_data: dict) -> str | None:
+class OrderPdf(NamedTuple):
     """
-    Генерация PDF-файла с данными заказа и загрузка в Vercel Blob
-    Возвращает URL файла в Vercel Blob или None в случае ошибки.
+    PDF заказа: содержимое файла, URL в хранилище файлов (если загружен),
+    ключ в кэше PDF и file_id в Telegram (если файл уже отправлялся)
     """
-    if not BLOB_READ_WRITE_TOKEN:
-        print("Ошибка: Токен BLOB_READ_WRITE_TOKEN не найден в переменных окружения.")
-        return None
+    content: Optional[bytes]
+    url: Optional[str]
+    key: Optional[str] = None
+    file_id: Optional[str] = None
+
+# Символы, которые встречаются в PDF заказа: латиница, кириллица, знаки препинания, ₽ и №
+ORDER_CHARSET = frozenset(
+    list(range(0x20, 0x7F)) + list(range(0xA0, 0x100)) + list(range(0x400, 0x460))
+    + list(range(0x2010, 0x2030)) + [0x20BD, 0x2116]
+)
+
+# Каталог для урезанных до ORDER_CHARSET копий шрифтов
+FONT_CACHE_DIR = os.environ.get('FONT_CACHE_DIR', os.path.join("data", "font_cache"))
+
+def _reduced_font(path: str, charset: frozenset) -> str:
+    """
+    Путь к копии шрифта, урезанной до charset (строится один раз и кэшируется на диске).
 
+    Полный DejaVu содержит тысячи глифов: его разбор и подмножество при
+    каждом output() стоят дороже самой верстки. Урезанный шрифт в разы меньше.
+    """
+    stat = os.stat(path)
+    key = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}:{sorted(charset)}".encode()).hexdigest()[:12]
+    name, ext = os.path.splitext(os.path.basename(path))
+    cached = os.path.join(FONT_CACHE_DIR, f"{name}-{key}{ext}")
+    if os.path.exists(cached):
+        return cached
+
+    font = ttLib.TTFont(path, recalcTimestamp=False)
+    options = subset.Options()
+    options.notdef_outline = True
+    options.name_IDs = ['*']
+    options.layout_features = ['*']
+    options.glyph_names = True
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=charset)
+    subsetter.subset(font)
+
+    # Запись через временный файл: воркеры пула могут строить кэш одновременно
+    os.makedirs(FONT_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cached}.{os.getpid()}.tmp"
+    font.save(tmp_path)
+    os.replace(tmp_path, cached)
+    return cached
+
+def _create_pdf(regular_path: str = FONT_REGULAR_PATH, bold_path: str = FONT_BOLD_PATH) -> tuple["fpdf.FPDF", str] | None:
+    """
+    Новый документ с подключенными шрифтами и имя семейства шрифта (DejaVu или Arial)
+    """
     # Проверяем наличие файлов шрифтов
-    fonts_available = os.path.exists(FONT_REGULAR_PATH) and os.path.exists(FONT_BOLD_PATH)
-    use_dejavu = True
+    fonts_available = os.path.exists(regular_path) and os.path.exists(bold_path)
 
-    if not fonts_available:
-        print(f"Ошибка: Файлы шрифтов DejaVu не найдены в {FONT_DIR}")
-        # Пытаемся использовать Arial как запасной вариант
-        use_dejavu = False
-        try:
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font('Arial', '', 12) # Используем Arial
-            print("Предупреждение: Используется запасной шрифт Arial.")
-        except RuntimeError:
-             print("Критическая ошибка: Ни DejaVu, ни Arial не доступны.")
-             return None # Не можем создать PDF
-    else:
+    if fonts_available:
         # Создание PDF в памяти
-        pdf = FPDF()
-        pdf.add_page()
+        pdf = fpdf.FPDF()
         # Добавляем ОБА шрифта: обычный и жирный
         try:
-            pdf.add_font('DejaVu', '', FONT_REGULAR_PATH, uni=True)
-            pdf.add_font('DejaVu', 'B', FONT_BOLD_PATH, uni=True) # Добавляем жирный стиль
+            pdf.add_font('DejaVu', '', regular_path, uni=True)
+            pdf.add_font('DejaVu', 'B', bold_path, uni=True) # Добавляем жирный стиль
             pdf.set_font('DejaVu', '', 12) # Устанавливаем DejaVu по умолчанию
+            return pdf, 'DejaVu'
         except Exception as e:
             print(f"Критическая ошибка при добавлении шрифтов DejaVu: {e}")
             print("Попытка использовать Arial...")
-            use_dejavu = False
-            try:
-                pdf = FPDF()
-                pdf.add_page()
-                pdf.set_font('Arial', '', 12)
-                print("Предупреждение: Используется запасной шрифт Arial.")
-            except RuntimeError:
-                print("Критическая ошибка: Ни DejaVu, ни Arial не доступны.")
-                return None
-
-    # Определяем имя шрифта для использования (DejaVu или Arial)
-    font_family = 'DejaVu' if use_dejavu else 'Arial'
-    
-    # Заголовок
-    pdf.set_font(font_family, 'B', 16) # Используем жирный стиль выбранного шрифта
-    pdf.cell(0, 10, 'Заказ на бурение скважины', ln=True, align='C')
-    pdf.ln(10)
-
-    # Основная информация
-    pdf.set_font(font_family, 'B', 14)
-    pdf.cell(0, 10, 'Информация о заказе:', ln=True)
-    pdf.set_font(font_family, '', 12)
+    else:
+        print(f"Ошибка: Файлы шрифтов DejaVu не найдены в {FONT_DIR}")
 
-    # Данные заказа
-    data = [
-        ["№ заказа:", str(order_data.get("order_id", "Не указан"))],
-        ["Дата заказа:", str(order_data.get("order_date", "-"))],
-        ["Район:", str(order_data.get("district_name", "Не указан"))],
-        ["Глубина:", f"{str(order_data.get('depth', 0))} м"],
-        ["Тип грунта:", str(order_data.get("ground_type", "Не указан"))],
-        ["Цена за метр:", f"{str(order_data.get('price_per_meter', 0))} ₽"],
-        ["Стоимость бурения:", f"{str(order_data.get('drilling_cost', 0))} ₽"]
-    ]
-    # Вывод данных заказа
-    for item in data:
-        pdf.cell(60, 10, item[0], border=0)
-        pdf.cell(0, 10, item[1], border=0, ln=True)
-    pdf.ln(5)
-    
-    # Оборудование
-    equipment_name = order_data.get("equipment_name", "Не выбрано")
-    equipment_price = order_data.get("equipment_price", 0)
+    # Пытаемся использовать Arial как запасной вариант
+    try:
+        pdf = fpdf.FPDF()
+        pdf.set_font('Arial', '', 12) # Используем Arial
+        print("Предупреждение: Используется запасной шрифт Arial.")
+        return pdf, 'Arial'
+    except RuntimeError:
+        print("Критическая ошибка: Ни DejaVu, ни Arial не доступны.")
+        return None # Не можем создать PDF
 
-    if equipment_name and equipment_name != "Не выбрано":
-        pdf.set_font(font_family, 'B', 14)
-        pdf.cell(0, 10, 'Выбранное оборудование:', ln=True)
+# Подписи строк с данными заказа
+ORDER_FIELDS = [
+    "№ заказа:",
+    "Дата заказа:",
+    "Район:",
+    "Глубина:",
+    "Тип грунта:",
+    "Цена за метр:",
+    "Стоимость бурения:"
+]
+
+class OrderPdfTemplate:
+    """
+    Заготовка PDF заказа.
+
+    Разбор TTF-шрифтов (add_font) стоит дороже верстки одной страницы,
+    поэтому шрифты подключаются один раз, а заголовок и подписи полей
+    рисуются заранее с запоминанием координат значений. Для заказа
+    заготовка копируется, и дорисовываются только изменяемые ячейки.
+
+    С charset используются урезанные копии шрифтов; текст с символами
+    вне charset такая заготовка не рендерит (см. covers()).
+    """
+    def __init__(self, charset: frozenset | None = None):
+        self.charset = charset
+        regular_path, bold_path = FONT_REGULAR_PATH, FONT_BOLD_PATH
+        if charset is not None and os.path.exists(regular_path) and os.path.exists(bold_path):
+            regular_path, bold_path = _reduced_font(regular_path, charset), _reduced_font(bold_path, charset)
+        created = _create_pdf(regular_path, bold_path)
+        if created is None:
+            raise RuntimeError("Нет доступных шрифтов для PDF")
+        pdf, self.font_family = created
+        # output() урезает TTFont шрифта на месте, а при копировании документа
+        # он общий: каждой копии нужен свой, разобранный из байтов в памяти
+        self._font_bytes = {}
+        for font in pdf.fonts.values():
+            if isinstance(font, fpdf_fonts.TTFFont):
+                with open(font.ttffile, "rb") as file:
+                    self._font_bytes[font.fontkey] = file.read()
+        pdf.add_page()
+
+        # Заголовок
+        pdf.set_font(self.font_family, 'B', 16) # Используем жирный стиль выбранного шрифта
+        pdf.cell(0, 10, 'Заказ на бурение скважины', ln=True, align='C')
+        pdf.ln(10)
+
+        # Основная информация
+        pdf.set_font(self.font_family, 'B', 14)
+        pdf.cell(0, 10, 'Информация о заказе:', ln=True)
+        pdf.set_font(self.font_family, '', 12)
+
+        # Подписи полей; значения будут выведены справа от них
+        self.value_x = pdf.l_margin + 60
+        self.value_y = []
+        for label in ORDER_FIELDS:
+            self.value_y.append(pdf.get_y())
+            pdf.cell(60, 10, label, border=0)
+            pdf.ln(10)
+        self.body_y = pdf.get_y()
+        self._prototype = pdf
+
+    def covers(self, texts) -> bool:
+        """
+        Все ли символы текстов есть в шрифтах заготовки
+        """
+        return self.charset is None or all(ord(char) in self.charset for text in texts for char in text)
+
+    def _copy(self) -> "fpdf.FPDF":
+        pdf = copy.deepcopy(self._prototype)
+        for font in pdf.fonts.values():
+            if isinstance(font, fpdf_fonts.TTFFont):
+                font.ttfont = ttLib.TTFont(io.BytesIO(self._font_bytes[font.fontkey]), recalcTimestamp=False, lazy=True)
+        return pdf
+
+    def render(self, order_data: dict) -> bytes:
+        pdf = self._copy()
+        font_family = self.font_family
         pdf.set_font(font_family, '', 12)
-        pdf.cell(0, 10, f"{equipment_name} - {equipment_price} ₽", ln=True)
+
+        # Данные заказа
+        values = [
+            str(order_data.get("order_id", "Не указан")),
+            str(order_data.get("order_date", "-")),
+            str(order_data.get("district_name", "Не указан")),
+            f"{str(order_data.get('depth', 0))} м",
+            str(order_data.get("ground_type", "Не указан")),
+            f"{str(order_data.get('price_per_meter', 0))} ₽",
+            f"{str(order_data.get('drilling_cost', 0))} ₽"
+        ]
+        # Вывод данных заказа
+        for y, value in zip(self.value_y, values):
+            pdf.set_xy(self.value_x, y)
+            pdf.cell(0, 10, value, border=0)
+        pdf.set_xy(pdf.l_margin, self.body_y)
         pdf.ln(5)
+        
+        # Оборудование
+        equipment_name = order_data.get("equipment_name", "Не выбрано")
+        equipment_price = order_data.get("equipment_price", 0)
 
-    # Общая стоимость
-    pdf.set_font(font_family, 'B', 14)
-    pdf.cell(0, 10, f"ОБЩАЯ СТОИМОСТЬ: {str(order_data.get('total_cost', 0))} ₽", ln=True)
-    pdf.ln(10)
+        if equipment_name and equipment_name != "Не выбрано":
+            pdf.set_font(font_family, 'B', 14)
+            pdf.cell(0, 10, 'Выбранное оборудование:', ln=True)
+            pdf.set_font(font_family, '', 12)
+            pdf.cell(0, 10, f"{equipment_name} - {equipment_price} ₽", ln=True)
+            pdf.ln(5)
 
-    # Информация о клиенте
-    pdf.set_font(font_family, 'B', 14)
-    pdf.cell(0, 10, 'Информация о клиенте:', ln=True)
-    pdf.set_font(font_family, '', 12)
+        # Общая стоимость
+        pdf.set_font(font_family, 'B', 14)
+        pdf.cell(0, 10, f"ОБЩАЯ СТОИМОСТЬ: {str(order_data.get('total_cost', 0))} ₽", ln=True)
+        pdf.ln(10)
+
+        # Информация о клиенте
+        pdf.set_font(font_family, 'B', 14)
+        pdf.cell(0, 10, 'Информация о клиенте:', ln=True)
+        pdf.set_font(font_family, '', 12)
 
-    pdf.cell(0, 10, f"ФИО: {str(order_data.get('full_name', 'Не указано'))}", ln=True)
-    pdf.cell(0, 10, f"Телефон: {str(order_data.get('phone', 'Не указан'))}", ln=True)
+        pdf.cell(0, 10, f"ФИО: {str(order_data.get('full_name', 'Не указано'))}", ln=True)
+        pdf.cell(0, 10, f"Телефон: {str(order_data.get('phone', 'Не указан'))}", ln=True)
 
-    # Получение PDF как байтов
+        # Получение PDF как байтов (fpdf2 возвращает bytearray)
+        return bytes(pdf.output())
+
+# Поля заказа, которые попадают в PDF
+ORDER_PDF_FIELDS = (
+    "order_id", "order_date", "district_name", "depth", "ground_type", "price_per_meter",
+    "drilling_cost", "equipment_name", "equipment_price", "total_cost", "full_name", "phone"
+)
+# Версия макета: при изменении верстки PDF из кэша не должны отдаваться
+ORDER_PDF_LAYOUT = 1
+
+def order_pdf_key(order_data: dict) -> str:
+    """
+    Ключ PDF заказа в кэше: хэш полей, от которых зависит содержимое файла
+    """
+    fields = {name: order_data[name] for name in ORDER_PDF_FIELDS if name in order_data}
+    payload = json.dumps([ORDER_PDF_LAYOUT, fields], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+# Заготовки создаются один раз на процесс (в каждом воркере пула - свои):
+# с урезанными шрифтами и с полными для текста с редкими символами
+_order_templates: dict = {}
+_order_templates_lock = threading.Lock()
+
+def get_order_template(charset: frozenset | None = ORDER_CHARSET) -> OrderPdfTemplate:
+    template = _order_templates.get(charset)
+    if template is None:
+        with _order_templates_lock:
+            template = _order_templates.get(charset)
+            if template is None:
+                template = _order_templates[charset] = OrderPdfTemplate(charset)
+    return template
+
+# Функция для рендеринга PDF заказа
+def render_order_pdf(order_data: dict) -> bytes | None:
+    """
+    Рендеринг PDF-файла с данными заказа в память.
+    Возвращает содержимое PDF или None в случае ошибки.
+    """
     try:
-        pdf_bytes = pdf.output(dest='S').encode('latin-1')
-    except UnicodeEncodeError:
-        print("Предупреждение: Ошибка кодирования PDF в latin-1, пробую UTF-8")
-        pdf_bytes = pdf.output(dest='S').encode('utf-8')
+        template = get_order_template()
+        if not template.covers(str(value) for value in order_data.values()):
+            template = get_order_template(None)
+        return template.render(order_data)
     except Exception as e:
         print(f"Критическая ошибка при генерации байтов PDF: {e}")
         return None
 
-    # Имя файла в Blob хранилище
-    filename = f"orders/order_{order_data.get('order_id', int(time.time()))}.pdf"
+def build_order_pdf(order_data: dict) -> OrderPdf:
+    """
+    Рендеринг PDF заказа (выполняется в пуле воркеров).
+    Загрузка в хранилище файлов идет в цикле событий, см. cache_order_pdf().
+    """
+    return OrderPdf(render_order_pdf(order_data), None)
 
-    try:
-        # Загрузка в Vercel Blob
-        blob_result = put(
-            pathname=filename,
-            body=pdf_bytes,
-            options={'token': BLOB_READ_WRITE_TOKEN} # Передаем токен
+_pdf_pool: WorkerPool | None = None
+
+def get_pdf_pool() -> WorkerPool:
+    """
+    Пул воркеров для рендеринга PDF (создается при первом обращении)
+    """
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = WorkerPool(
+            "pdf",
+            workers=PDF_WORKERS,
+            queue_limit=PDF_QUEUE_LIMIT,
+            timeout=PDF_TIMEOUT,
+            use_processes=PDF_POOL == 'process'
         )
-        print(f"PDF успешно загружен: {blob_result['url']}")
-        return blob_result['url'] # Возвращаем URL загруженного файла
-    except Exception as e:
-        print(f"Ошибка при загрузке PDF в Vercel Blob: {e}")
+    return _pdf_pool
+
+def warm_up_pdf() -> float:
+    """
+    Импорт тяжелых зависимостей и подготовка заготовки PDF заказа в текущем процессе.
+    Возвращает время прогрева в секундах.
+    """
+    started = time.perf_counter()
+    for module in (fpdf, fpdf_fonts, ttLib, subset, mpl_figure, mpl_backend_agg):
+        module.load()
+    get_order_template()
+    return time.perf_counter() - started
+
+def start_pdf_warm_up(force: bool = False) -> list[Job]:
+    """
+    Фоновый прогрев воркеров пула PDF после старта (при PDF_WARMUP=1 или force).
+
+    На каждый воркер ставится задача прогрева, поэтому первый PDF
+    не ждет импорта matplotlib и fpdf2. Распределение задач по
+    процессам не гарантировано: прогрев выполняется по возможности.
+    """
+    if not (PDF_WARMUP or force):
+        return []
+    pool = get_pdf_pool()
+    return [pool.submit(warm_up_pdf, name="pdf_warm_up") for _ in range(pool.workers)]
+
+def submit_order_pdf(order_data: dict) -> Job:
+    """
+    Постановка PDF заказа в очередь пула; результат задачи - OrderPdf.
+    При переполнении очереди выбрасывает PoolOverloaded.
+    """
+    return get_pdf_pool().submit(build_order_pdf, dict(order_data), name=f"order_pdf_{order_data.get('order_id')}")
+
+# Фоновые загрузки PDF в хранилище (ссылки, чтобы задачи не собрал сборщик мусора)
+_uploads: set = set()
+
+async def upload_order_pdf(pathname: str, key: str, content: bytes) -> str | None:
+    """
+    Загрузка PDF в хранилище файлов и сохранение URL в кэше PDF.
+    Возвращает URL или None в случае ошибки.
+    """
+    try:
+        url = await get_blob_storage().put(pathname, content)
+    except BlobUploadError as e:
+        logging.error(f"Ошибка при загрузке PDF {pathname}: {e}")
         return None
+    get_pdf_cache().set_url(key, url)
+    return url
+
+def cache_order_pdf(order_data: dict, pdf: OrderPdf) -> OrderPdf:
+    """
+    Сохранение готового PDF заказа в кэш; возвращает PDF с ключом кэша.
 
-# Функция для генерации PDF аналитики (Заглушка)
-def generate_analytics_pdf(analytics_data):
+    Новый PDF загружается в хранилище в фоне: отправка файла
+    пользователю не ждет загрузки.
     """
-    Генерация PDF-файла с аналитикой (Требует переписывания на fpdf2)
+    key = order_pdf_key(order_data)
+    if pdf.content:
+        get_pdf_cache().put(key, pdf.content, pdf.url)
+        if pdf.url is None:
+            pathname = f"orders/order_{order_data.get('order_id', int(time.time()))}.pdf"
+            task = asyncio.get_running_loop().create_task(upload_order_pdf(pathname, key, pdf.content))
+            _uploads.add(task)
+            task.add_done_callback(_uploads.discard)
+    return pdf._replace(key=key)
+
+async def create_order_pdf(order_data: dict, use_file_id: bool = True) -> OrderPdf:
+    """
+    PDF заказа из кэша или рендеринг в пуле без блокировки цикла событий.
+
+    Если файл уже отправлялся в Telegram, возвращается только его file_id
+    (content=None): повторная отправка не требует ни рендеринга, ни загрузки.
     """
-    print("Предупреждение: Функция generate_analytics_pdf еще не реализована с fpdf2.")
-    return None
+    cache = get_pdf_cache()
+    key = order_pdf_key(order_data)
+    artifact = cache.get(key)
+    if artifact is not None:
+        if use_file_id and artifact.file_id:
+            return OrderPdf(None, artifact.url, key, artifact.file_id)
+        content = cache.read(key)
+        if content is not None:
+            return OrderPdf(content, artifact.url, key, artifact.file_id)
+    return cache_order_pdf(order_data, await submit_order_pdf(order_data).wait())
+
+async def load_order_pdf(order_data: dict) -> bytes | None:
+    """
+    Содержимое PDF заказа из кэша или рендеринг в пуле (без загрузки в хранилище)
+    """
+    cache = get_pdf_cache()
+    key = order_pdf_key(order_data)
+    if cache.get(key) is not None:
+        content = cache.read(key)
+        if content is not None:
+            return content
+    content = await get_pdf_pool().run(render_order_pdf, dict(order_data), name=f"order_pdf_{order_data.get('order_id')}")
+    if content:
+        cache.put(key, content)
+    return content
+
+# Графики отчета по аналитике: вид -> (заголовок, функция рисования)
+CHART_DPI = 120
+
+def _no_data(ax) -> None:
+    ax.text(0.5, 0.5, "Нет данных", ha="center", va="center", transform=ax.transAxes, fontsize=14)
+    ax.set_axis_off()
+
+def _chart_districts(ax, data: list) -> None:
+    if not data:
+        return _no_data(ax)
+    names = [str(item["name"]) for item in reversed(data)]
+    ax.barh(names, [item["count"] for item in reversed(data)], color="#4C72B0")
+    ax.set_xlabel("Заказов")
+
+def _chart_depths(ax, data: list) -> None:
+    depths = [(float(item["depth"]), item["count"]) for item in data if isinstance(item["depth"], (int, float))]
+    if not depths:
+        return _no_data(ax)
+    ax.hist([depth for depth, _ in depths], bins=min(20, len(depths)), weights=[count for _, count in depths], color="#55A868")
+    ax.set_xlabel("Глубина, м")
+    ax.set_ylabel("Заказов")
+
+def _chart_revenue(ax, data: list) -> None:
+    if not data:
+        return _no_data(ax)
+    periods = [datetime.strptime(item["period"], "%Y-%m-%d") for item in data]
+    ax.plot(periods, [item["revenue"] for item in data], color="#C44E52")
+    ax.set_ylim(bottom=0)
+    ax.set_ylabel("Выручка, ₽")
+    orders_ax = ax.twinx()
+    orders_ax.bar(periods, [item["orders"] for item in data], color="#8172B2", alpha=0.3)
+    orders_ax.set_ylabel("Заказов")
+    ax.figure.autofmt_xdate()
 
+def _chart_equipment(ax, data: list) -> None:
+    if not data:
+        return _no_data(ax)
+    ax.barh([str(item["name"]) for item in reversed(data)], [item["count"] for item in reversed(data)], color="#DD8452")
+    ax.set_xlabel("Заказов")
+
+ANALYTICS_CHARTS = {
+    "districts": ("Распределение заказов по районам", _chart_districts),
+    "depths": ("Распределение глубины скважин", _chart_depths),
+    "revenue": ("Выручка и количество заказов по времени", _chart_revenue),
+    "equipment": ("Популярное оборудование", _chart_equipment),
+}
+
+def render_analytics_chart(kind: str, data: list) -> tuple[bytes, float]:
+    """
+    Рендеринг графика отчета в PNG (выполняется в пуле воркеров).
+    Возвращает PNG и время рендеринга в секундах.
+
+    Используется Figure без pyplot: глобальное состояние pyplot
+    небезопасно при рендеринге в пуле потоков.
+    """
+    started = time.perf_counter()
+    title, draw = ANALYTICS_CHARTS[kind]
+    figure = mpl_figure.Figure(figsize=(10, 6))
+    mpl_backend_agg.FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    draw(ax, data)
+    ax.set_title(title)
+    figure.tight_layout()
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png", dpi=CHART_DPI)
+    return buffer.getvalue(), time.perf_counter() - started
+
+def render_analytics_pdf(report: dict, charts: list) -> bytes:
+    """
+    Сборка многостраничного PDF отчета: сводка, таблица районов и графики (по одному на страницу).
+    charts - список пар (заголовок, PNG).
+    """
+    created = _create_pdf()
+    if created is None:
+        raise RuntimeError("Нет доступных шрифтов для PDF")
+    pdf, font_family = created
+    totals = report.get("total_stats", {})
+
+    # Сводка
+    pdf.add_page()
+    pdf.set_font(font_family, 'B', 16)
+    pdf.cell(0, 10, 'Аналитика заказов', ln=True, align='C')
+    pdf.set_font(font_family, '', 12)
+    pdf.cell(0, 10, f"Период: {report.get('period', 'все время')}", ln=True, align='C')
+    pdf.ln(5)
+
+    pdf.set_font(font_family, 'B', 14)
+    pdf.cell(0, 10, 'Общие показатели:', ln=True)
+    pdf.set_font(font_family, '', 12)
+    for label, value in (
+        ("Заказов", totals.get("total_orders", 0)),
+        ("Выручка", f"{totals.get('total_revenue', 0)} ₽"),
+        ("Средняя стоимость", f"{totals.get('avg_order_cost', 0)} ₽"),
+        ("Средняя глубина", f"{totals.get('avg_depth', 0)} м"),
+    ):
+        pdf.cell(80, 10, f"{label}:", border=0)
+        pdf.cell(0, 10, str(value), ln=True)
+    pdf.ln(5)
+
+    pdf.set_font(font_family, 'B', 14)
+    pdf.cell(0, 10, 'Популярные районы:', ln=True)
+    pdf.set_font(font_family, '', 12)
+    for item in report.get("popular_districts", [])[:15]:
+        pdf.cell(120, 8, str(item["name"]), border=0)
+        pdf.cell(0, 8, str(item["count"]), ln=True)
+
+    # Графики
+    width = pdf.w - pdf.l_margin - pdf.r_margin
+    for title, png in charts:
+        pdf.add_page()
+        pdf.set_font(font_family, 'B', 14)
+        pdf.cell(0, 10, title, ln=True)
+        pdf.image(io.BytesIO(png), w=width)
+
+    return bytes(pdf.output())
+
+def analytics_chart_data(analytics_data: dict, series: list) -> dict:
+    """
+    Данные графиков отчета из статистики и временного ряда
+    """
+    return {
+        "districts": analytics_data.get("popular_districts", [])[:15],
+        "depths": analytics_data.get("popular_depths", []),
+        "revenue": [{"period": point["period"], "revenue": point["revenue"], "orders": point["orders"]} for point in series],
+        "equipment": analytics_data.get("popular_equipment", []),
+    }
+
+# Функция для генерации PDF аналитики
+def generate_analytics_pdf(analytics_data: dict, series: list | None = None) -> bytes:
+    """
+    Генерация PDF-отчета с аналитикой в текущем потоке.
+    series - временной ряд (timeseries) для графика выручки.
+
+    Блокирующий вызов: API рендерит графики в пуле (api/services/analytics_report.py).
+    """
+    charts = []
+    for kind, data in analytics_chart_data(analytics_data, series or []).items():
+        png, _ = render_analytics_chart(kind, data)
+        charts.append((ANALYTICS_CHARTS[kind][0], png))
+    return render_analytics_pdf(analytics_data, charts)
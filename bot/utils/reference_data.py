@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+# Пути к файлам справочников
+DISTRICTS_FILE = os.path.join("data", "districts.json")
+EQUIPMENT_FILE = os.path.join("data", "equipment.json")
+
+# Версия справочных данных: увеличивается при каждой перезагрузке любого файла
+# (при замене файлов через replace_files() - один раз на оба файла)
+_version = 0
+_version_lock = threading.Lock()
+
+def _bump_version() -> int:
+    global _version
+    with _version_lock:
+        _version += 1
+        return _version
+
+class ReferenceFile:
+    """
+    JSON-файл справочника, закэшированный в памяти.
+
+    Файл перечитывается только при изменении mtime/размера
+    или после явного вызова invalidate(). Возвращаемые объекты общие
+    для всех вызывающих, изменять их нельзя.
+    """
+    def __init__(self, path: str, build_index: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        self.path = path
+        self._build_index = build_index
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        # Файл еще не читался (отсутствующий файл - тоже прочитанное состояние)
+        self._loaded = False
+        self._data: Dict[str, Any] = {}
+        self._index: Any = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> None:
+        signature = self._stat()
+        if self._loaded and signature == self._signature:
+            return
+
+        with self._lock:
+            signature = self._stat()
+            if self._loaded and signature == self._signature:
+                return
+            self._read_locked(signature)
+            _bump_version()
+
+    def _read_locked(self, signature: Optional[Tuple[int, int]]) -> None:
+        if signature is None:
+            data = {}
+        else:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+
+        self._data = data
+        self._index = self._build_index(data) if self._build_index else None
+        self._signature = signature
+        self._loaded = True
+
+    def get(self) -> Dict[str, Any]:
+        """
+        Получение содержимого файла
+        """
+        self._load()
+        return self._data
+
+    def get_index(self) -> Any:
+        """
+        Получение индекса, построенного по содержимому файла
+        """
+        self._load()
+        return self._index
+
+    def invalidate(self) -> None:
+        """
+        Принудительная перезагрузка файла при следующем обращении
+        """
+        with self._lock:
+            self._loaded = False
+
+def _index_districts(data: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+    return {district["id"]: district for district in data.get("districts", [])}
+
+_districts = ReferenceFile(DISTRICTS_FILE, _index_districts)
+_equipment = ReferenceFile(EQUIPMENT_FILE)
+
+def get_districts_data() -> Dict[str, Any]:
+    """
+    Получение содержимого districts.json
+    """
+    return _districts.get()
+
+def get_districts() -> List[Dict[str, Any]]:
+    """
+    Получение списка районов
+    """
+    return _districts.get().get("districts", [])
+
+def get_district(district_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Получение района по ID
+    """
+    return _districts.get_index().get(district_id)
+
+def get_equipment_data() -> Dict[str, Any]:
+    """
+    Получение содержимого equipment.json
+    """
+    return _equipment.get()
+
+def invalidate() -> None:
+    """
+    Сброс кэша справочников (вызывается после обновления цен)
+    """
+    _districts.invalidate()
+    _equipment.invalidate()
+
+@contextmanager
+def replace_files():
+    """
+    Замена файлов справочников внутри блока with.
+
+    Пока файлы заменяются, читатели, заметившие изменение, ждут конца блока
+    и не видят смесь старого и нового справочника. После блока оба файла
+    перечитываются, а версия увеличивается ровно один раз.
+    """
+    with _districts._lock, _equipment._lock:
+        yield
+        for reference_file in (_districts, _equipment):
+            reference_file._read_locked(reference_file._stat())
+        _bump_version()
+
+def get_version() -> int:
+    """
+    Текущая версия справочных данных
+    """
+    # Обращение к файлам подхватывает изменения, сделанные в обход кэша
+    _districts.get()
+    _equipment.get()
+    return _version
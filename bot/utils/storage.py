@@ -0,0 +1,629 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from bot.utils import reference_data
+from bot.utils.order_events import OrderListener, OrderListeners
+from bot.utils.order_index import Cursor
+from bot.utils.order_store import OrderStore, get_order_store
+from bot.utils.order_time import ensure_order_ts, parse_order_date
+
+# Выбор движка хранения: json (по умолчанию) или sqlite
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", os.path.join("data", "burassist.db"))
+
+class StorageBackend:
+    """
+    Интерфейс хранилища заказов и справочных данных
+    """
+    # --- Справочные данные ---
+
+    def get_districts_data(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def get_districts(self) -> List[Dict[str, Any]]:
+        return self.get_districts_data().get("districts", [])
+
+    def get_district(self, district_id: int) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def get_equipment_data(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def get_reference_version(self) -> int:
+        raise NotImplementedError
+
+    def save_reference_data(
+        self,
+        equipment_data: Optional[Dict[str, Any]] = None,
+        districts_data: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Замена справочников целиком (переданные документы сохраняются вместе)
+        """
+        raise NotImplementedError
+
+    def update_equipment_price(self, category: str, component: str, price: float) -> None:
+        data = json.loads(json.dumps(self.get_equipment_data()))
+        data.setdefault("equipment_data", {}).setdefault(category, {})[component] = price
+        self.save_reference_data(equipment_data=data)
+
+    def update_district_price(self, district_id: int, base_price: float) -> bool:
+        data = json.loads(json.dumps(self.get_districts_data()))
+        for district in data.get("districts", []):
+            if district.get("id") == district_id:
+                district["base_price"] = base_price
+                self.save_reference_data(districts_data=data)
+                return True
+        return False
+
+    # --- Заказы ---
+
+    def add_order(self, order_data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def update_order_status(self, order_id: str, status: str) -> bool:
+        raise NotImplementedError
+
+    def get_orders(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def get_user_orders(self, user_id: int) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def get_orders_in_range(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Заказы с start_ts <= order_ts <= end_ts в хронологическом порядке
+        """
+        raise NotImplementedError
+
+    def get_orders_page(
+        self,
+        status: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cursor: Optional[Cursor] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Страница заказов от новых к старым и общее количество (с фильтром по статусу).
+
+        cursor = (order_ts, order_id) последнего заказа предыдущей страницы.
+        """
+        raise NotImplementedError
+
+    def subscribe(self, listener: OrderListener) -> None:
+        """
+        Подписка на изменения заказов (см. OrderListener)
+        """
+        raise NotImplementedError
+
+    def refresh(self) -> None:
+        """
+        Доставка подписчикам изменений, сделанных другими процессами
+        """
+
+def _write_json_atomic(path: str, data: Dict[str, Any]) -> None:
+    """
+    Запись JSON-файла через временный файл и переименование
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=4)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+# Список файлов справочников, замена которых зафиксирована, но не завершена
+REFERENCE_COMMIT_FILE = os.path.join(os.path.dirname(reference_data.DISTRICTS_FILE), "reference.commit")
+
+def _write_json_files_atomic(files: Dict[str, Dict[str, Any]], commit_path: str = REFERENCE_COMMIT_FILE) -> None:
+    """
+    Запись нескольких JSON-файлов как одной операции.
+
+    Файлы пишутся рядом с исходными (.new), затем атомарно записывается
+    список файлов - точка фиксации, и только после нее файлы переименовываются.
+    Сбой до фиксации оставляет прежние файлы, после - замену доводит до конца
+    _finish_json_commit() при следующем запуске.
+    """
+    for path, data in files.items():
+        with open(path + ".new", "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+    _write_json_atomic(commit_path, {"files": list(files)})
+    _finish_json_commit(commit_path)
+
+def _finish_json_commit(commit_path: str = REFERENCE_COMMIT_FILE) -> None:
+    """
+    Завершение зафиксированной замены файлов (если она была прервана)
+    """
+    try:
+        with open(commit_path, "r", encoding="utf-8") as file:
+            paths = json.load(file)["files"]
+    except FileNotFoundError:
+        return
+    for path in paths:
+        if os.path.exists(path + ".new"):
+            os.replace(path + ".new", path)
+    os.remove(commit_path)
+
+class JsonStorage(StorageBackend):
+    """
+    Хранилище на JSON-файлах: справочники через кэш, заказы через журнал
+    """
+    def __init__(self, order_store: Optional[OrderStore] = None):
+        self.orders = order_store or get_order_store()
+        _finish_json_commit()
+
+    def get_districts_data(self) -> Dict[str, Any]:
+        return reference_data.get_districts_data()
+
+    def get_district(self, district_id: int) -> Optional[Dict[str, Any]]:
+        return reference_data.get_district(district_id)
+
+    def get_equipment_data(self) -> Dict[str, Any]:
+        return reference_data.get_equipment_data()
+
+    def get_reference_version(self) -> int:
+        return reference_data.get_version()
+
+    def save_reference_data(self, equipment_data=None, districts_data=None) -> None:
+        files = {}
+        if equipment_data is not None:
+            files[reference_data.EQUIPMENT_FILE] = equipment_data
+        if districts_data is not None:
+            files[reference_data.DISTRICTS_FILE] = districts_data
+        if not files:
+            return
+        # Оба файла заменяются вместе, версия справочников увеличивается один раз
+        with reference_data.replace_files():
+            _write_json_files_atomic(files)
+
+    def add_order(self, order_data: Dict[str, Any]) -> None:
+        self.orders.add_order(order_data)
+
+    def update_order_status(self, order_id: str, status: str) -> bool:
+        return self.orders.update_order_status(order_id, status)
+
+    def get_orders(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        if status:
+            return self.orders.get_orders_by_status(status)
+        return self.orders.get_orders()
+
+    def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
+        return self.orders.get_order(order_id)
+
+    def get_user_orders(self, user_id: int) -> List[Dict[str, Any]]:
+        return self.orders.get_user_orders(user_id)
+
+    def get_orders_in_range(self, start_ts=None, end_ts=None) -> List[Dict[str, Any]]:
+        return self.orders.get_orders_by_date(start_ts, end_ts)
+
+    def get_orders_page(self, status=None, offset=0, limit=None, cursor=None) -> Tuple[List[Dict[str, Any]], int]:
+        return self.orders.get_orders_page(status, offset, limit, cursor)
+
+    def subscribe(self, listener: OrderListener) -> None:
+        self.orders.subscribe(listener)
+
+    def refresh(self) -> None:
+        self.orders.refresh()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id TEXT NOT NULL UNIQUE,
+    user_id INTEGER,
+    status TEXT,
+    order_date TEXT,
+    order_ts INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders(user_id);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
+CREATE INDEX IF NOT EXISTS idx_orders_order_date ON orders(order_date);
+
+-- Журнал изменений заказов для подписчиков в этом и других процессах
+CREATE TABLE IF NOT EXISTS order_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id TEXT NOT NULL,
+    op TEXT NOT NULL,
+    old_status TEXT
+);
+
+CREATE TABLE IF NOT EXISTS districts (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    depths TEXT NOT NULL,
+    base_price REAL,
+    extra TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_districts_name ON districts(name);
+
+CREATE TABLE IF NOT EXISTS ground_types (
+    district_id INTEGER NOT NULL REFERENCES districts(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    min_depth REAL,
+    max_depth REAL,
+    price_per_meter REAL,
+    PRIMARY KEY (district_id, name)
+);
+
+CREATE TABLE IF NOT EXISTS equipment_options (
+    key TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    description TEXT,
+    price REAL,
+    extra TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS reference_meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+def _number(value):
+    # REAL-колонки возвращают float, целые цены отдаем как int
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def _sortable_order_date(order: Dict[str, Any]) -> str:
+    """
+    Дата заказа в сортируемом виде (ГГГГ-ММ-ДД ЧЧ:ММ)
+    """
+    try:
+        return datetime.strptime(order.get("order_date", ""), "%d.%m.%Y %H:%M").strftime("%Y-%m-%d %H:%M")
+    except (TypeError, ValueError):
+        return "2000-01-01 00:00"
+
+def _order_row(order: Dict[str, Any]) -> Tuple:
+    """
+    Строка таблицы orders для заказа (проставляет order_ts, если его нет)
+    """
+    order_ts = ensure_order_ts(order)
+    return (
+        order.get("order_id"), order.get("user_id"), order.get("status"),
+        _sortable_order_date(order), order_ts, json.dumps(order, ensure_ascii=False)
+    )
+
+class SqliteStorage(StorageBackend):
+    """
+    Хранилище на SQLite (WAL) с индексами по order_id, user_id, status и order_date
+    """
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._cache_lock = threading.Lock()
+        self._reference_cache = None
+        self._listeners = OrderListeners()
+        self._events_lock = threading.Lock()
+        self._last_event_id = None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """
+        Добавление order_ts в базы, созданные до его появления, и заполнение старых записей
+        """
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(orders)")}
+        with conn:
+            if "order_ts" not in columns:
+                conn.execute("ALTER TABLE orders ADD COLUMN order_ts INTEGER")
+            # Порядок индексов совпадает с выдачей "от новых к старым" (order_ts DESC, seq ASC)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_order_ts ON orders(order_ts DESC, seq ASC)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_status_order_ts ON orders(status, order_ts DESC, seq ASC)")
+
+            legacy = conn.execute(
+                "SELECT seq, json_extract(data, '$.order_date') FROM orders WHERE order_ts IS NULL"
+            ).fetchall()
+            conn.executemany(
+                "UPDATE orders SET order_ts = ?, data = json_set(data, '$.order_ts', ?) WHERE seq = ?",
+                [(ts, ts, seq) for seq, ts in ((seq, parse_order_date(order_date)) for seq, order_date in legacy)]
+            )
+
+    # --- Справочные данные ---
+
+    def get_reference_version(self) -> int:
+        row = self._connection().execute(
+            "SELECT value FROM reference_meta WHERE name = 'version'"
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def _load_reference(self):
+        version = self.get_reference_version()
+        cache = self._reference_cache
+        if cache is not None and cache[0] == version:
+            return cache
+
+        with self._cache_lock:
+            conn = self._connection()
+            meta = dict(conn.execute("SELECT name, value FROM reference_meta").fetchall())
+
+            ground_types: Dict[int, Dict[str, Any]] = {}
+            for district_id, name, min_depth, max_depth, price in conn.execute(
+                "SELECT district_id, name, min_depth, max_depth, price_per_meter "
+                "FROM ground_types ORDER BY district_id, position"
+            ):
+                ground_types.setdefault(district_id, {})[name] = {
+                    "min_depth": _number(min_depth),
+                    "max_depth": _number(max_depth),
+                    "price_per_meter": _number(price)
+                }
+
+            districts = []
+            for district_id, name, depths, base_price, extra in conn.execute(
+                "SELECT id, name, depths, base_price, extra FROM districts ORDER BY position"
+            ):
+                district = {"id": district_id, "name": name, "depths": json.loads(depths), "base_price": _number(base_price)}
+                if district_id in ground_types:
+                    district["ground_types"] = ground_types[district_id]
+                district.update(json.loads(extra))
+                districts.append(district)
+
+            options = []
+            for key, name, description, price, extra in conn.execute(
+                "SELECT key, name, description, price, extra FROM equipment_options ORDER BY position"
+            ):
+                option = {"key": key, "name": name, "description": description, "price": _number(price)}
+                option.update(json.loads(extra))
+                options.append(option)
+
+            districts_data = dict(json.loads(meta.get("districts_extra", "{}")), districts=districts)
+            equipment_data = json.loads(meta.get("equipment_extra", "{}"))
+            if options or "options" not in equipment_data:
+                equipment_data["options"] = options
+
+            cache = (version, districts_data, {d["id"]: d for d in districts}, equipment_data)
+            self._reference_cache = cache
+            return cache
+
+    def get_districts_data(self) -> Dict[str, Any]:
+        return self._load_reference()[1]
+
+    def get_district(self, district_id: int) -> Optional[Dict[str, Any]]:
+        return self._load_reference()[2].get(district_id)
+
+    def get_equipment_data(self) -> Dict[str, Any]:
+        return self._load_reference()[3]
+
+    def _replace_districts(self, conn: sqlite3.Connection, data: Dict[str, Any]) -> None:
+        conn.execute("DELETE FROM ground_types")
+        conn.execute("DELETE FROM districts")
+        for position, district in enumerate(data.get("districts", [])):
+            extra = {k: v for k, v in district.items() if k not in ("id", "name", "depths", "base_price", "ground_types")}
+            conn.execute(
+                "INSERT INTO districts (id, position, name, depths, base_price, extra) VALUES (?, ?, ?, ?, ?, ?)",
+                (district["id"], position, district["name"], json.dumps(district.get("depths", [])),
+                 district.get("base_price"), json.dumps(extra, ensure_ascii=False))
+            )
+            for gt_position, (name, info) in enumerate(district.get("ground_types", {}).items()):
+                conn.execute(
+                    "INSERT INTO ground_types (district_id, position, name, min_depth, max_depth, price_per_meter) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (district["id"], gt_position, name, info.get("min_depth"), info.get("max_depth"), info.get("price_per_meter"))
+                )
+        extra = {k: v for k, v in data.items() if k != "districts"}
+        conn.execute(
+            "INSERT OR REPLACE INTO reference_meta (name, value) VALUES ('districts_extra', ?)",
+            (json.dumps(extra, ensure_ascii=False),)
+        )
+
+    def _replace_equipment(self, conn: sqlite3.Connection, data: Dict[str, Any]) -> None:
+        conn.execute("DELETE FROM equipment_options")
+        for position, option in enumerate(data.get("options", [])):
+            extra = {k: v for k, v in option.items() if k not in ("key", "name", "description", "price")}
+            conn.execute(
+                "INSERT INTO equipment_options (key, position, name, description, price, extra) VALUES (?, ?, ?, ?, ?, ?)",
+                (option["key"], position, option["name"], option.get("description"), option.get("price"),
+                 json.dumps(extra, ensure_ascii=False))
+            )
+        extra = {k: v for k, v in data.items() if k != "options"}
+        conn.execute(
+            "INSERT OR REPLACE INTO reference_meta (name, value) VALUES ('equipment_extra', ?)",
+            (json.dumps(extra, ensure_ascii=False),)
+        )
+
+    def save_reference_data(self, equipment_data=None, districts_data=None) -> None:
+        conn = self._connection()
+        with conn:
+            if equipment_data is not None:
+                self._replace_equipment(conn, equipment_data)
+            if districts_data is not None:
+                self._replace_districts(conn, districts_data)
+            conn.execute(
+                "INSERT INTO reference_meta (name, value) VALUES ('version', '1') "
+                "ON CONFLICT(name) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+            )
+
+    # --- Заказы ---
+
+    def add_order(self, order_data: Dict[str, Any]) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO orders (order_id, user_id, status, order_date, order_ts, data) VALUES (?, ?, ?, ?, ?, ?)",
+                _order_row(order_data)
+            )
+            conn.execute("INSERT INTO order_events (order_id, op) VALUES (?, 'add')", (order_data.get("order_id"),))
+        self.refresh()
+
+    def update_order_status(self, order_id: str, status: str) -> bool:
+        conn = self._connection()
+        with conn:
+            row = conn.execute("SELECT status FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+            if row is None:
+                return False
+            conn.execute(
+                "UPDATE orders SET status = ?, data = json_set(data, '$.status', ?) WHERE order_id = ?",
+                (status, status, order_id)
+            )
+            conn.execute(
+                "INSERT INTO order_events (order_id, op, old_status) VALUES (?, 'status', ?)",
+                (order_id, row[0])
+            )
+        self.refresh()
+        return True
+
+    def subscribe(self, listener: OrderListener) -> None:
+        with self._events_lock:
+            conn = self._connection()
+            # Снимок заказов и позиция журнала изменений читаются в одной транзакции
+            with conn:
+                conn.execute("BEGIN")
+                last_event_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM order_events").fetchone()[0]
+                orders = [json.loads(row[0]) for row in conn.execute("SELECT data FROM orders ORDER BY seq")]
+            if self._last_event_id is None:
+                self._last_event_id = last_event_id
+            else:
+                # Уже есть подписчики: доводим их до той же позиции журнала
+                self._deliver_events(conn, last_event_id)
+            listener.reset(orders)
+            self._listeners.add(listener)
+
+    def refresh(self) -> None:
+        if self._last_event_id is None:
+            return
+        with self._events_lock:
+            self._deliver_events(self._connection())
+
+    def _deliver_events(self, conn: sqlite3.Connection, up_to: Optional[int] = None) -> None:
+        rows = conn.execute(
+            "SELECT e.id, e.op, e.old_status, o.data FROM order_events e "
+            "JOIN orders o ON o.order_id = e.order_id "
+            "WHERE e.id > ? AND e.id <= ? ORDER BY e.id",
+            (self._last_event_id, up_to if up_to is not None else 2 ** 63 - 1)
+        ).fetchall()
+        for event_id, op, old_status, data in rows:
+            order = json.loads(data)
+            if op == "add":
+                self._listeners.order_added(order)
+            else:
+                self._listeners.status_changed(order, old_status)
+            self._last_event_id = event_id
+
+    def get_orders(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        conn = self._connection()
+        if status:
+            rows = conn.execute("SELECT data FROM orders WHERE status = ? ORDER BY seq", (status,))
+        else:
+            rows = conn.execute("SELECT data FROM orders ORDER BY seq")
+        return [json.loads(row[0]) for row in rows]
+
+    def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT data FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_user_orders(self, user_id: int) -> List[Dict[str, Any]]:
+        rows = self._connection().execute("SELECT data FROM orders WHERE user_id = ? ORDER BY seq", (user_id,))
+        return [json.loads(row[0]) for row in rows]
+
+    def get_orders_in_range(self, start_ts=None, end_ts=None) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT data FROM orders WHERE order_ts >= ? AND order_ts <= ? ORDER BY order_ts, seq",
+            (start_ts if start_ts is not None else -2 ** 63, end_ts if end_ts is not None else 2 ** 63 - 1)
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def get_orders_page(self, status=None, offset=0, limit=None, cursor=None) -> Tuple[List[Dict[str, Any]], int]:
+        conn = self._connection()
+        where, params = ("WHERE status = ?", [status]) if status else ("", [])
+        total = conn.execute(f"SELECT COUNT(*) FROM orders {where}", params).fetchone()[0]
+
+        if cursor is not None:
+            # Keyset: заказы "старше" курсора по (order_ts DESC, seq ASC)
+            order_ts, order_id = cursor
+            row = conn.execute("SELECT seq FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+            seq = row[0] if row else 2 ** 63 - 1
+            where += (" AND" if where else "WHERE") + " order_ts <= ? AND NOT (order_ts = ? AND seq <= ?)"
+            params = params + [order_ts, order_ts, seq]
+
+        rows = conn.execute(
+            f"SELECT data FROM orders {where} ORDER BY order_ts DESC, seq ASC LIMIT ? OFFSET ?",
+            params + [limit if limit is not None else -1, offset]
+        )
+        return [json.loads(row[0]) for row in rows], total
+
+def import_json_to_sqlite(data_dir: str = "data", db_path: str = SQLITE_PATH) -> Dict[str, int]:
+    """
+    Однократный перенос данных из data/*.json в SQLite
+    """
+    storage = SqliteStorage(db_path)
+
+    def load(filename: str) -> Optional[Dict[str, Any]]:
+        path = os.path.join(data_dir, filename)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    districts_data = load("districts.json")
+    equipment_data = load("equipment.json")
+    storage.save_reference_data(equipment_data=equipment_data, districts_data=districts_data)
+
+    order_store = OrderStore(
+        os.path.join(data_dir, "orders.json"),
+        os.path.join(data_dir, "orders.journal.jsonl")
+    )
+    orders = order_store.get_orders()
+
+    conn = storage._connection()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO orders (order_id, user_id, status, order_date, order_ts, data) VALUES (?, ?, ?, ?, ?, ?)",
+            [_order_row(order) for order in orders]
+        )
+
+    return {
+        "districts": len((districts_data or {}).get("districts", [])),
+        "equipment_options": len((equipment_data or {}).get("options", [])),
+        "orders": len(orders)
+    }
+
+_storage: Optional[StorageBackend] = None
+_storage_lock = threading.Lock()
+
+def get_storage() -> StorageBackend:
+    """
+    Общий экземпляр хранилища, выбранного переменной STORAGE_BACKEND
+    """
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if STORAGE_BACKEND == "sqlite":
+                    _storage = SqliteStorage()
+                else:
+                    _storage = JsonStorage()
+    return _storage
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перенос данных из JSON-файлов в SQLite")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--db", default=SQLITE_PATH)
+    args = parser.parse_args()
+
+    counts = import_json_to_sqlite(args.data_dir, args.db)
+    print(f"Импортировано: {counts}")
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional
+
+class PoolOverloaded(Exception):
+    """
+    Очередь пула заполнена: задачу нужно отклонить или повторить позже
+    """
+
+class JobTimeout(TimeoutError):
+    """
+    Задача не завершилась за отведенное время
+    """
+
+class Job:
+    """
+    Задача в пуле воркеров.
+
+    Статус можно опрашивать (status, to_dict()) или дождаться результата
+    через await job.wait(). Срок выполнения отсчитывается от постановки
+    в очередь, поэтому время ожидания в очереди тоже входит в timeout.
+    """
+    def __init__(self, name: str, future: Future, timeout: Optional[float]):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self._future = future
+        self._timed_out = False
+
+    @property
+    def status(self) -> str:
+        if self._timed_out:
+            return "timeout"
+        if self._future.cancelled():
+            return "cancelled"
+        if self._future.done():
+            return "failed" if self._future.exception() is not None else "done"
+        return "running" if self._future.running() else "queued"
+
+    def done(self) -> bool:
+        return self._future.done() or self._timed_out
+
+    def result(self) -> Any:
+        """
+        Результат завершенной задачи (исключение задачи выбрасывается)
+        """
+        if self._timed_out:
+            raise JobTimeout(f"Задача {self.name} {self.id} не выполнена вовремя")
+        return self._future.result(timeout=0)
+
+    async def wait(self, timeout: Optional[float] = None) -> Any:
+        """
+        Ожидание результата без блокировки цикла событий
+        """
+        if timeout is None and self.deadline is not None:
+            timeout = max(self.deadline - time.monotonic(), 0)
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(self._future)), timeout)
+        except asyncio.TimeoutError:
+            # Задача из очереди снимается, уже запущенная доработает, но результат не нужен
+            self._future.cancel()
+            self._timed_out = True
+            self.finished = time.time()
+            raise JobTimeout(f"Задача {self.name} {self.id} не выполнена за {timeout:.1f} с") from None
+
+    def to_dict(self) -> Dict[str, Any]:
+        error = None
+        if self._future.done() and not self._future.cancelled() and self._future.exception() is not None:
+            error = str(self._future.exception())
+        return {
+            "job_id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "created": self.created,
+            "finished": self.finished,
+            "error": error
+        }
+
+class WorkerPool:
+    """
+    Ограниченный пул воркеров (потоков или процессов) с асинхронным API.
+
+    Одновременно в пуле может быть не больше workers + queue_limit задач,
+    сверх этого submit() выбрасывает PoolOverloaded. Это не дает очереди
+    расти без ограничений, когда рендеринг не успевает за запросами.
+    """
+    def __init__(
+        self,
+        name: str,
+        workers: int = 2,
+        queue_limit: int = 100,
+        timeout: Optional[float] = 30.0,
+        use_processes: bool = False,
+        history: int = 1000
+    ):
+        self.name = name
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.use_processes = use_processes
+        self._history = history
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._active = 0
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def submit(self, fn: Callable, *args, name: Optional[str] = None, timeout: Optional[float] = None) -> Job:
+        """
+        Постановка задачи в очередь. При переполнении выбрасывает PoolOverloaded
+        """
+        with self._lock:
+            if self._active >= self.workers + self.queue_limit:
+                self._rejected += 1
+                raise PoolOverloaded(f"Пул {self.name} перегружен: {self._active} задач в работе и в очереди")
+            self._active += 1
+            executor = self._get_executor()
+
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._active -= 1
+            raise
+        job = Job(name or getattr(fn, "__name__", self.name), future, timeout if timeout is not None else self.timeout)
+        future.add_done_callback(lambda f: self._on_done(job, f))
+
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self._history:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if not oldest.done():
+                    break
+                del self._jobs[oldest_id]
+        return job
+
+    def _on_done(self, job: Job, future: Future) -> None:
+        job.finished = job.finished or time.time()
+        with self._lock:
+            self._active -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._failed += 1
+            else:
+                self._completed += 1
+        if not future.cancelled() and future.exception() is not None:
+            logging.error(f"Ошибка задачи {job.name} {job.id}: {future.exception()}")
+
+    async def run(self, fn: Callable, *args, name: Optional[str] = None, timeout: Optional[float] = None) -> Any:
+        """
+        Выполнение задачи в пуле с ожиданием результата
+        """
+        return await self.submit(fn, *args, name=name, timeout=timeout).wait()
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "active": self._active,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
@@ -3,21 +3,21 @@ import logging
 import sys
 from os import getenv
 
-from aiogram import Bot, Dispatcher
-from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from dotenv import load_dotenv
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from bot.handlers import common, district, depth, equipment, order
-from api.routes import prices, orders, analytics
-
-# Загрузка переменных окружения
+# Загрузка переменных окружения (до импорта модулей проекта: они читают настройки при импорте)
 load_dotenv()
 
+from bot.dispatcher import BOT_MODE, check_webhook_config, create_bot, create_dispatcher, get_update_queue, setup_webhook
+from bot.cluster import get_bot_cluster
+from bot.utils.pdf_generator import start_pdf_warm_up
+from api.routes import prices, orders, analytics, metrics, telegram
+from api.services.response_cache import ResponseCacheMiddleware
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -30,11 +30,24 @@ logging.basicConfig(
 # Создание lifespan контекстного менеджера
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    cluster = get_bot_cluster()
+    if BOT_MODE == "webhook":
+        # Обновления приходят в /api/telegram/webhook, обработчики - в этом процессе
+        # или в процессах бота (BOT_WORKERS > 1)
+        await start_webhook()
+        yield
+        if cluster is not None:
+            await cluster.stop()
+        else:
+            await get_update_queue().stop()
+        return
     # Запуск бота при старте приложения
     bot_task = asyncio.create_task(start_bot())
     yield
     # Отмена задачи при остановке приложения
     bot_task.cancel()
+    if cluster is not None:
+        await cluster.stop()
 
 # Создание экземпляра FastAPI
 app = FastAPI(
@@ -52,30 +65,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Кэш ответов справочников и аналитики с ETag
+app.add_middleware(ResponseCacheMiddleware)
+
 # Подключение маршрутов API
 app.include_router(prices.router, prefix="/api/prices", tags=["prices"])
 app.include_router(orders.router, prefix="/api/orders", tags=["orders"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
+app.include_router(telegram.router, prefix="/api/telegram", tags=["telegram"])
 
 # Функция запуска бота
 async def start_bot():
-    # Инициализация бота и диспетчера
-    bot = Bot(token=getenv("BOT_TOKEN"))
-    # Установка параметров по умолчанию
-    bot.parse_mode = ParseMode.HTML
-    dp = Dispatcher(storage=MemoryStorage())
+    cluster = get_bot_cluster()
+    if cluster is not None:
+        await cluster.start_polling(create_bot())
+        return
     
-    # Регистрация обработчиков
-    dp.include_router(common.router)
-    dp.include_router(district.router)
-    dp.include_router(depth.router)
-    dp.include_router(equipment.router)
-    dp.include_router(order.router)
+    # Инициализация бота и диспетчера со всеми обработчиками
+    bot = create_bot()
+    dp = create_dispatcher()
+    
+    # Фоновый прогрев воркеров PDF (при PDF_WARMUP=1)
+    start_pdf_warm_up()
     
     # Запуск бота
     await bot.delete_webhook(drop_pending_updates=True)
     await dp.start_polling(bot)
 
+# Функция запуска бота в режиме вебхука
+async def start_webhook():
+    # Без секрета приложение не запускается (вебхук принимал бы поддельные обновления)
+    check_webhook_config()
+    cluster = get_bot_cluster()
+    if cluster is not None:
+        # Прогрев PDF - в процессах бота
+        cluster.start()
+        bot = create_bot()
+    else:
+        queue = get_update_queue()
+        queue.start()
+        bot = queue.bot
+        # Фоновый прогрев воркеров PDF (при PDF_WARMUP=1)
+        start_pdf_warm_up()
+    
+    try:
+        await setup_webhook(bot)
+    except Exception as e:
+        logging.error(f"Не удалось зарегистрировать вебхук: {e}")
+    finally:
+        if cluster is not None:
+            await bot.session.close()
+
 # Запуск сервера
 if __name__ == "__main__":
     uvicorn.run(
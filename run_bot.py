@@ -4,16 +4,15 @@ import logging
 import sys
 from os import getenv
 
-from aiogram import Bot, Dispatcher
-from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from dotenv import load_dotenv
 
-from bot.handlers import common, district, depth, equipment, order
-
-# Загрузка переменных окружения (на случай локального запуска)
+# Загрузка переменных окружения (на случай локального запуска; до импорта модулей проекта)
 load_dotenv()
 
+from bot.dispatcher import BOT_MODE, check_webhook_config, create_bot, create_dispatcher, setup_webhook
+from bot.cluster import get_bot_cluster
+from bot.utils.pdf_generator import start_pdf_warm_up
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -30,17 +29,36 @@ async def main():
         logging.critical("Ошибка: Переменная окружения BOT_TOKEN не установлена!")
         return
 
-    bot = Bot(token=bot_token)
-    # Установка параметров по умолчанию
-    bot.parse_mode = ParseMode.HTML
-    dp = Dispatcher(storage=MemoryStorage())
-
-    # Регистрация обработчиков
-    dp.include_router(common.router)
-    dp.include_router(district.router)
-    dp.include_router(depth.router)
-    dp.include_router(equipment.router)
-    dp.include_router(order.router)
+    if BOT_MODE == "webhook":
+        try:
+            check_webhook_config()
+        except RuntimeError as e:
+            logging.critical(f"Ошибка: {e}")
+            return
+
+    bot = create_bot(bot_token)
+
+    if BOT_MODE == "webhook":
+        # Обновления принимает API (main.py, /api/telegram/webhook); здесь только регистрация вебхука
+        logging.info("Режим webhook: обновления принимает API, регистрация вебхука...")
+        await setup_webhook(bot)
+        await bot.session.close()
+        return
+
+    cluster = get_bot_cluster()
+    if cluster is not None:
+        # Обработка в процессах бота (BOT_WORKERS > 1), здесь только получение обновлений
+        logging.info("Запуск бота в режиме polling с процессами-обработчиками...")
+        try:
+            await cluster.start_polling(bot)
+        finally:
+            await cluster.stop()
+        return
+
+    dp = create_dispatcher()
+
+    # Фоновый прогрев воркеров PDF (при PDF_WARMUP=1)
+    start_pdf_warm_up()
 
     # Запуск бота
     logging.info("Запуск бота в режиме polling...")